@@ -1,21 +1,99 @@
+import uuid
+
 from django.contrib import admin
-from .models import Conversation, Message
+from django.db.models import Q
+
+from . import replicas
+from .models import Conversation, DeadLetterEvent, Message, PendingEvent, Tenant
+from .search import match_messages
+
+
+class ReplicaChangelistMixin:
+    """Lê a listagem do admin de uma réplica, como as leituras da API (ver `replicas.read_only`)."""
+
+    def changelist_view(self, request, extra_context=None):
+        if request.method != 'GET':
+            return super().changelist_view(request, extra_context)
+        with replicas.read_only():
+            return super().changelist_view(request, extra_context)
+
+
+@admin.register(Tenant)
+class TenantAdmin(admin.ModelAdmin):
+    list_display = ('slug', 'name', 'is_active', 'rate_limit', 'rate_burst', 'updated_at')
+    list_filter = ('is_active',)
+    search_fields = ('slug', 'name')
+    readonly_fields = ('previous_secret', 'read_token_hash', 'created_at', 'updated_at')
+    ordering = ('slug',)
+    actions = ('rotate_secret', 'rotate_read_token')
+
+    @admin.action(description='Rotacionar segredo (o anterior continua válido até a próxima rotação)')
+    def rotate_secret(self, request, queryset):
+        for tenant in queryset:
+            tenant.rotate_secret()
+        self.message_user(request, f'{queryset.count()} segredo(s) rotacionado(s).')
+
+    @admin.action(description='Gerar token de leitura (invalida o anterior)')
+    def rotate_read_token(self, request, queryset):
+        # Só o hash é guardado: o token é exibido uma única vez, para ser entregue à origem
+        for tenant in queryset:
+            self.message_user(request, f'Token de leitura de {tenant.slug}: {tenant.rotate_read_token()}')
 
 
 @admin.register(Conversation)
-class ConversationAdmin(admin.ModelAdmin):
-    list_display = ('id', 'state', 'created_at', 'updated_at')
-    list_filter = ('state', 'created_at', 'updated_at')
+class ConversationAdmin(ReplicaChangelistMixin, admin.ModelAdmin):
+    list_display = (
+        'id', 'state', 'tenant', 'message_count', 'last_message_at', 'last_direction', 'created_at', 'updated_at'
+    )
+    list_filter = ('state', 'tenant', 'created_at', 'updated_at')
     search_fields = ('id',)
-    readonly_fields = ('created_at', 'updated_at')
+    # Resumo mantido pela ingestão (ver reconcile_conversation_summaries)
+    readonly_fields = (
+        'message_count', 'last_message_at', 'last_message_preview', 'last_direction', 'created_at', 'updated_at'
+    )
     ordering = ('-created_at',)
 
 
 @admin.register(Message)
-class MessageAdmin(admin.ModelAdmin):
+class MessageAdmin(ReplicaChangelistMixin, admin.ModelAdmin):
     list_display = ('id', 'conversation', 'direction', 'timestamp', 'created_at')
     list_filter = ('direction', 'timestamp', 'created_at')
     search_fields = ('id', 'content', 'conversation__id')
+    search_help_text = 'ID da mensagem ou da conversa, ou texto da mensagem (busca de texto completo)'
     readonly_fields = ('created_at',)
     ordering = ('-timestamp',)
     raw_id_fields = ('conversation',)
+    # Evita um COUNT(*) sobre todas as mensagens a cada página da listagem
+    show_full_result_count = False
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Busca por ID exato (da mensagem ou da conversa) ou por texto completo no conteúdo.
+
+        Substitui o `ILIKE '%termo%'` gerado a partir de `search_fields`, que percorre a
+        tabela inteira, pelo índice de texto completo de `search.match_messages`.
+        """
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        try:
+            value = uuid.UUID(search_term)
+        except ValueError:
+            return match_messages(queryset, search_term), False
+        return queryset.filter(Q(id=value) | Q(conversation_id=value)), False
+
+
+@admin.register(PendingEvent)
+class PendingEventAdmin(admin.ModelAdmin):
+    list_display = ('id', 'conversation_id', 'received_at', 'expires_at')
+    search_fields = ('conversation_id',)
+    readonly_fields = ('received_at',)
+    ordering = ('received_at',)
+
+
+@admin.register(DeadLetterEvent)
+class DeadLetterEventAdmin(admin.ModelAdmin):
+    list_display = ('id', 'reason', 'received_at', 'created_at')
+    list_filter = ('reason', 'created_at')
+    readonly_fields = ('created_at',)
+    ordering = ('-created_at',)
@@ -0,0 +1,88 @@
+import uuid
+from contextlib import contextmanager
+
+from celery import current_app
+from django.conf import settings
+from django.core.cache import cache
+from kombu import Queue
+
+from . import status
+from .routing import conversation_id_for, shard_for, sharding_enabled, shard_queue, DEFAULT_QUEUE
+
+BUFFER_QUEUE_NAME = 'webhook.buffer.{}'
+DRAIN_SCHEDULED_KEY = 'webhook:buffer:drain-scheduled:{}'
+# Tempo máximo que a marca de agendamento sobrevive caso a tarefa de drenagem se perca
+DRAIN_SCHEDULED_TIMEOUT = 60
+
+
+def buffer_event(event: dict) -> str:
+    """
+    Publica um evento no buffer de micro-lotes e agenda sua drenagem.
+
+    O evento é publicado em uma fila dedicada do broker, consumida em lotes por
+    `drain_webhook_buffer` em vez de gerar uma tarefa Celery por evento. Com sharding
+    ativo há um buffer por shard, drenado na fila do próprio shard, o que preserva a
+    ordem dos eventos de cada conversa.
+
+    Args:
+        event (dict): Evento já validado pelo WebhookSerializer.
+
+    Returns:
+        str: ID do evento, usado para consultar seu resultado em `task_status`.
+    """
+    event_id = str(uuid.uuid4())
+    shard = shard_for(conversation_id_for(event)) if sharding_enabled() else 0
+    queue = Queue(BUFFER_QUEUE_NAME.format(shard))
+    with current_app.producer_or_acquire() as producer:
+        producer.publish(
+            {'event_id': event_id, 'event': event},
+            routing_key=queue.name,
+            declare=[queue],
+            serializer='json',
+        )
+    status.set_event_statuses({event_id: {'status': status.PENDING}})
+    schedule_drain(shard)
+    return event_id
+
+
+def schedule_drain(shard: int, countdown: float = None) -> None:
+    """
+    Agenda uma drenagem do buffer de um shard, se ainda não houver uma pendente.
+
+    A marca em cache garante no máximo uma drenagem agendada por vez; os eventos que
+    chegarem durante a espera de `WEBHOOK_MICROBATCH_WAIT_MS` entram no mesmo lote.
+    """
+    if countdown is None:
+        countdown = settings.WEBHOOK_MICROBATCH_WAIT_MS / 1000
+    if cache.add(DRAIN_SCHEDULED_KEY.format(shard), 1, timeout=DRAIN_SCHEDULED_TIMEOUT):
+        from .tasks import drain_webhook_buffer
+        queue = shard_queue(shard) if sharding_enabled() else DEFAULT_QUEUE
+        drain_webhook_buffer.apply_async(args=[shard], countdown=countdown, queue=queue)
+
+
+def release_drain(shard: int) -> None:
+    """Libera a marca de agendamento para que novos eventos agendem outra drenagem."""
+    cache.delete(DRAIN_SCHEDULED_KEY.format(shard))
+
+
+@contextmanager
+def read_buffer(shard: int, max_events: int):
+    """
+    Lê até `max_events` mensagens já disponíveis no buffer, sem bloquear.
+
+    As mensagens são entregues sem confirmação (ack); quem as consome deve
+    confirmá-las dentro do bloco `with`, após persistir os eventos, garantindo
+    entrega pelo menos uma vez.
+
+    Yields:
+        list: Mensagens kombu cujo `payload` contém `event_id` e `event`.
+    """
+    with current_app.connection_for_read() as connection:
+        with connection.SimpleQueue(BUFFER_QUEUE_NAME.format(shard)) as queue:
+            messages = []
+            while len(messages) < max_events:
+                try:
+                    messages.append(queue.get_nowait())
+                except queue.Empty:
+                    break
+            yield messages
@@ -0,0 +1,109 @@
+import hashlib
+import json
+import uuid
+
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from . import metrics
+
+CONVERSATION_CACHE_ALIAS = 'conversations'
+CONVERSATION_DETAIL_KEY = 'conversation:detail:{}:{}'
+CONVERSATION_VERSION_KEY = 'conversation:version:{}'
+
+
+def _cache():
+    return caches[CONVERSATION_CACHE_ALIAS]
+
+
+def canonical_id(conversation_id) -> str:
+    """
+    Forma canônica (minúsculas, com hífens) do ID de uma conversa, usada nas chaves de cache.
+
+    O mesmo UUID pode chegar na URL em maiúsculas ou sem hífens; sem a normalização,
+    cada grafia teria sua própria entrada, que a invalidação não alcançaria.
+
+    Raises:
+        ValueError: Se o valor não for um UUID.
+    """
+    return str(uuid.UUID(str(conversation_id)))
+
+
+def _version_timeout():
+    """
+    Validade das versões: o dobro da validade das entradas, para que nenhuma entrada
+    gravada sob uma versão sobreviva à própria versão.
+    """
+    timeout = _cache().default_timeout
+    return None if timeout is None else timeout * 2
+
+
+def conversation_version(conversation_id) -> str:
+    """
+    Versão atual do detalhe de uma conversa em cache, trocada a cada escrita nela.
+
+    O detalhe fica em cache sob a versão, que deve ser lida antes de consultar o
+    banco: se uma escrita for confirmada no meio da leitura, a troca de versão torna
+    inalcançável a entrada que a leitura ainda gravar com o estado anterior. Sem
+    versão (primeira leitura, ou versão expirada), uma nova é criada com `add`.
+    """
+    cache = _cache()
+    key = CONVERSATION_VERSION_KEY.format(canonical_id(conversation_id))
+    version = cache.get(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(key, version, timeout=_version_timeout()):
+            version = cache.get(key, version)
+    return version
+
+
+def get_conversation_detail(conversation_id, version: str) -> dict:
+    """
+    Busca o detalhe serializado de uma conversa no cache, na versão informada.
+
+    Returns:
+        dict: {'data': <detalhe serializado>, 'etag': str, 'tenant_id': origem da conversa},
+            ou None se não estiver em cache.
+    """
+    entry = _cache().get(CONVERSATION_DETAIL_KEY.format(canonical_id(conversation_id), version))
+    metrics.increment(metrics.CONVERSATION_CACHE_HITS if entry else metrics.CONVERSATION_CACHE_MISSES)
+    return entry
+
+
+def set_conversation_detail(conversation_id, version: str, data: dict, tenant_id=None) -> str:
+    """
+    Guarda o detalhe serializado de uma conversa no cache, junto com seu ETag e sua origem.
+
+    A origem é guardada para que a leitura possa recusar entradas de outra origem
+    sem consultar o banco. `version` é a obtida em `conversation_version` antes da
+    leitura do banco.
+
+    Returns:
+        str: ETag calculado a partir do conteúdo serializado.
+    """
+    etag = compute_etag(data)
+    _cache().set(
+        CONVERSATION_DETAIL_KEY.format(canonical_id(conversation_id), version),
+        {'data': data, 'etag': etag, 'tenant_id': tenant_id}
+    )
+    return etag
+
+
+def invalidate_conversations(conversation_ids) -> None:
+    """
+    Troca, após o commit da transação corrente, a versão em cache das conversas alteradas.
+
+    As entradas das versões anteriores deixam de ser lidas e expiram sozinhas, inclusive
+    as gravadas depois da troca por leituras que começaram antes dela.
+    """
+    keys = list({CONVERSATION_VERSION_KEY.format(canonical_id(value)) for value in conversation_ids})
+    if keys:
+        transaction.on_commit(
+            lambda: _cache().set_many(dict.fromkeys(keys, uuid.uuid4().hex), timeout=_version_timeout())
+        )
+
+
+def compute_etag(data: dict) -> str:
+    payload = json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True).encode('utf-8')
+    return f'"{hashlib.sha1(payload).hexdigest()}"'
@@ -0,0 +1,54 @@
+from django.conf import settings
+from django.core.cache import cache
+
+DEDUP_KEY = 'webhook:seen:{}:{}:{}'
+
+
+def event_key(event: dict) -> str:
+    """
+    Retorna a chave de idempotência de um evento.
+
+    Mensagens são identificadas pelo próprio ID; eventos de conversa, pelo tipo e ID
+    da conversa, já que o provedor não envia um ID próprio para o evento. A origem
+    faz parte da chave, para que uma origem não descarte eventos de outra.
+    """
+    return DEDUP_KEY.format(event.get('tenant_id') or '-', event.get('type'), (event.get('data') or {}).get('id'))
+
+
+def mark_seen(event: dict) -> bool:
+    """
+    Registra o evento como recebido, de forma atômica.
+
+    Usa `cache.add` (SET NX no Redis) com expiração WEBHOOK_DEDUP_TTL, o que mantém a
+    memória limitada ao volume da janela de deduplicação.
+
+    Returns:
+        bool: True se o evento é novo, False se é uma reentrega já vista na janela.
+    """
+    if not settings.WEBHOOK_DEDUP_ENABLED:
+        return True
+    return cache.add(event_key(event), 1, timeout=settings.WEBHOOK_DEDUP_TTL)
+
+
+def forget(event: dict) -> None:
+    """
+    Remove o registro do evento, permitindo que uma reentrega seja aceita.
+
+    Deve ser chamado quando o evento foi marcado mas não chegou a ser enfileirado,
+    ou quando a tarefa que o processaria falhou.
+    """
+    if settings.WEBHOOK_DEDUP_ENABLED:
+        cache.delete(event_key(event))
+
+
+async def amark_seen(event: dict) -> bool:
+    """Versão assíncrona de `mark_seen`, para views assíncronas."""
+    if not settings.WEBHOOK_DEDUP_ENABLED:
+        return True
+    return await cache.aadd(event_key(event), 1, timeout=settings.WEBHOOK_DEDUP_TTL)
+
+
+async def aforget(event: dict) -> None:
+    """Versão assíncrona de `forget`."""
+    if settings.WEBHOOK_DEDUP_ENABLED:
+        await cache.adelete(event_key(event))
@@ -0,0 +1,99 @@
+import json
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Conversation, Message
+
+# Quantidade de bytes acumulados antes de emitir um pedaço do fluxo
+STREAM_CHUNK_BYTES = 64 * 1024
+
+
+def export_records(state: str = None, since=None, until=None, chunk_size: int = 2000, tenant=None, using=None):
+    """
+    Gera os registros de exportação de conversas e mensagens, um dicionário por linha.
+
+    Primeiro são emitidas as conversas (`"record": "conversation"`) e depois as mensagens
+    (`"record": "message"`), ambas lidas em páginas de `chunk_size` linhas por ordem de ID
+    (ver `in_chunks`): a memória usada não depende do tamanho das tabelas.
+
+    Args:
+        state (str): Filtra conversas (e as mensagens delas) pelo estado OPEN ou CLOSED.
+        since (datetime): Limite inferior, inclusivo, de `created_at` das conversas e `timestamp` das mensagens.
+        until (datetime): Limite superior, exclusivo, dos mesmos campos.
+        chunk_size (int): Linhas buscadas no banco por vez.
+        tenant (Tenant): Restringe a exportação às conversas de uma origem.
+        using (str): Banco lido (uma réplica, por exemplo); padrão: o do roteador.
+
+    Yields:
+        dict: Registro pronto para serialização em JSON.
+    """
+    conversations = Conversation.objects.using(using).order_by()
+    messages = Message.objects.using(using).order_by()
+    if tenant is not None:
+        conversations = conversations.filter(tenant=tenant)
+        messages = messages.filter(conversation__tenant=tenant)
+    if state:
+        conversations = conversations.filter(state=state)
+        messages = messages.filter(conversation__state=state)
+    if since:
+        conversations = conversations.filter(created_at__gte=since)
+        messages = messages.filter(timestamp__gte=since)
+    if until:
+        conversations = conversations.filter(created_at__lt=until)
+        messages = messages.filter(timestamp__lt=until)
+
+    for row in in_chunks(conversations.values('id', 'state', 'created_at', 'updated_at'), chunk_size):
+        yield {'record': 'conversation', **row}
+    message_fields = ('id', 'conversation_id', 'direction', 'content', 'timestamp', 'created_at')
+    for row in in_chunks(messages.values(*message_fields), chunk_size):
+        yield {'record': 'message', **row}
+
+
+def in_chunks(rows, chunk_size: int):
+    """
+    Percorre um queryset de `.values()` (com o campo `id`) em páginas por ordem de ID.
+
+    Cada página é uma consulta curta (`WHERE id > último ORDER BY id LIMIT n`), em vez de
+    um cursor do lado do servidor aberto durante toda a exportação: funciona com
+    DISABLE_SERVER_SIDE_CURSORS (PgBouncer em modo transaction) sem carregar a tabela
+    inteira na memória, e não segura uma transação longa.
+    """
+    last_id = None
+    while True:
+        page = rows.order_by('id')
+        if last_id is not None:
+            page = page.filter(id__gt=last_id)
+        chunk = list(page[:chunk_size])
+        yield from chunk
+        if len(chunk) < chunk_size:
+            return
+        last_id = chunk[-1]['id']
+
+
+def iter_ndjson(records, compress: bool = False):
+    """
+    Serializa registros como NDJSON, opcionalmente comprimido em gzip, em pedaços de até STREAM_CHUNK_BYTES.
+
+    Yields:
+        bytes: Pedaço do fluxo de saída.
+    """
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS) if compress else None
+    buffer = []
+    size = 0
+    for record in records:
+        line = json.dumps(record, cls=DjangoJSONEncoder, ensure_ascii=False).encode('utf-8') + b'\n'
+        buffer.append(line)
+        size += len(line)
+        if size >= STREAM_CHUNK_BYTES:
+            chunk = b''.join(buffer)
+            buffer, size = [], 0
+            chunk = compressor.compress(chunk) if compressor else chunk
+            if chunk:
+                yield chunk
+
+    chunk = b''.join(buffer)
+    if compressor:
+        chunk = compressor.compress(chunk) + compressor.flush()
+    if chunk:
+        yield chunk
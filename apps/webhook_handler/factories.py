@@ -1,6 +1,6 @@
 import uuid
-from datetime import datetime
 import factory
+from django.utils import timezone
 from factory.django import DjangoModelFactory
 from .models import Conversation, Message
 
@@ -21,4 +21,4 @@ class MessageFactory(DjangoModelFactory):
     conversation = factory.SubFactory(ConversationFactory)
     direction = Message.RECEIVED_CHOICE
     content = factory.Faker('text', max_nb_chars=200)
-    timestamp = factory.LazyFunction(datetime.now)
+    timestamp = factory.LazyFunction(timezone.now)
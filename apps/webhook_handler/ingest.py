@@ -0,0 +1,217 @@
+import asyncio
+import logging
+import uuid
+from collections import Counter
+
+from asgiref.sync import sync_to_async
+from celery import current_app
+from django.conf import settings
+from django.utils import timezone
+
+from . import metrics, status
+from .models import DeadLetterEvent
+from .routing import queue_for_event
+from .tasks import process_webhook
+
+logger = logging.getLogger('webhook_handler')
+
+
+class BufferFull(Exception):
+    """O buffer de ingestão assíncrona atingiu WEBHOOK_ASYNC_BUFFER_SIZE eventos."""
+
+
+def publish_events(items: list) -> None:
+    """
+    Publica no broker os eventos acumulados, reaproveitando uma única conexão e um único producer.
+
+    Cada evento vira uma tarefa `process_webhook` com o ID já devolvido ao cliente,
+    na fila do seu shard, respeitando o modo de rastreamento de resultados.
+
+    Args:
+        items (list): Pares (ID da tarefa, evento validado).
+    """
+    with current_app.producer_or_acquire() as producer:
+        for task_id, event in items:
+            status.apply_tracked(
+                process_webhook, [event], queue=queue_for_event(event), task_id=task_id, producer=producer
+            )
+
+
+def count_received(items: list) -> None:
+    """Conta em EVENTS_RECEIVED (total e por origem) eventos já publicados; chamada uma vez por lote."""
+    metrics.increment(metrics.EVENTS_RECEIVED, len(items))
+    for tenant_id, count in Counter(event.get('tenant_id') for _, event in items).items():
+        if tenant_id is not None:
+            metrics.increment(metrics.EVENTS_RECEIVED, count, tenant=tenant_id)
+
+
+def dead_letter_events(items: list, reason: str) -> None:
+    """Grava em DeadLetterEvent os eventos de um lote que não pôde ser publicado."""
+    now = timezone.now()
+    DeadLetterEvent.objects.bulk_create(
+        [DeadLetterEvent(payload=event, reason=reason[:255], received_at=now) for _, event in items]
+    )
+
+
+class AsyncEventBuffer:
+    """
+    Buffer em memória, limitado, entre a view assíncrona de webhook e o broker.
+
+    A view apenas enfileira o evento e responde; uma tarefa asyncio de fundo retira
+    os eventos em lotes de até `flush_size`, esperando até `flush_interval` segundos
+    para completar um lote, e os publica em uma thread, sem bloquear o event loop.
+    Quando o buffer está cheio (por exemplo, com o broker fora do ar), `put` falha
+    imediatamente, e a view responde 503 para que o provedor reenvie mais tarde.
+
+    Publicações com erro são repetidas, com espera crescente (até `max_backoff`
+    segundos), por até `max_attempts` tentativas; enquanto isso o buffer enche e a
+    view passa a recusar novos eventos. Como a persistência é idempotente,
+    republicar um lote parcialmente enviado é seguro. Esgotadas as tentativas, o lote
+    vai para a dead-letter (`dead_letter`), de onde pode ser reaplicado, e o buffer
+    volta a andar. Eventos ainda não publicados só se perdem se o processo cair sem
+    passar por `close` (ver `lifespan`) ou se a própria dead-letter falhar, o que é
+    registrado no log com os IDs das tarefas.
+    """
+
+    def __init__(self, maxsize: int, flush_size: int, flush_interval: float, max_attempts: int = 20,
+                 max_backoff: float = 5, publish=publish_events, dead_letter=dead_letter_events):
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize)
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self.max_backoff = max_backoff
+        self.publish = publish
+        self.dead_letter = dead_letter
+        self.closing = False
+        self.pending = 0  # Eventos aceitos ainda não publicados
+        self._flusher = None
+
+    def put(self, event: dict) -> str:
+        """
+        Enfileira um evento validado para publicação.
+
+        Returns:
+            str: ID da tarefa que processará o evento.
+
+        Raises:
+            BufferFull: Se o buffer estiver cheio ou sendo encerrado.
+        """
+        if self.closing:
+            raise BufferFull()
+        task_id = str(uuid.uuid4())
+        try:
+            self.queue.put_nowait((task_id, event))
+        except asyncio.QueueFull:
+            raise BufferFull()
+        self.pending += 1
+        if self._flusher is None or self._flusher.done():
+            self._flusher = self.loop.create_task(self._run())
+        return task_id
+
+    def _drain(self, batch: list) -> None:
+        while len(batch) < self.flush_size and not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+
+    async def _run(self):
+        while True:
+            batch = [await self.queue.get()]
+            self._drain(batch)
+            if len(batch) < self.flush_size and not self.closing:
+                # Lote incompleto: espera um pouco para agrupar os eventos que estão chegando
+                await asyncio.sleep(self.flush_interval)
+                self._drain(batch)
+            await self.flush(batch)
+            self.pending -= len(batch)
+            for _ in batch:
+                self.queue.task_done()
+
+    async def flush(self, batch: list) -> None:
+        """
+        Publica um lote, com até `max_attempts` tentativas, e o envia à dead-letter se todas falharem.
+
+        Os eventos só são contados em EVENTS_RECEIVED depois de publicados.
+        """
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                await sync_to_async(self.publish, thread_sensitive=False)(batch)
+            except Exception as e:
+                error = e
+                logger.warning("Failed to publish %s buffered webhook events (attempt %s): %s", len(batch), attempt, e)
+                if attempt < self.max_attempts:
+                    await asyncio.sleep(min(2 ** attempt * 0.1, self.max_backoff))
+                continue
+            await sync_to_async(count_received, thread_sensitive=False)(batch)
+            return
+
+        logger.error(
+            "Dead-lettering %s buffered webhook events after %s failed publish attempts", len(batch), self.max_attempts
+        )
+        try:
+            await sync_to_async(self.dead_letter, thread_sensitive=False)(batch, f'Publish failed: {error}')
+        except Exception as e:
+            logger.error(
+                "Lost %s buffered webhook events (tasks %s): dead-letter failed: %s",
+                len(batch), [task_id for task_id, _ in batch], e, exc_info=True
+            )
+
+    async def close(self, timeout: float) -> None:
+        """
+        Recusa novos eventos e espera, por até `timeout` segundos, a publicação dos pendentes.
+        """
+        self.closing = True
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.error(
+                "Shutting down with %s buffered webhook events not published after %ss",
+                self.pending, timeout
+            )
+        if self._flusher is not None:
+            self._flusher.cancel()
+
+
+_buffer = None
+
+
+def get_buffer() -> AsyncEventBuffer:
+    """
+    Retorna o buffer do event loop atual, criando-o na primeira chamada.
+    """
+    global _buffer
+    if _buffer is None or _buffer.loop is not asyncio.get_running_loop():
+        _buffer = AsyncEventBuffer(
+            maxsize=settings.WEBHOOK_ASYNC_BUFFER_SIZE,
+            flush_size=settings.WEBHOOK_ASYNC_FLUSH_SIZE,
+            flush_interval=settings.WEBHOOK_ASYNC_FLUSH_MS / 1000,
+            max_attempts=settings.WEBHOOK_ASYNC_PUBLISH_ATTEMPTS,
+        )
+    return _buffer
+
+
+async def close_buffer() -> None:
+    """Publica o que restar no buffer do event loop atual (encerramento do servidor ASGI)."""
+    if _buffer is not None and _buffer.loop is asyncio.get_running_loop():
+        await _buffer.close(settings.WEBHOOK_ASYNC_SHUTDOWN_TIMEOUT)
+
+
+def lifespan(application):
+    """
+    Envolve a aplicação ASGI do Django, que não trata o protocolo lifespan.
+
+    No encerramento do servidor (`lifespan.shutdown`), publica os eventos ainda no
+    buffer antes de o processo sair; as demais conexões seguem para `application`.
+    """
+    async def app(scope, receive, send):
+        if scope['type'] != 'lifespan':
+            return await application(scope, receive, send)
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await close_buffer()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    return app
@@ -0,0 +1,229 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import re
+import uuid
+import weakref
+import zlib
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+# Este módulo é importado pela configuração de LOGGING, antes de o Django carregar
+# os apps: não deve importar models, settings nem outros módulos do app.
+
+CORRELATION_HEADER = 'X-Request-ID'
+
+# Aceita IDs gerados por proxies e clientes (UUID, hex, base64 url-safe) sem abrir
+# espaço para injeção de quebras de linha ou valores enormes nos logs
+CORRELATION_ID_PATTERN = re.compile(r'^[A-Za-z0-9._:-]{1,64}$')
+
+_correlation_id = ContextVar('webhook_correlation_id', default=None)
+
+# Atributos presentes em todo LogRecord; o que sobrar veio de `extra=` e vai para o JSON
+RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {
+    'message', 'asctime', 'correlation_id', 'taskName',
+}
+
+
+def new_correlation_id() -> str:
+    return uuid.uuid4().hex
+
+
+def clean_correlation_id(value) -> str:
+    """Retorna o ID recebido se for seguro para os logs, senão um ID novo."""
+    if isinstance(value, str) and CORRELATION_ID_PATTERN.match(value):
+        return value
+    return new_correlation_id()
+
+
+def get_correlation_id():
+    """ID de correlação do contexto atual (requisição ou tarefa), ou None."""
+    return _correlation_id.get()
+
+
+def set_correlation_id(value):
+    """Define o ID de correlação do contexto atual e retorna o token para `reset_correlation_id`."""
+    return _correlation_id.set(value)
+
+
+def reset_correlation_id(token) -> None:
+    _correlation_id.reset(token)
+
+
+@contextmanager
+def correlation(value):
+    """Executa o bloco com `value` como ID de correlação."""
+    token = set_correlation_id(value)
+    try:
+        yield value
+    finally:
+        reset_correlation_id(token)
+
+
+class CorrelationIdFilter(logging.Filter):
+    """
+    Anota os registros com o ID de correlação do contexto em que foram emitidos.
+
+    Deve ficar no handler (ou no logger), e não no formatter: com `QueueStreamHandler`
+    a formatação acontece em outra thread, onde o contexto da requisição não existe.
+    """
+
+    def filter(self, record):
+        if getattr(record, 'correlation_id', None) is None:
+            record.correlation_id = _correlation_id.get() or '-'
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Amostra os registros de alto volume (INFO e abaixo) por logger.
+
+    WARNING e acima passam sempre. A decisão é tomada pelo ID de correlação quando
+    houver um: uma requisição amostrada mantém todas as suas linhas, inclusive as da
+    tarefa que ela enfileirou, em vez de linhas soltas de eventos diferentes.
+
+    Args:
+        rates (dict): Fração mantida (0 a 1) por nome de logger; vale também para os
+            loggers filhos (`webhook_handler` cobre `webhook_handler.tasks`). Loggers
+            sem taxa configurada não são amostrados.
+    """
+
+    def __init__(self, rates: dict = None):
+        super().__init__()
+        self.rates = {name: float(rate) for name, rate in (rates or {}).items()}
+
+    def rate_for(self, name: str) -> float:
+        while name:
+            if name in self.rates:
+                return self.rates[name]
+            name = name.rpartition('.')[0]
+        return 1.0
+
+    def filter(self, record):
+        if record.levelno > logging.INFO or not self.rates:
+            return True
+        rate = self.rate_for(record.name)
+        if rate >= 1:
+            return True
+        correlation_id = getattr(record, 'correlation_id', None) or _correlation_id.get()
+        if correlation_id and correlation_id != '-':
+            return zlib.crc32(correlation_id.encode()) % 10000 < rate * 10000
+        return random.random() < rate
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formata os registros como uma linha JSON.
+
+    A mensagem só é interpolada aqui (`record.getMessage()`), então chamadas no
+    estilo `logger.info("... %s", valor)` descartadas por nível ou amostragem não
+    custam a formatação. Campos passados em `extra=` entram no objeto.
+    """
+
+    def format(self, record):
+        entry = {
+            'timestamp': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'correlation_id': getattr(record, 'correlation_id', None),
+            'module': record.module,
+            'process': record.process,
+        }
+        for key, value in vars(record).items():
+            if key not in RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exception'] = record.exc_text
+        if record.stack_info:
+            entry['stack'] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+_queue_handlers = weakref.WeakSet()
+
+
+class QueueStreamHandler(QueueHandler):
+    """
+    Handler que não bloqueia quem registra: enfileira o registro e retorna.
+
+    Uma thread (`QueueListener`) formata e escreve os registros em um `StreamHandler`
+    interno. A fila é limitada: se a saída não acompanhar, os registros excedentes
+    são descartados e contados em `dropped`, em vez de segurar a requisição ou a
+    tarefa. Os filtros deste handler (correlação, amostragem) rodam antes de
+    enfileirar, na thread de quem registrou.
+
+    Processos filhos criados por fork (workers prefork do Celery) recebem uma fila e
+    uma thread novas; a thread é encerrada na saída do processo, esvaziando a fila.
+
+    Args:
+        stream: Destino dos registros (padrão: sys.stderr).
+        maxsize (int): Capacidade da fila.
+    """
+
+    def __init__(self, stream=None, maxsize: int = 10000):
+        super().__init__(queue.Queue(maxsize=maxsize))
+        self.maxsize = maxsize
+        self.dropped = 0
+        self.target = logging.StreamHandler(stream)
+        self.listener = None
+        self.start()
+        _queue_handlers.add(self)
+
+    def start(self) -> None:
+        self.listener = QueueListener(self.queue, self.target)
+        self.listener.start()
+
+    def stop(self) -> None:
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+
+    def setFormatter(self, fmt):
+        # A formatação acontece na thread do listener, pelo handler interno
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record):
+        # Ao contrário de QueueHandler, não formata aqui: a mensagem e o JSON são
+        # montados na thread do listener. Os argumentos dos logs do app são valores
+        # imutáveis (IDs, contagens, textos), então interpolá-los depois é seguro.
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def after_fork(self) -> None:
+        self.queue = queue.Queue(maxsize=self.maxsize)
+        self.dropped = 0
+        self.start()
+
+    def close(self):
+        self.stop()
+        self.target.close()
+        super().close()
+
+
+def _restart_after_fork():
+    for handler in list(_queue_handlers):
+        handler.after_fork()
+
+
+@atexit.register
+def stop_queue_handlers():
+    """Encerra as threads dos `QueueStreamHandler`, escrevendo o que ainda estiver na fila."""
+    for handler in list(_queue_handlers):
+        handler.stop()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_restart_after_fork)
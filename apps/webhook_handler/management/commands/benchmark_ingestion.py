@@ -0,0 +1,282 @@
+import hashlib
+import hmac
+import json
+import platform
+import random
+import time
+import uuid
+from datetime import timedelta
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory
+
+from apps.webhook_handler.metrics import QueryCounter
+from apps.webhook_handler.models import Conversation, PendingEvent, Tenant
+from apps.webhook_handler.tasks import process_webhook
+from apps.webhook_handler.tenants import TENANT_HEADER
+from apps.webhook_handler.validators import validate_event
+from apps.webhook_handler.views import WebhookViewSet
+# Mesmo módulo de settings lido por `verify_signature` para escolher entre chave simples e HMAC
+from realmate_challenge import settings as project_settings
+
+TARGETS = ('view', 'task')
+
+CONTENTS = [
+    'Olá, tudo bem?',
+    'Gostaria de saber o status do meu pedido.',
+    'Obrigado!',
+    'Pode me enviar a segunda via do boleto? O vencimento foi ontem e não recebi o e-mail com o código de barras.',
+    'Sim',
+    'Vou verificar e já retorno.',
+]
+
+
+def generate_traffic(conversations: int, messages: int, concurrency: int, duplicate_rate: float,
+                     out_of_order_rate: float, seed: int) -> list:
+    """
+    Gera tráfego de webhooks realista, na ordem de entrega.
+
+    Até `concurrency` conversas ficam ativas ao mesmo tempo, com os eventos delas
+    intercalados; cada conversa é criada, recebe `messages` mensagens e é fechada.
+    Uma fração `duplicate_rate` dos eventos é reentregue mais adiante, e uma fração
+    `out_of_order_rate` é entregue depois de eventos posteriores (mensagens antes da
+    conversa, depois do fechamento etc.). A mesma semente gera o mesmo tráfego
+    (intercalação, reentregas e atrasos), com IDs novos a cada execução, para que
+    rodadas seguidas não sejam descartadas como reentregas.
+
+    Returns:
+        list: Eventos no formato recebido pelo endpoint de webhook.
+    """
+    rng = random.Random(seed)
+    clock = timezone.now() - timedelta(hours=1)
+    scripts = [[] for _ in range(conversations)]
+    pending = list(range(conversations))
+    active = []
+    events = []
+    while pending or active:
+        while pending and len(active) < concurrency:
+            active.append(pending.pop(0))
+        index = rng.choice(active)
+        script = scripts[index]
+        clock += timedelta(milliseconds=rng.randint(1, 500))
+        event = _next_event(script, messages, clock.isoformat(), rng)
+        script.append(event)
+        events.append(event)
+        if event['type'] == 'CLOSE_CONVERSATION':
+            active.remove(index)
+
+    delivered = list(events)
+    for position in range(len(events)):
+        if rng.random() < out_of_order_rate and position < len(delivered) - 1:
+            later = rng.randint(position + 1, min(position + concurrency, len(delivered) - 1))
+            delivered[position], delivered[later] = delivered[later], delivered[position]
+    redeliveries = {}
+    for position, event in enumerate(delivered):
+        if rng.random() < duplicate_rate:
+            redeliveries.setdefault(rng.randint(position, len(delivered) - 1), []).append(event)
+    traffic = []
+    for position, event in enumerate(delivered):
+        traffic.append(event)
+        traffic.extend(redeliveries.get(position, []))
+    return traffic
+
+
+def _next_event(script: list, messages: int, timestamp: str, rng: random.Random) -> dict:
+    if not script:
+        return {'type': 'NEW_CONVERSATION', 'timestamp': timestamp, 'data': {'id': str(uuid.uuid4())}}
+    conversation_id = script[0]['data']['id']
+    if len(script) > messages:
+        return {'type': 'CLOSE_CONVERSATION', 'timestamp': timestamp, 'data': {'id': conversation_id}}
+    return {'type': 'NEW_MESSAGE', 'timestamp': timestamp, 'data': {
+        'id': str(uuid.uuid4()),
+        'direction': rng.choice(['SENT', 'RECEIVED']),
+        'content': rng.choice(CONTENTS),
+        'conversation_id': conversation_id,
+    }}
+
+
+def percentile(values: list, fraction: float) -> float:
+    """Percentil por posição mais próxima de uma lista já ordenada."""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, max(0, round(fraction * len(values)) - 1))]
+
+
+class Command(BaseCommand):
+    """
+    Mede a ingestão de webhooks de ponta a ponta com tráfego sintético realista.
+
+    O tráfego (ver `generate_traffic`) é enviado evento a evento por dois caminhos:
+    `view`, pelo endpoint `WebhookViewSet.webhook` (autenticação, validação,
+    deduplicação e a tarefa executada em modo eager), e `task`, direto pela tarefa
+    `process_webhook` com eventos já validados. Para cada caminho são medidos
+    eventos/s, latência por evento (p50/p95/p99) e comandos SQL por evento.
+
+    Roda contra o banco configurado, sem broker: use `settings_ci` (SQLite, cache em
+    memória) ou um PostgreSQL local. Os dados gerados são apagados ao final, a menos
+    que `--keep` seja informado. O limitador de taxa fica desativado durante a medição.
+
+    Exemplo:
+        DJANGO_SETTINGS_MODULE=realmate_challenge.settings_ci \\
+            python manage.py benchmark_ingestion --conversations 500 --output bench.json --compare baseline.json
+    """
+    help = 'Mede eventos/s, latência e consultas por evento da ingestão de webhooks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--conversations', type=int, default=200)
+        parser.add_argument('--messages', type=int, default=10, help='Mensagens por conversa')
+        parser.add_argument('--concurrency', type=int, default=50, help='Conversas ativas ao mesmo tempo')
+        parser.add_argument('--duplicate-rate', type=float, default=0.05)
+        parser.add_argument('--out-of-order-rate', type=float, default=0.05)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--target', choices=TARGETS + ('both',), default='both')
+        parser.add_argument('--tenant', help='Slug da origem que envia os eventos')
+        parser.add_argument('--output', help='Arquivo JSON com os resultados')
+        parser.add_argument('--compare', help='Arquivo JSON de uma execução anterior, para comparação')
+        parser.add_argument('--keep', action='store_true', help='Mantém no banco os dados gerados')
+
+    def handle(self, *args, **options):
+        tenant = self._validate(options)
+        baseline = self._load(options['compare']) if options['compare'] else None
+
+        workload = {key: options[key] for key in (
+            'conversations', 'messages', 'concurrency', 'duplicate_rate', 'out_of_order_rate', 'seed'
+        )}
+        report = {
+            'started_at': timezone.now().isoformat(),
+            'environment': {
+                'database': connection.vendor,
+                'python': platform.python_version(),
+                'django': django.get_version(),
+            },
+            'workload': workload,
+            'targets': {},
+        }
+        targets = TARGETS if options['target'] == 'both' else (options['target'],)
+        # Tarefas executadas no próprio processo, com as falhas registradas em vez de propagadas
+        eager = {'CELERY_TASK_ALWAYS_EAGER': True, 'CELERY_TASK_EAGER_PROPAGATES': False}
+        with override_settings(WEBHOOK_RATE_LIMITER='', **eager):
+            for target in targets:
+                events = generate_traffic(**workload)
+                try:
+                    report['targets'][target] = getattr(self, f'_run_{target}')(events, tenant)
+                finally:
+                    if not options['keep']:
+                        self._cleanup(events)
+
+        for target, result in report['targets'].items():
+            self._print(target, result, (baseline or {}).get('targets', {}).get(target))
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2)
+            self.stdout.write(f"Results saved to {options['output']}")
+
+    @staticmethod
+    def _validate(options: dict):
+        """Valida as opções e retorna a origem informada em --tenant, se houver."""
+        for option in ('conversations', 'messages', 'concurrency'):
+            if options[option] <= 0:
+                raise CommandError(f'--{option} must be positive')
+        for option in ('duplicate_rate', 'out_of_order_rate'):
+            if not 0 <= options[option] <= 1:
+                raise CommandError(f'--{option.replace("_", "-")} must be between 0 and 1')
+        if not options['tenant']:
+            return None
+        tenant = Tenant.objects.filter(slug=options['tenant']).first()
+        if tenant is None:
+            raise CommandError(f"Unknown tenant '{options['tenant']}'")
+        return tenant
+
+    def _run_view(self, events: list, tenant) -> dict:
+        view = WebhookViewSet.as_view({'post': 'webhook'})
+        factory = APIRequestFactory()
+        headers = {TENANT_HEADER: tenant.slug} if tenant else {}
+
+        def send(event):
+            body = json.dumps(event).encode()
+            request = factory.post(
+                '/webhooks/webhook/', body, content_type='application/json',
+                headers={'Authorization': self._authorization(body, tenant), **headers}
+            )
+            return str(view(request).status_code)
+        return self._measure(events, send)
+
+    def _run_task(self, events: list, tenant) -> dict:
+        tenant_id = tenant.pk if tenant else None
+        validated = [validate_event(event, tenant_id) for event in events]
+
+        def send(event):
+            return 'processed' if process_webhook.apply(args=[event], throw=False).successful() else 'failed'
+        return self._measure(validated, send)
+
+    @staticmethod
+    def _measure(events: list, send) -> dict:
+        latencies = []
+        outcomes = {}
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            started = time.perf_counter()
+            for event in events:
+                sent = time.perf_counter()
+                outcome = send(event)
+                latencies.append(time.perf_counter() - sent)
+                outcomes[outcome] = outcomes.get(outcome, 0) + 1
+            elapsed = time.perf_counter() - started
+        latencies.sort()
+        return {
+            'events': len(events),
+            'elapsed_seconds': round(elapsed, 4),
+            'events_per_second': round(len(events) / elapsed, 1),
+            'latency_ms': {
+                name: round(percentile(latencies, fraction) * 1000, 3)
+                for name, fraction in (('p50', 0.5), ('p95', 0.95), ('p99', 0.99), ('max', 1.0))
+            },
+            'queries_per_event': round(counter.count / len(events), 2),
+            'outcomes': outcomes,
+        }
+
+    @staticmethod
+    def _authorization(body: bytes, tenant) -> str:
+        if project_settings.DEBUG:
+            return tenant.secret if tenant else project_settings.WEBHOOK_API_KEY
+        secret = tenant.secret if tenant else project_settings.WEBHOOK_SECRET
+        return 'HMAC ' + hmac.new(secret.encode('utf-8'), msg=body, digestmod=hashlib.sha256).hexdigest()
+
+    @staticmethod
+    def _cleanup(events: list) -> None:
+        conversation_ids = {event['data']['id'] for event in events if event['type'] == 'NEW_CONVERSATION'}
+        PendingEvent.objects.filter(conversation_id__in=conversation_ids).delete()
+        Conversation.objects.filter(id__in=conversation_ids).delete()
+
+    @staticmethod
+    def _load(path: str) -> dict:
+        try:
+            with open(path) as baseline:
+                return json.load(baseline)
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Cannot read {path}: {e}')
+
+    def _print(self, target: str, result: dict, baseline: dict = None):
+        latency = result['latency_ms']
+        self.stdout.write(
+            f"{target:>5}: {result['events_per_second']:,.0f} events/s, "
+            f"p50 {latency['p50']:.2f} ms, p95 {latency['p95']:.2f} ms, p99 {latency['p99']:.2f} ms, "
+            f"{result['queries_per_event']:.2f} queries/event, outcomes {result['outcomes']}"
+        )
+        if baseline:
+            events_per_second = self._change(result['events_per_second'], baseline['events_per_second'])
+            self.stdout.write(
+                f"       vs baseline: events/s {events_per_second}, "
+                f"p95 {self._change(latency['p95'], baseline['latency_ms']['p95'])}, "
+                f"queries/event {self._change(result['queries_per_event'], baseline['queries_per_event'])}"
+            )
+
+    @staticmethod
+    def _change(current: float, previous: float) -> str:
+        if not previous:
+            return 'n/a'
+        return f'{(current - previous) / previous * 100:+.1f}%'
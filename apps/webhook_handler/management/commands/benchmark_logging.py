@@ -0,0 +1,147 @@
+import logging
+import os
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.webhook_handler import logs
+
+TEXT_FORMAT = '[{levelname}] {asctime} {module} [{correlation_id}] - {message}'
+
+MODES = ('eager', 'text', 'json', 'sampled')
+
+
+def log_event_eager(logger: logging.Logger, data: dict) -> None:
+    """Linhas registradas por evento antes da mudança: f-strings, inclusive o payload em DEBUG."""
+    logger.info(f"Processing webhook event: {data['type']}")
+    logger.debug(f"Executing handler for {data['type']} with data: {data}")
+    logger.info(f"Creating new message {data['data']['id']} for conversation {data['data']['conversation_id']}")
+    logger.info(f"Message {data['data']['id']} created successfully in conversation {data['data']['conversation_id']}")
+    logger.info(f"Successfully processed {data['type']} event")
+
+
+def log_event(logger: logging.Logger, data: dict) -> None:
+    """Linhas registradas por evento por `process_webhook` e `WebhookService.create_message`."""
+    logger.info("Processing webhook event: %s", data['type'])
+    logger.debug("Executing handler for %s event %s", data['type'], data['data']['id'])
+    logger.info("Creating new message %s for conversation %s", data['data']['id'], data['data']['conversation_id'])
+    logger.info(
+        "Message %s created successfully in conversation %s", data['data']['id'], data['data']['conversation_id']
+    )
+    logger.info("Successfully processed %s event", data['type'])
+
+
+class SlowStream:
+    """Destino que demora `latency` segundos por escrita, como um pipe de logs congestionado."""
+
+    def __init__(self, stream, latency: float):
+        self.stream = stream
+        self.latency = latency
+
+    def write(self, text: str) -> int:
+        time.sleep(self.latency)
+        return self.stream.write(text)
+
+    def flush(self) -> None:
+        self.stream.flush()
+
+
+class Command(BaseCommand):
+    """
+    Mede o custo dos logs por evento de webhook, na thread que registra.
+
+    Emite, para cada evento sintético, as linhas que `process_webhook` registra, em
+    quatro configurações:
+
+    - `eager`: configuração anterior (f-strings, nível DEBUG, StreamHandler síncrono);
+    - `text`: mensagens formatadas sob demanda, nível INFO, StreamHandler síncrono;
+    - `json`: formato JSON com `QueueStreamHandler` (formatação e escrita em outra thread);
+    - `sampled`: `json` mantendo só `--sample-rate` das linhas INFO/DEBUG.
+
+    O tempo reportado é o da thread que registra (requisição ou tarefa); para os
+    handlers com fila, o tempo até a fila esvaziar é reportado à parte. Com
+    `--write-latency-us`, cada escrita no destino demora o tempo informado, simulando
+    um coletor de logs lento.
+
+    Exemplo:
+        python manage.py benchmark_logging --events 20000 --stream /tmp/bench.log
+    """
+    help = 'Mede o custo por evento dos logs de webhook em cada configuração'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=10000)
+        parser.add_argument('--stream', default=os.devnull, help='Arquivo de destino dos logs')
+        parser.add_argument('--sample-rate', type=float, default=0.1)
+        parser.add_argument('--queue-size', type=int, default=10000, help='Capacidade da fila do QueueStreamHandler')
+        parser.add_argument('--write-latency-us', type=float, default=0, help='Atraso de cada escrita no destino')
+        parser.add_argument('--mode', choices=MODES, action='append', help='Configurações medidas (padrão: todas)')
+
+    def handle(self, *args, **options):
+        if options['events'] <= 0 or options['queue_size'] <= 0:
+            raise CommandError('--events and --queue-size must be positive')
+        if options['write_latency_us'] < 0:
+            raise CommandError('--write-latency-us must not be negative')
+        if not 0 <= options['sample_rate'] <= 1:
+            raise CommandError('--sample-rate must be between 0 and 1')
+        events = [{
+            'type': 'NEW_MESSAGE',
+            'timestamp': '2025-02-21T10:20:42.349308',
+            'data': {
+                'id': str(uuid.uuid4()),
+                'direction': 'RECEIVED',
+                'content': 'Olá, tudo bem? Gostaria de saber o status do meu pedido.',
+                'conversation_id': str(uuid.uuid4()),
+            },
+        } for _ in range(options['events'])]
+
+        with open(options['stream'], 'w') as output:
+            stream = SlowStream(output, options['write_latency_us'] / 1e6) if options['write_latency_us'] else output
+            for mode in options['mode'] or MODES:
+                self._print(mode, self._run(mode, events, stream, options))
+
+    @staticmethod
+    def _handler(mode: str, stream, options: dict) -> logging.Handler:
+        if mode in ('eager', 'text'):
+            handler = logging.StreamHandler(stream)
+            handler.setFormatter(logging.Formatter(TEXT_FORMAT, style='{'))
+        else:
+            handler = logs.QueueStreamHandler(stream, maxsize=options['queue_size'])
+            handler.setFormatter(logs.JsonFormatter())
+        handler.addFilter(logs.CorrelationIdFilter())
+        if mode == 'sampled':
+            handler.addFilter(logs.SamplingFilter({'webhook_handler': options['sample_rate']}))
+        return handler
+
+    def _run(self, mode: str, events: list, stream, options: dict) -> dict:
+        logger = logging.getLogger(f'webhook_handler.benchmark.{mode}')
+        logger.setLevel(logging.DEBUG if mode == 'eager' else logging.INFO)
+        logger.propagate = False
+        handler = self._handler(mode, stream, options)
+        logger.addHandler(handler)
+        emit = log_event_eager if mode == 'eager' else log_event
+        try:
+            started = time.perf_counter()
+            for event in events:
+                with logs.correlation(logs.new_correlation_id()):
+                    emit(logger, event)
+            elapsed = time.perf_counter() - started
+            drained = time.perf_counter()
+            if isinstance(handler, logs.QueueStreamHandler):
+                handler.stop()
+            drain = time.perf_counter() - drained
+        finally:
+            logger.removeHandler(handler)
+            handler.close()
+        stream.flush()
+        return {
+            'us_per_event': elapsed / len(events) * 1e6,
+            'drain_seconds': drain,
+            'dropped': getattr(handler, 'dropped', 0),
+        }
+
+    def _print(self, mode: str, result: dict):
+        self.stdout.write(
+            f"{mode:>7}: {result['us_per_event']:.1f} us/event in the caller, "
+            f"drain {result['drain_seconds']:.3f} s, dropped {result['dropped']}"
+        )
@@ -0,0 +1,84 @@
+import json
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.webhook_handler.serializers import WebhookSerializer
+from apps.webhook_handler.validators import EventValidationError, validate_event
+
+
+def sample_events(count: int) -> list:
+    """
+    Gera eventos válidos dos três tipos, na proporção típica de tráfego (uma conversa a cada 8 mensagens).
+    """
+    events = []
+    conversation_id = None
+    for index in range(count):
+        if index % 10 == 0:
+            conversation_id = str(uuid.uuid4())
+            events.append({'type': 'NEW_CONVERSATION', 'timestamp': '2025-02-21T10:20:41.349308',
+                           'data': {'id': conversation_id}})
+        elif index % 10 == 9:
+            events.append({'type': 'CLOSE_CONVERSATION', 'timestamp': '2025-02-21T10:30:41.349308Z',
+                           'data': {'id': conversation_id}})
+        else:
+            events.append({'type': 'NEW_MESSAGE', 'timestamp': '2025-02-21T10:20:42.349308-03:00',
+                           'data': {'id': str(uuid.uuid4()), 'direction': 'RECEIVED',
+                                    'content': 'Olá, tudo bem?', 'conversation_id': conversation_id}})
+    return events
+
+
+class Command(BaseCommand):
+    """
+    Compara o custo de validação do WebhookSerializer com o de `validate_event`.
+
+    Cada evento é decodificado do JSON e validado, como acontece em uma requisição.
+
+    Exemplo:
+        python manage.py benchmark_validation --events 20000 --repeat 3
+    """
+    help = 'Mede eventos/s da validação de webhooks (WebhookSerializer vs validate_event)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=3, help='Rodadas por validador (vale a melhor)')
+
+    def handle(self, *args, **options):
+        if options['events'] <= 0 or options['repeat'] <= 0:
+            raise CommandError('--events and --repeat must be positive')
+        bodies = [json.dumps(event).encode() for event in sample_events(options['events'])]
+
+        timings = {
+            'serializer': self._best_of(options['repeat'], bodies, self._validate_with_serializer),
+            'validate_event': self._best_of(options['repeat'], bodies, self._validate_fast),
+        }
+        for name, elapsed in timings.items():
+            self.stdout.write(
+                f'{name:>15}: {len(bodies) / elapsed:,.0f} events/s ({elapsed / len(bodies) * 1e6:.1f} µs/event)'
+            )
+        self.stdout.write(f'speedup: {timings["serializer"] / timings["validate_event"]:.1f}x')
+
+    @staticmethod
+    def _best_of(repeat: int, bodies: list, validate) -> float:
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            for body in bodies:
+                validate(body)
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    @staticmethod
+    def _validate_with_serializer(body: bytes):
+        serializer = WebhookSerializer(data=json.loads(body))
+        if not serializer.is_valid():
+            raise CommandError(f'Sample event rejected by WebhookSerializer: {serializer.errors}')
+
+    @staticmethod
+    def _validate_fast(body: bytes):
+        try:
+            validate_event(json.loads(body))
+        except EventValidationError as e:
+            raise CommandError(f'Sample event rejected by validate_event: {e.errors}')
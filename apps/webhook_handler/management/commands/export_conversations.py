@@ -0,0 +1,49 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+
+from apps.webhook_handler.exporters import export_records, iter_ndjson
+from apps.webhook_handler.models import Conversation
+
+
+class Command(BaseCommand):
+    """
+    Exporta conversas e mensagens em NDJSON, com uso de memória constante.
+
+    Exemplo:
+        python manage.py export_conversations --output conversas.ndjson.gz --gzip --since 2025-02-01T00:00:00Z
+    """
+    help = 'Exporta conversas e mensagens em NDJSON (opcionalmente gzip)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help='Arquivo de saída (padrão: stdout)')
+        parser.add_argument('--gzip', action='store_true', help='Comprime a saída em gzip')
+        parser.add_argument('--state', choices=[Conversation.OPEN_CHOICE, Conversation.CLOSED_CHOICE])
+        parser.add_argument('--since', help='Data/hora ISO 8601 inicial (inclusiva)')
+        parser.add_argument('--until', help='Data/hora ISO 8601 final (exclusiva)')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        since = self._parse_datetime(options['since'], 'since')
+        until = self._parse_datetime(options['until'], 'until')
+        records = export_records(
+            state=options['state'], since=since, until=until, chunk_size=options['chunk_size']
+        )
+
+        output = open(options['output'], 'wb') if options['output'] else sys.stdout.buffer
+        try:
+            for chunk in iter_ndjson(records, compress=options['gzip']):
+                output.write(chunk)
+        finally:
+            if options['output']:
+                output.close()
+
+    @staticmethod
+    def _parse_datetime(value, name):
+        if value is None:
+            return None
+        parsed = parse_datetime(value)
+        if parsed is None:
+            raise CommandError(f'Invalid datetime for --{name}: {value}')
+        return parsed
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.webhook_handler import partitioning
+
+
+class Command(BaseCommand):
+    """
+    Cria as partições mensais futuras da tabela de mensagens e arquiva as que saíram da retenção.
+
+    A mesma manutenção roda diariamente pelo celery beat (`maintain-message-partitions`)
+    com os valores das settings; o comando permite rodá-la sob demanda ou com outros
+    parâmetros. Fora do PostgreSQL, não faz nada.
+
+    Exemplo:
+        python manage.py maintain_message_partitions --retention-months 12 --dry-run
+    """
+    help = 'Cria partições futuras de mensagens e arquiva as partições expiradas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months-ahead', type=int, help='Meses futuros com partição (padrão: settings)')
+        parser.add_argument('--retention-months', type=int, help='Meses mantidos no banco; 0 mantém todos')
+        parser.add_argument('--archive-dir', help='Diretório dos arquivos exportados (padrão: settings)')
+        parser.add_argument('--dry-run', action='store_true', help='Apenas lista as partições que seriam arquivadas')
+
+    def handle(self, *args, **options):
+        for option in ('months_ahead', 'retention_months'):
+            if options[option] is not None and options[option] < 0:
+                raise CommandError(f'--{option.replace("_", "-")} must not be negative')
+        if not partitioning.is_partitioned():
+            self.stdout.write('Message table is not partitioned; nothing to do')
+            return
+
+        if options['dry_run']:
+            for name in partitioning.expired_partitions(options['retention_months']):
+                self.stdout.write(f'Would archive {name}')
+            return
+
+        result = partitioning.maintain_partitions(
+            options['months_ahead'], options['retention_months'], options['archive_dir']
+        )
+        for name in result['created']:
+            self.stdout.write(f'Created {name}')
+        for path in result['archived']:
+            self.stdout.write(f'Archived {path}')
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(result['created'])} partitions created, {len(result['archived'])} archived"
+        ))
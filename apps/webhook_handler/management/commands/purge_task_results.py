@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.webhook_handler.status import purge_task_results
+
+
+class Command(BaseCommand):
+    """
+    Remove os registros antigos de TaskResult gravados pelo django-celery-results.
+
+    A mesma limpeza roda periodicamente pelo celery beat (`purge-task-results`);
+    o comando serve para limpezas pontuais, por exemplo após trocar WEBHOOK_RESULT_MODE.
+
+    Exemplo:
+        python manage.py purge_task_results --older-than 3600
+    """
+    help = 'Remove registros de TaskResult mais antigos que CELERY_RESULT_EXPIRES'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int, help='Idade mínima em segundos (padrão: CELERY_RESULT_EXPIRES)')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if options['batch_size'] <= 0:
+            raise CommandError('--batch-size must be positive')
+        removed = purge_task_results(options['older_than'], options['batch_size'])
+        self.stdout.write(f'Removed {removed} task results')
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.webhook_handler import summaries
+
+
+class Command(BaseCommand):
+    """
+    Recalcula o resumo das conversas (contagem e última mensagem) a partir da tabela de mensagens.
+
+    A ingestão mantém o resumo a cada escrita; o comando corrige divergências, por
+    exemplo após apagar mensagens manualmente. Mensagens de partições arquivadas
+    continuam contadas. As conversas são processadas em lotes, cada um em sua própria
+    transação.
+
+    Exemplo:
+        python manage.py reconcile_conversation_summaries --batch-size 1000 --dry-run
+    """
+    help = 'Recalcula os campos de resumo das conversas a partir das mensagens'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Conversas por transação')
+        parser.add_argument('--dry-run', action='store_true', help='Apenas conta as conversas divergentes')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+        checked, drifted = summaries.reconcile(options['batch_size'], options['dry_run'])
+        verb = 'would be fixed' if options['dry_run'] else 'fixed'
+        self.stdout.write(self.style.SUCCESS(f'{checked} conversations checked, {drifted} {verb}'))
@@ -0,0 +1,87 @@
+import multiprocessing
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from apps.webhook_handler.models import Tenant
+from apps.webhook_handler.replay import CheckpointMismatch, ReplayStats, WebhookReplayer, check_checkpoints
+
+# Saída de progresso dos processos filhos, herdada no fork (ver `_init_worker`)
+_progress = None
+
+
+def _init_worker(progress) -> None:
+    global _progress
+    _progress = progress
+
+
+def _run_worker(options: dict) -> ReplayStats:
+    return WebhookReplayer(progress=_progress, **options).run()
+
+
+class Command(BaseCommand):
+    """
+    Reaplica eventos de webhook gravados em JSONL (um evento por linha).
+
+    Exemplo:
+        python manage.py replay_webhooks eventos.jsonl --batch-size 5000 --workers 4 --checkpoint replay.ckpt
+    """
+    help = 'Reaplica um arquivo JSONL de eventos de webhook em lotes transacionais'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Arquivo JSONL com um evento de webhook por linha')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Eventos por transação')
+        parser.add_argument('--workers', type=int, default=1, help='Processos paralelos, particionados por conversa')
+        parser.add_argument('--checkpoint', help='Arquivo de checkpoint para retomar uma execução interrompida')
+        parser.add_argument('--tenant', help='Slug da origem à qual os eventos pertencem')
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        if workers < 1:
+            raise CommandError('--workers must be at least 1')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+        if options['checkpoint']:
+            try:
+                check_checkpoints(options['checkpoint'], options['path'], workers)
+            except CheckpointMismatch as e:
+                raise CommandError(f'{e}; use the same file and --workers, or remove the checkpoint')
+        tenant_id = None
+        if options['tenant']:
+            tenant_id = Tenant.objects.filter(slug=options['tenant']).values_list('pk', flat=True).first()
+            if tenant_id is None:
+                raise CommandError(f"Unknown tenant: {options['tenant']}")
+        worker_options = [
+            {
+                'path': options['path'],
+                'batch_size': options['batch_size'],
+                'checkpoint': options['checkpoint'],
+                'worker_index': index,
+                'worker_count': workers,
+                'tenant_id': tenant_id,
+            }
+            for index in range(workers)
+        ]
+
+        if workers == 1:
+            results = [WebhookReplayer(progress=self._progress, **worker_options[0]).run()]
+        else:
+            # Cada processo filho precisa abrir sua própria conexão com o banco
+            connections.close_all()
+            with multiprocessing.get_context('fork').Pool(
+                workers, initializer=_init_worker, initargs=(self._progress,)
+            ) as pool:
+                results = pool.map(_run_worker, worker_options)
+
+        total = ReplayStats()
+        for stats in results:
+            total.merge(stats)
+        self.stdout.write(self.style.SUCCESS(
+            f'Replayed {total.applied} events in {total.elapsed:.1f}s ({total.throughput:.0f} events/s): '
+            f'{total.failed} failed, {total.invalid} invalid'
+        ))
+
+    def _progress(self, message: str) -> None:
+        # Os processos filhos podem ser encerrados sem esvaziar o buffer da saída
+        self.stdout.write(message)
+        self.stdout.flush()
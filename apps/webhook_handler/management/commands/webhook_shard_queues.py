@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.webhook_handler.routing import queues_for_worker, sharding_enabled
+
+
+class Command(BaseCommand):
+    """
+    Imprime as filas de shard que um worker deve consumir, no formato aceito por `celery worker -Q`.
+
+    Exemplo:
+        celery -A realmate_challenge worker -c 1 --prefetch-multiplier 1 \\
+            -Q $(python manage.py webhook_shard_queues --worker-index 0 --worker-count 2)
+    """
+    help = 'Lista as filas de shard atribuídas a um worker Celery'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--worker-index', type=int, required=True)
+        parser.add_argument('--worker-count', type=int, required=True)
+
+    def handle(self, *args, **options):
+        if not sharding_enabled():
+            raise CommandError('Sharding is disabled (WEBHOOK_SHARD_COUNT=0)')
+        try:
+            queues = queues_for_worker(options['worker_index'], options['worker_count'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        if not queues:
+            raise CommandError('No shards assigned to this worker; worker count must not exceed WEBHOOK_SHARD_COUNT')
+        self.stdout.write(','.join(queues))
@@ -0,0 +1,342 @@
+import atexit
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import connection
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from .redis_client import get_redis
+from .validators import EVENT_SCHEMAS
+
+logger = logging.getLogger('webhook_handler')
+
+EVENTS_RECEIVED = 'events_received'
+EVENTS_DUPLICATE = 'events_duplicate'
+CONVERSATION_CACHE_HITS = 'conversation_cache_hits'
+CONVERSATION_CACHE_MISSES = 'conversation_cache_misses'
+
+# Série do armazenamento de métricas com os contadores de `increment`: campos `<nome>|` e `<nome>|<origem>`
+SHARED_COUNTERS_SERIES = 'webhook_shared_counters'
+
+
+def increment(name: str, amount: int = 1, tenant=None) -> None:
+    """
+    Incrementa um contador compartilhado entre todos os processos web e workers.
+
+    Com `tenant` (ID da origem), incrementa também o contador da origem. Como as
+    métricas de /metrics, o incremento é acumulado na memória do processo e descarregado
+    por `flush`, sem ida ao Redis por evento; uma falha do Redis não afeta a ingestão.
+    """
+    if not amount:
+        return
+    values = {(SHARED_COUNTERS_SERIES, f'{name}|'): amount}
+    if tenant is not None:
+        values[(SHARED_COUNTERS_SERIES, f'{name}|{tenant}')] = amount
+    _add(values)
+
+
+def get_counters(names: list, tenant=None) -> dict:
+    """
+    Retorna o valor atual dos contadores informados (zero para os que nunca foram incrementados).
+
+    Com `tenant` (ID da origem), retorna os contadores daquela origem. Descarrega antes
+    os incrementos do próprio processo; os dos demais aparecem em até
+    WEBHOOK_METRICS_FLUSH_SECONDS.
+    """
+    flush()
+    series = get_store().read([SHARED_COUNTERS_SERIES])[SHARED_COUNTERS_SERIES]
+    suffix = '' if tenant is None else tenant
+    return {name: int(series.get(f'{name}|{suffix}', 0)) for name in names}
+
+
+# Métricas do endpoint /metrics (formato Prometheus)
+
+STAGE_DURATION = 'webhook_stage_duration_seconds'
+QUEUE_LAG = 'webhook_queue_lag_seconds'
+TASK_DB_QUERIES = 'webhook_task_db_queries'
+EVENT_FAILURES = 'webhook_event_failures_total'
+DB_CONNECTIONS_OPENED = 'webhook_db_connections_opened_total'
+DB_CHECKOUTS = 'webhook_db_connection_checkouts_total'
+DB_CONNECT_WAIT = 'webhook_db_connect_wait_seconds'
+DB_READ_ROUTES = 'webhook_db_read_routes_total'
+
+# Etapas da ingestão medidas em STAGE_DURATION
+STAGE_AUTHENTICATION = 'authentication'
+STAGE_VALIDATION = 'validation'
+STAGE_DEDUP = 'dedup'
+STAGE_PUBLISH = 'publish'
+STAGE_PROCESSING = 'processing'
+
+# Rótulo `event_type` de lotes e de etapas anteriores à leitura do evento
+BATCH = 'batch'
+UNKNOWN = 'unknown'
+
+# Motivos de EVENT_FAILURES
+FAILURE_INVALID = 'invalid'
+FAILURE_DUPLICATE = 'duplicate'
+FAILURE_NOT_FOUND = 'not_found'
+FAILURE_CLOSED = 'closed_conversation'
+FAILURE_UNAUTHORIZED = 'unauthorized'
+FAILURE_THROTTLED = 'throttled'
+FAILURE_ERROR = 'error'
+
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+LAG_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+QUERY_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 250, 1000)
+
+HISTOGRAMS = {
+    STAGE_DURATION: ('Time spent in each webhook ingestion stage', DURATION_BUCKETS),
+    QUEUE_LAG: ('Time between publishing a webhook task and a worker starting it', LAG_BUCKETS),
+    TASK_DB_QUERIES: ('SQL statements executed per webhook task', QUERY_BUCKETS),
+    DB_CONNECT_WAIT: ('Time a webhook task waited for a new database connection', DURATION_BUCKETS),
+}
+COUNTERS = {
+    EVENT_FAILURES: 'Webhook events rejected or failed, by reason',
+    DB_CONNECTIONS_OPENED: 'Database connections opened, by process role',
+    DB_CHECKOUTS: 'Webhook tasks that reused a persistent database connection or opened a new one',
+    DB_READ_ROUTES: 'API reads routed to a replica or kept on the primary, by reason',
+}
+# Contadores de `increment` também expostos em /metrics
+SHARED_COUNTERS = {
+    EVENTS_RECEIVED: ('webhook_events_received_total', 'Webhook events received'),
+    EVENTS_DUPLICATE: ('webhook_events_duplicate_total', 'Webhook events discarded as redeliveries'),
+    CONVERSATION_CACHE_HITS: ('webhook_conversation_cache_hits_total', 'Conversation detail cache hits'),
+    CONVERSATION_CACHE_MISSES: ('webhook_conversation_cache_misses_total', 'Conversation detail cache misses'),
+}
+
+PROMETHEUS_KEY = 'webhook:metrics:prometheus:{}'
+
+
+class BaseMetricsStore:
+    """
+    Armazenamento das séries agregadas entre processos.
+
+    Cada métrica é um mapa de campo (rótulos e sufixo) para valor; os processos só
+    somam valores, o que torna a agregação independente da ordem das descargas.
+    """
+
+    def add(self, values: dict) -> None:
+        """Soma `values` ({(métrica, campo): quantidade}) às séries armazenadas."""
+        raise NotImplementedError
+
+    def read(self, names: list) -> dict:
+        """Retorna {métrica: {campo: valor}} das métricas informadas."""
+        raise NotImplementedError
+
+
+class RedisMetricsStore(BaseMetricsStore):
+    """Séries em um hash do Redis por métrica, somadas com HINCRBYFLOAT em um único pipeline."""
+
+    def add(self, values: dict) -> None:
+        pipeline = get_redis().pipeline(transaction=False)
+        for (name, field), amount in values.items():
+            pipeline.hincrbyfloat(PROMETHEUS_KEY.format(name), field, amount)
+        pipeline.execute()
+
+    def read(self, names: list) -> dict:
+        pipeline = get_redis().pipeline(transaction=False)
+        for name in names:
+            pipeline.hgetall(PROMETHEUS_KEY.format(name))
+        return {
+            name: {field.decode(): float(value) for field, value in series.items()}
+            for name, series in zip(names, pipeline.execute())
+        }
+
+
+class LocalMetricsStore(BaseMetricsStore):
+    """Séries em memória, restritas ao processo (desenvolvimento e testes)."""
+
+    def __init__(self):
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def add(self, values: dict) -> None:
+        with self._lock:
+            for (name, field), amount in values.items():
+                series = self._series.setdefault(name, {})
+                series[field] = series.get(field, 0) + amount
+
+    def read(self, names: list) -> dict:
+        with self._lock:
+            return {name: dict(self._series.get(name, {})) for name in names}
+
+
+_store = None
+_buffer = {}
+_buffer_lock = threading.Lock()
+_last_flush = time.monotonic()
+
+
+def get_store() -> BaseMetricsStore:
+    """Retorna o armazenamento configurado em WEBHOOK_METRICS_STORE."""
+    global _store
+    if _store is None:
+        _store = import_string(settings.WEBHOOK_METRICS_STORE)()
+    return _store
+
+
+@receiver(setting_changed)
+def reset_store(setting, **kwargs):
+    """Recria o armazenamento quando a configuração muda (por exemplo, em testes)."""
+    global _store
+    if setting == 'WEBHOOK_METRICS_STORE':
+        _store = None
+
+
+def event_type_label(value) -> str:
+    """Rótulo `event_type` de um evento, limitado aos tipos conhecidos para não multiplicar as séries."""
+    return value if isinstance(value, str) and value in EVENT_SCHEMAS else UNKNOWN
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels: dict) -> str:
+    return ','.join(f'{name}="{_escape(value)}"' for name, value in sorted(labels.items()))
+
+
+def _add(values: dict) -> None:
+    with _buffer_lock:
+        for key, amount in values.items():
+            _buffer[key] = _buffer.get(key, 0) + amount
+    if time.monotonic() - _last_flush >= settings.WEBHOOK_METRICS_FLUSH_SECONDS:
+        flush()
+
+
+def count(name: str, amount: int = 1, **labels) -> None:
+    """Soma `amount` a um contador de /metrics."""
+    if settings.WEBHOOK_METRICS_ENABLED and amount:
+        _add({(name, f'{_labels(labels)}|'): amount})
+
+
+def observe(name: str, value: float, **labels) -> None:
+    """
+    Registra uma observação em um histograma de /metrics.
+
+    As observações são acumuladas na memória do processo e somadas ao armazenamento
+    compartilhado no máximo a cada WEBHOOK_METRICS_FLUSH_SECONDS, em um único pipeline:
+    o custo por observação é o de algumas operações em um dicionário.
+    """
+    if not settings.WEBHOOK_METRICS_ENABLED:
+        return
+    series = _labels(labels)
+    bucket = bisect_left(HISTOGRAMS[name][1], value)
+    _add({(name, f'{series}|{bucket}'): 1, (name, f'{series}|sum'): value, (name, f'{series}|count'): 1})
+
+
+@contextmanager
+def timer(name: str, **labels):
+    """Observa em um histograma a duração do bloco, mesmo que ele termine com exceção."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - started, **labels)
+
+
+def stage(name: str, event_type: str = UNKNOWN):
+    """Mede a duração de uma etapa da ingestão (ver STAGE_DURATION)."""
+    return timer(STAGE_DURATION, stage=name, event_type=event_type)
+
+
+class QueryCounter:
+    """Wrapper de execução que conta os comandos SQL sem guardá-los (ver `connection.execute_wrapper`)."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+@contextmanager
+def track_queries(**labels):
+    """Observa em TASK_DB_QUERIES quantos comandos SQL o bloco executou."""
+    counter = QueryCounter()
+    try:
+        with connection.execute_wrapper(counter):
+            yield
+    finally:
+        observe(TASK_DB_QUERIES, counter.count, **labels)
+
+
+def flush() -> None:
+    """
+    Descarrega no armazenamento compartilhado as métricas acumuladas no processo.
+
+    Uma falha do armazenamento é registrada e as métricas do intervalo são descartadas,
+    sem afetar a ingestão.
+    """
+    global _buffer, _last_flush
+    with _buffer_lock:
+        values, _buffer = _buffer, {}
+        _last_flush = time.monotonic()
+    if not values:
+        return
+    try:
+        get_store().add(values)
+    except Exception as e:
+        logger.warning("Failed to flush %s metric series: %s", len(values), e)
+
+
+atexit.register(flush)
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _series(values: dict) -> dict:
+    """Agrupa os campos de uma métrica por conjunto de rótulos: {rótulos: {sufixo: valor}}."""
+    grouped = {}
+    for field, value in values.items():
+        labels, _, suffix = field.rpartition('|')
+        grouped.setdefault(labels, {})[suffix] = value
+    return grouped
+
+
+def _with_label(labels: str, label: str) -> str:
+    return f'{{{labels},{label}}}' if labels else f'{{{label}}}'
+
+
+def render() -> str:
+    """
+    Gera as métricas no formato de texto do Prometheus (versão 0.0.4).
+
+    Descarrega antes as métricas do próprio processo, para que uma leitura logo após
+    uma requisição já as inclua.
+    """
+    flush()
+    lines = []
+    counters = get_counters(list(SHARED_COUNTERS))
+    for key, (name, help_text) in SHARED_COUNTERS.items():
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter', f'{name} {_number(counters[key])}']
+
+    data = get_store().read(list(COUNTERS) + list(HISTOGRAMS))
+    for name, help_text in COUNTERS.items():
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+        for labels, values in sorted(_series(data[name]).items()):
+            lines.append(f'{name}{{{labels}}} {_number(values[""])}' if labels else f'{name} {_number(values[""])}')
+
+    for name, (help_text, bounds) in HISTOGRAMS.items():
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+        for labels, values in sorted(_series(data[name]).items()):
+            cumulative = 0
+            for index, bound in enumerate(bounds):
+                cumulative += values.get(str(index), 0)
+                le = f'le="{bound:g}"'
+                lines.append(f'{name}_bucket{_with_label(labels, le)} {_number(cumulative)}')
+            le = 'le="+Inf"'
+            lines.append(f'{name}_bucket{_with_label(labels, le)} {_number(values.get("count", 0))}')
+            suffix = f'{{{labels}}}' if labels else ''
+            lines.append(f'{name}_sum{suffix} {_number(values.get("sum", 0))}')
+            lines.append(f'{name}_count{suffix} {_number(values.get("count", 0))}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,45 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from . import logs
+
+
+class CorrelationIdMiddleware:
+    """
+    Define o ID de correlação de cada requisição e o devolve no cabeçalho X-Request-ID.
+
+    Usa o X-Request-ID recebido (de um proxy ou do próprio cliente) quando for válido,
+    ou gera um novo. O ID entra em todos os logs emitidos durante a requisição e é
+    propagado para as tarefas Celery enfileiradas por ela (ver `tasks.stamp_correlation_id`),
+    ligando o registro do webhook ao processamento no worker.
+
+    Funciona tanto em views síncronas quanto assíncronas.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        correlation_id = self._correlation_id(request)
+        with logs.correlation(correlation_id):
+            response = self.get_response(request)
+        response[logs.CORRELATION_HEADER] = correlation_id
+        return response
+
+    async def __acall__(self, request):
+        correlation_id = self._correlation_id(request)
+        with logs.correlation(correlation_id):
+            response = await self.get_response(request)
+        response[logs.CORRELATION_HEADER] = correlation_id
+        return response
+
+    @staticmethod
+    def _correlation_id(request) -> str:
+        correlation_id = logs.clean_correlation_id(request.headers.get(logs.CORRELATION_HEADER))
+        request.correlation_id = correlation_id
+        return correlation_id
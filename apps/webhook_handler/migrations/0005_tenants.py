@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:44
+
+import apps.webhook_handler.models
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webhook_handler', '0004_message_conversation_timestamp_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tenant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slug', models.SlugField(max_length=64, unique=True)),
+                ('name', models.CharField(max_length=255)),
+                ('secret', models.CharField(default=apps.webhook_handler.models.generate_secret, max_length=128)),
+                ('previous_secret', models.CharField(blank=True, max_length=128)),
+                ('is_active', models.BooleanField(default=True)),
+                ('rate_limit', models.FloatField(blank=True, null=True)),
+                ('rate_burst', models.PositiveIntegerField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='tenant',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='conversations', to='webhook_handler.tenant'),
+        ),
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(fields=['tenant', 'created_at'], name='conversation_tenant_idx'),
+        ),
+    ]
@@ -0,0 +1,88 @@
+from django.conf import settings
+from django.db import migrations
+from django.utils import timezone
+
+from apps.webhook_handler.partitioning import (
+    DEFAULT_PARTITION, MESSAGE_TABLE, add_months, create_partition_sql, month_start,
+)
+
+LEGACY_TABLE = f'{MESSAGE_TABLE}_legacy'
+INDEX_NAME = 'message_conversation_ts_idx'
+CONVERSATION_TABLE = 'webhook_handler_conversation'
+
+
+def _months_with_messages(cursor) -> list:
+    cursor.execute(
+        f'SELECT DISTINCT date_trunc(%s, "timestamp" AT TIME ZONE %s)::date FROM {LEGACY_TABLE}', ['month', 'UTC']
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+
+def partition_messages(apps, schema_editor):
+    """
+    Converte a tabela de mensagens em uma tabela particionada por mês de `timestamp` (só PostgreSQL).
+
+    A tabela atual é renomeada, a particionada é criada com a mesma estrutura, uma
+    partição por mês com mensagens (mais o mês atual e os WEBHOOK_MESSAGE_PARTITIONS_AHEAD
+    seguintes) e uma partição padrão, e as linhas são copiadas. Em tabelas grandes,
+    rode em uma janela de manutenção: a cópia é feita em uma única transação.
+
+    A chave primária passa a ser (id, timestamp), pois o PostgreSQL exige a coluna de
+    particionamento em toda restrição única.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    quote_name = schema_editor.connection.ops.quote_name
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE {MESSAGE_TABLE} RENAME TO {LEGACY_TABLE}')
+        cursor.execute(f'ALTER INDEX {INDEX_NAME} RENAME TO {INDEX_NAME}_legacy')
+        cursor.execute(
+            f'CREATE TABLE {MESSAGE_TABLE} (LIKE {LEGACY_TABLE} INCLUDING DEFAULTS) PARTITION BY RANGE ("timestamp")'
+        )
+        cursor.execute(
+            f'ALTER TABLE {MESSAGE_TABLE} ADD CONSTRAINT message_id_timestamp_pk PRIMARY KEY (id, "timestamp")'
+        )
+        cursor.execute(
+            f'ALTER TABLE {MESSAGE_TABLE} ADD CONSTRAINT message_conversation_fk FOREIGN KEY (conversation_id) '
+            f'REFERENCES {CONVERSATION_TABLE} (id) DEFERRABLE INITIALLY DEFERRED'
+        )
+        cursor.execute(f'CREATE INDEX {INDEX_NAME} ON {MESSAGE_TABLE} (conversation_id, "timestamp")')
+
+        current = month_start(timezone.now())
+        months = set(_months_with_messages(cursor))
+        months.update(add_months(current, offset) for offset in range(settings.WEBHOOK_MESSAGE_PARTITIONS_AHEAD + 1))
+        for month in sorted(months):
+            cursor.execute(create_partition_sql(month, quote_name))
+        cursor.execute(f'CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {MESSAGE_TABLE} DEFAULT')
+
+        cursor.execute(f'INSERT INTO {MESSAGE_TABLE} SELECT * FROM {LEGACY_TABLE}')
+        cursor.execute(f'DROP TABLE {LEGACY_TABLE}')
+
+
+def unpartition_messages(apps, schema_editor):
+    """Volta a tabela de mensagens a uma tabela comum, com chave primária em `id`."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE {MESSAGE_TABLE} RENAME TO {LEGACY_TABLE}')
+        cursor.execute(f'ALTER INDEX {INDEX_NAME} RENAME TO {INDEX_NAME}_legacy')
+        cursor.execute(f'CREATE TABLE {MESSAGE_TABLE} (LIKE {LEGACY_TABLE} INCLUDING DEFAULTS)')
+        cursor.execute(f'INSERT INTO {MESSAGE_TABLE} SELECT * FROM {LEGACY_TABLE}')
+        cursor.execute(f'ALTER TABLE {MESSAGE_TABLE} ADD PRIMARY KEY (id)')
+        cursor.execute(
+            f'ALTER TABLE {MESSAGE_TABLE} ADD CONSTRAINT message_conversation_fk FOREIGN KEY (conversation_id) '
+            f'REFERENCES {CONVERSATION_TABLE} (id) DEFERRABLE INITIALLY DEFERRED'
+        )
+        cursor.execute(f'CREATE INDEX {INDEX_NAME} ON {MESSAGE_TABLE} (conversation_id, "timestamp")')
+        cursor.execute(f'DROP TABLE {LEGACY_TABLE} CASCADE')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webhook_handler', '0005_tenants'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_messages, unpartition_messages),
+    ]
@@ -0,0 +1,43 @@
+from django.db import migrations
+
+from apps.webhook_handler.search import SEARCH_CONFIG, SEARCH_INDEX_NAME, SEARCH_VECTOR_COLUMN
+
+MESSAGE_TABLE = 'webhook_handler_message'
+
+
+def add_search_vector(apps, schema_editor):
+    """
+    Adiciona a coluna `search_vector` e seu índice GIN à tabela de mensagens (só PostgreSQL).
+
+    A coluna é gerada pelo banco a partir de `content`, então é preenchida em qualquer
+    inserção, inclusive nas inserções em massa e no INSERT ... SELECT da ingestão,
+    sem depender do código da aplicação. Adicioná-la reescreve a tabela; em bases
+    grandes, rode em uma janela de manutenção.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            f'ALTER TABLE {MESSAGE_TABLE} ADD COLUMN {SEARCH_VECTOR_COLUMN} tsvector '
+            f"GENERATED ALWAYS AS (to_tsvector('{SEARCH_CONFIG}'::regconfig, content)) STORED"
+        )
+        cursor.execute(f'CREATE INDEX {SEARCH_INDEX_NAME} ON {MESSAGE_TABLE} USING gin ({SEARCH_VECTOR_COLUMN})')
+
+
+def remove_search_vector(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f'DROP INDEX IF EXISTS {SEARCH_INDEX_NAME}')
+        cursor.execute(f'ALTER TABLE {MESSAGE_TABLE} DROP COLUMN IF EXISTS {SEARCH_VECTOR_COLUMN}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webhook_handler', '0006_partition_messages'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_search_vector, remove_search_vector),
+    ]
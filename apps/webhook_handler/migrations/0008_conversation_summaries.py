@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:59
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Substr
+
+
+def backfill_summaries(apps, schema_editor):
+    """Preenche o resumo das conversas existentes com um único UPDATE."""
+    Conversation = apps.get_model('webhook_handler', 'Conversation')
+    Message = apps.get_model('webhook_handler', 'Message')
+    messages = Message.objects.filter(conversation=OuterRef('pk'))
+    latest = messages.order_by('-timestamp', '-id')
+    Conversation.objects.update(
+        message_count=Coalesce(
+            Subquery(messages.order_by().values('conversation').annotate(count=Count('*')).values('count')), 0
+        ),
+        last_message_at=Subquery(latest.values('timestamp')[:1]),
+        last_message_preview=Coalesce(
+            Subquery(latest.annotate(preview=Substr('content', 1, 100)).values('preview')[:1]), Value('')
+        ),
+        last_direction=Coalesce(Subquery(latest.values('direction')[:1]), Value('')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webhook_handler', '0007_message_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='last_direction',
+            field=models.CharField(blank=True, default='', max_length=8),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message_preview',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='message_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(fields=['state', 'last_message_at'], name='conversation_state_last_idx'),
+        ),
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webhook_handler', '0008_conversation_summaries'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tenant',
+            name='read_token_hash',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+    ]
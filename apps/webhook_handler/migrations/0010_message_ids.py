@@ -0,0 +1,77 @@
+from django.db import migrations
+
+from apps.webhook_handler.partitioning import MESSAGE_ID_TABLE, MESSAGE_TABLE
+
+CLAIM_FUNCTION = 'webhook_handler_message_claim_id'
+RELEASE_FUNCTION = 'webhook_handler_message_release_id'
+
+
+def add_message_ids(apps, schema_editor):
+    """
+    Garante IDs de mensagem únicos na tabela particionada (só PostgreSQL).
+
+    Com a chave primária (id, timestamp) da migração 0006, o banco aceitaria o mesmo
+    `id` com outro `timestamp`. A tabela MESSAGE_ID_TABLE, não particionada e com
+    chave primária em `id`, é preenchida por um gatilho BEFORE INSERT na mesma
+    transação: se o ID já existe, a linha da mensagem é descartada, como um conflito
+    de `ON CONFLICT DO NOTHING` (não conta em `rowcount` nem aparece em `RETURNING`).
+    Inserções concorrentes do mesmo ID esperam uma pela outra no índice único. Um
+    gatilho AFTER DELETE libera o ID de mensagens apagadas; partições arquivadas
+    liberam os seus em `archive_partition`.
+
+    IDs já duplicados antes desta migração continuam duplicados; novos não entram.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f'CREATE TABLE {MESSAGE_ID_TABLE} (id uuid PRIMARY KEY)')
+        cursor.execute(f'INSERT INTO {MESSAGE_ID_TABLE} SELECT DISTINCT id FROM {MESSAGE_TABLE}')
+        cursor.execute(f"""
+            CREATE FUNCTION {CLAIM_FUNCTION}() RETURNS trigger AS $$
+            BEGIN
+                INSERT INTO {MESSAGE_ID_TABLE} (id) VALUES (NEW.id) ON CONFLICT DO NOTHING;
+                IF NOT FOUND THEN
+                    RETURN NULL;
+                END IF;
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql
+        """)
+        cursor.execute(f"""
+            CREATE FUNCTION {RELEASE_FUNCTION}() RETURNS trigger AS $$
+            BEGIN
+                DELETE FROM {MESSAGE_ID_TABLE} WHERE id = OLD.id;
+                RETURN NULL;
+            END
+            $$ LANGUAGE plpgsql
+        """)
+        cursor.execute(
+            f'CREATE TRIGGER message_claim_id BEFORE INSERT ON {MESSAGE_TABLE} '
+            f'FOR EACH ROW EXECUTE FUNCTION {CLAIM_FUNCTION}()'
+        )
+        cursor.execute(
+            f'CREATE TRIGGER message_release_id AFTER DELETE ON {MESSAGE_TABLE} '
+            f'FOR EACH ROW EXECUTE FUNCTION {RELEASE_FUNCTION}()'
+        )
+
+
+def remove_message_ids(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f'DROP TRIGGER message_claim_id ON {MESSAGE_TABLE}')
+        cursor.execute(f'DROP TRIGGER message_release_id ON {MESSAGE_TABLE}')
+        cursor.execute(f'DROP FUNCTION {CLAIM_FUNCTION}()')
+        cursor.execute(f'DROP FUNCTION {RELEASE_FUNCTION}()')
+        cursor.execute(f'DROP TABLE {MESSAGE_ID_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webhook_handler', '0009_tenant_read_token'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_message_ids, remove_message_ids),
+    ]
@@ -1,24 +1,57 @@
 import hmac
 import hashlib
 
-from rest_framework.throttling import SimpleRateThrottle
 from rest_framework.authentication import BaseAuthentication
 from rest_framework.exceptions import AuthenticationFailed, Throttled
+from rest_framework.permissions import SAFE_METHODS
 from realmate_challenge import settings
 
+from . import metrics, replicas
+from .tenants import TENANT_HEADER, check_source, get_tenant
+from .throttling import check_rate_limit
 
-class WebhookRateThrottle(SimpleRateThrottle):
+
+def verify_signature(received_signature: str, body: bytes, secrets: list = None) -> None:
     """
-    Limitador de taxa de requisições para endpoints webhook.
+    Verifica a assinatura de uma requisição de webhook.
+
+    Em modo de desenvolvimento (DEBUG=True), compara o cabeçalho diretamente com a chave.
+    Em produção, compara o HMAC-SHA256 do corpo com o valor enviado no formato
+    `HMAC <assinatura>`. Não faz I/O, podendo ser usada também em views assíncronas.
+
+    Args:
+        received_signature (str): Valor do cabeçalho Authorization.
+        body (bytes): Corpo bruto da requisição.
+        secrets (list): Segredos aceitos (os da origem, durante a rotação mais de um).
+            Padrão: WEBHOOK_API_KEY em desenvolvimento e WEBHOOK_SECRET em produção.
 
-    Limita as requisições a 60 por minuto por endereço IP para prevenir abusos.
-    Usa o endereço IP do cliente como identificador único para limitação de taxa.
+    Raises:
+        AuthenticationFailed: Se a assinatura for inválida.
     """
-    rate = '60/minute'
-    scope = 'webhook'
+    if settings.DEBUG:
+        # Modo desenvolvimento: ainda usando compare_digest para segurança
+        keys = secrets or [settings.WEBHOOK_API_KEY]
+        if not any(
+            hmac.compare_digest(received_signature.encode('utf-8'), key.encode('utf-8')) for key in keys
+        ):
+            raise AuthenticationFailed('Invalid token')
+        return
+
+    if not received_signature.startswith('HMAC '):
+        raise AuthenticationFailed('Invalid signature format')
 
-    def get_cache_key(self, request, view):
-        return self.get_ident(request)
+    received_signature = received_signature.split(' ')[1]
+
+    for secret in secrets or [settings.WEBHOOK_SECRET]:
+        expected_signature = hmac.new(
+            secret.encode('utf-8'),
+            msg=body,
+            digestmod=hashlib.sha256
+        ).hexdigest()
+        if hmac.compare_digest(expected_signature, received_signature):
+            return
+
+    raise AuthenticationFailed('Invalid HMAC signature')
 
 
 class WebhookAuthentication(BaseAuthentication):
@@ -29,21 +62,35 @@ class WebhookAuthentication(BaseAuthentication):
     Em modo de desenvolvimento (DEBUG=True), verifica apenas a correspondência direta com WEBHOOK_API_KEY.
     Em produção, verifica a assinatura HMAC do corpo da requisição usando WEBHOOK_SECRET.
 
+    Com o cabeçalho X-Webhook-Source, a assinatura é verificada com os segredos da
+    origem (Tenant) correspondente, que fica disponível em `request.auth`.
+
+    Requisições autenticadas passam pelo limitador de taxa (ver throttling.py); a
+    verificação acontece depois da assinatura para que a identidade usada no limite
+    (origem ou chave) não possa ser forjada para esgotar o limite de outro cliente.
+    A duração fica na etapa `authentication` de /metrics, sem tipo de evento (o corpo
+    ainda não foi lido).
+
     Raises:
         AuthenticationFailed: Se a assinatura estiver ausente, inválida, ou se o corpo da requisição estiver vazio.
+        Throttled: Se a identidade da requisição excedeu seu limite de taxa.
 
     Returns:
-        tuple: (None, None) se a autenticação for bem-sucedida.
+        tuple: (None, origem ou None) se a autenticação for bem-sucedida.
     """
 
-    def __init__(self):
-        self.throttle = WebhookRateThrottle()
-
     def authenticate(self, request):
-        # Verificar rate limiting primeiro
-        if not self.throttle.allow_request(request, self):
-            raise Throttled(detail="Too many requests")
-
+        try:
+            with metrics.stage(metrics.STAGE_AUTHENTICATION):
+                return self._authenticate(request)
+        except Throttled:
+            metrics.count(metrics.EVENT_FAILURES, reason=metrics.FAILURE_THROTTLED)
+            raise
+        except AuthenticationFailed:
+            metrics.count(metrics.EVENT_FAILURES, reason=metrics.FAILURE_UNAUTHORIZED)
+            raise
+
+    def _authenticate(self, request):
         received_signature = request.headers.get('Authorization')
         if not received_signature:
             raise AuthenticationFailed('No signature provided')
@@ -51,27 +98,72 @@ class WebhookAuthentication(BaseAuthentication):
         if request.method != "GET" and not request.body:
             raise AuthenticationFailed('Empty request body')
 
-        if settings.DEBUG:
-            # Modo desenvolvimento: ainda usando compare_digest para segurança
-            if not hmac.compare_digest(
-                received_signature.encode('utf-8'),
-                settings.WEBHOOK_API_KEY.encode('utf-8')
-            ):
-                raise AuthenticationFailed('Invalid token')
-        else:
-            if not received_signature.startswith('HMAC '):
-                raise AuthenticationFailed('Invalid signature format')
-
-            received_signature = received_signature.split(' ')[1]
-
-            secret_key = settings.WEBHOOK_SECRET.encode('utf-8')
-            expected_signature = hmac.new(
-                secret_key,
-                msg=request.body,
-                digestmod=hashlib.sha256
-            ).hexdigest()
-
-            if not hmac.compare_digest(expected_signature, received_signature):
-                raise AuthenticationFailed('Invalid HMAC signature')
-
-        return (None, None)
+        source = request.headers.get(TENANT_HEADER)
+        tenant = get_tenant(source) if source else None
+        check_source(source, tenant)
+        verify_signature(received_signature, request.body, tenant.secrets if tenant else None)
+
+        allowed, wait = check_rate_limit(request, tenant)
+        if not allowed:
+            raise Throttled(wait=wait, detail="Too many requests")
+        return (None, tenant)
+
+
+class TenantReadAuthentication(BaseAuthentication):
+    """
+    Autenticação das rotas de leitura por origem.
+
+    Com o cabeçalho X-Webhook-Source, o cabeçalho Authorization deve conter
+    `Bearer <token>` com o token de leitura da origem (ver `Tenant.rotate_read_token`),
+    e as consultas ficam restritas às conversas dela. O segredo HMAC da origem não
+    é aceito. Sem o cabeçalho, a requisição segue anônima.
+
+    Raises:
+        AuthenticationFailed: Se a origem for desconhecida ou o token não conferir.
+
+    Returns:
+        tuple: (None, origem), ou None para requisições sem origem.
+    """
+
+    def authenticate(self, request):
+        source = request.headers.get(TENANT_HEADER)
+        if not source:
+            return None
+        tenant = get_tenant(source)
+        check_source(source, tenant)
+        check_read_token(tenant, bearer_token(request.headers.get('Authorization', '')))
+        return (None, tenant)
+
+
+def bearer_token(header: str) -> str:
+    """Extrai o token de um cabeçalho `Authorization: Bearer <token>` (vazio em outro formato)."""
+    scheme, _, token = header.partition(' ')
+    return token.strip() if scheme.lower() == 'bearer' else ''
+
+
+def check_read_token(tenant, token: str) -> None:
+    """
+    Confere o token de uma requisição de leitura com o token de leitura da origem.
+
+    Raises:
+        AuthenticationFailed: Se o token não conferir ou a origem não tiver token de leitura.
+    """
+    if not token or not tenant.check_read_token(token):
+        raise AuthenticationFailed('Invalid token')
+
+
+class ReplicaReadMixin:
+    """
+    Envia as leituras (GET, HEAD e OPTIONS) de um ViewSet para uma réplica (ver `replicas.read_only`).
+
+    Nas rotas de detalhe, o ID da URL é usado para manter no primário as conversas
+    escritas há pouco. O alias escolhido fica em `request.read_alias`, para leituras
+    feitas depois que a view retorna (respostas transmitidas).
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in SAFE_METHODS:
+            return super().dispatch(request, *args, **kwargs)
+        with replicas.read_only(conversation_id=kwargs.get('pk')) as alias:
+            request.read_alias = alias
+            return super().dispatch(request, *args, **kwargs)
@@ -1,15 +1,107 @@
+import hashlib
+import hmac
+import secrets
+
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 
 
+def generate_secret() -> str:
+    return secrets.token_hex(32)
+
+
+def hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+class Tenant(models.Model):
+    """
+    Origem de webhooks (conta de cliente), com segredo HMAC e limites próprios.
+
+    A origem é identificada pelo cabeçalho X-Webhook-Source. Durante a rotação, o
+    segredo anterior continua aceito até ser removido, para que o provedor troque
+    de chave sem perder eventos. O segredo só assina webhooks e nunca trafega: a API
+    de leitura usa um token próprio, do qual apenas o hash é guardado.
+
+    Attributes:
+        slug (SlugField): Identificador enviado em X-Webhook-Source
+        name (CharField): Nome da conta
+        secret (CharField): Segredo HMAC atual
+        previous_secret (CharField): Segredo anterior, aceito durante a rotação
+        read_token_hash (CharField): SHA-256 do token da API de leitura (vazio: leitura desabilitada)
+        is_active (BooleanField): Origens inativas têm os webhooks recusados
+        rate_limit (FloatField): Requisições/s próprias da origem (vazio usa WEBHOOK_RATE_LIMIT_RATE)
+        rate_burst (PositiveIntegerField): Rajada própria da origem (vazio usa WEBHOOK_RATE_LIMIT_BURST)
+        created_at (DateTimeField): Data e hora de criação
+        updated_at (DateTimeField): Data e hora da última atualização
+    """
+    slug = models.SlugField(max_length=64, unique=True)
+    name = models.CharField(max_length=255)
+    secret = models.CharField(max_length=128, default=generate_secret)
+    previous_secret = models.CharField(max_length=128, blank=True)
+    read_token_hash = models.CharField(max_length=64, blank=True)
+    is_active = models.BooleanField(default=True)
+    rate_limit = models.FloatField(null=True, blank=True)
+    rate_burst = models.PositiveIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.slug
+
+    @property
+    def secrets(self) -> list:
+        """Segredos aceitos na verificação de assinatura, do atual para o anterior."""
+        return [secret for secret in (self.secret, self.previous_secret) if secret]
+
+    def rotate_secret(self) -> str:
+        """
+        Gera um novo segredo, mantendo o atual como anterior até o fim da rotação.
+
+        Returns:
+            str: O novo segredo.
+        """
+        self.previous_secret = self.secret
+        self.secret = generate_secret()
+        self.save(update_fields=['secret', 'previous_secret', 'updated_at'])
+        return self.secret
+
+    def rotate_read_token(self) -> str:
+        """
+        Gera um novo token da API de leitura, invalidando o anterior.
+
+        Returns:
+            str: O novo token, que não é armazenado e deve ser entregue ao cliente.
+        """
+        token = generate_secret()
+        self.read_token_hash = hash_token(token)
+        self.save(update_fields=['read_token_hash', 'updated_at'])
+        return token
+
+    def check_read_token(self, token: str) -> bool:
+        """Confere um token da API de leitura com o hash armazenado."""
+        return bool(self.read_token_hash) and hmac.compare_digest(hash_token(token), self.read_token_hash)
+
+
 class Conversation(models.Model):
     """
     Modelo que representa uma conversa no sistema.
 
     Attributes:
         id (UUIDField): Identificador único da conversa
+        tenant (ForeignKey): Origem dos webhooks da conversa (vazio para conversas sem origem)
         state (CharField): Estado atual da conversa (OPEN ou CLOSED)
+        message_count (PositiveIntegerField): Quantidade de mensagens, incluindo as arquivadas
+        archived_message_count (PositiveIntegerField): Mensagens em partições já arquivadas
+        last_message_at (DateTimeField): Timestamp da mensagem mais recente
+        last_message_preview (CharField): Trecho da mensagem mais recente
+        last_direction (CharField): Direção da mensagem mais recente
         created_at (DateTimeField): Data e hora de criação da conversa
         updated_at (DateTimeField): Data e hora da última atualização da conversa
+
+    Os campos de resumo são desnormalizados: a ingestão os atualiza na mesma
+    transação que grava as mensagens, e o comando `reconcile_conversation_summaries`
+    os recalcula a partir da tabela de mensagens e de `archived_message_count`.
     """
     OPEN_CHOICE = 'OPEN'
     CLOSED_CHOICE = 'CLOSED'
@@ -17,15 +109,36 @@ class Conversation(models.Model):
         (OPEN_CHOICE, 'Open'),
         (CLOSED_CHOICE, 'Closed'),
     ]
+    # Tamanho do trecho da última mensagem exibido na listagem
+    PREVIEW_LENGTH = 100
 
     id = models.UUIDField(primary_key=True)
+    # Sem índice próprio: o índice composto (tenant, created_at) já cobre as buscas por origem
+    tenant = models.ForeignKey(
+        Tenant, on_delete=models.PROTECT, related_name='conversations', null=True, blank=True, db_index=False
+    )
     state = models.CharField(max_length=6, choices=STATE_CHOICES, default=OPEN_CHOICE)
+    message_count = models.PositiveIntegerField(default=0)
+    archived_message_count = models.PositiveIntegerField(default=0)
+    last_message_at = models.DateTimeField(null=True, blank=True)
+    last_message_preview = models.CharField(max_length=PREVIEW_LENGTH, blank=True, default='')
+    last_direction = models.CharField(max_length=8, blank=True, default='')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"Conversation {self.id} ({self.state})"
 
+    class Meta:
+        indexes = [
+            # Sustenta a paginação por cursor da listagem de conversas
+            models.Index(fields=['created_at'], name='conversation_created_at_idx'),
+            # Listagem e exportação por origem: cada origem percorre apenas a sua faixa do índice
+            models.Index(fields=['tenant', 'created_at'], name='conversation_tenant_idx'),
+            # Conversas de um estado pela atividade mais recente (admin, painéis)
+            models.Index(fields=['state', 'last_message_at'], name='conversation_state_last_idx'),
+        ]
+
 
 class Message(models.Model):
     """
@@ -38,6 +151,11 @@ class Message(models.Model):
         content (TextField): Conteúdo da mensagem
         timestamp (DateTimeField): Data e hora do envio/recebimento da mensagem
         created_at (DateTimeField): Data e hora de criação do registro
+
+    No PostgreSQL, a tabela é particionada por mês de `timestamp` (migração 0006) e a
+    chave primária no banco é (id, timestamp). A unicidade de `id` é garantida pela
+    tabela de IDs da migração 0010, preenchida por gatilho na mesma transação: uma
+    mensagem com ID já existente, mesmo com outro timestamp, não é inserida.
     """
     SENT_CHOICE = 'SENT'
     RECEIVED_CHOICE = 'RECEIVED'
@@ -47,7 +165,10 @@ class Message(models.Model):
     ]
 
     id = models.UUIDField(primary_key=True)
-    conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name='messages')
+    # Sem índice próprio: o índice composto (conversation, timestamp) já cobre as buscas por conversa
+    conversation = models.ForeignKey(
+        Conversation, on_delete=models.CASCADE, related_name='messages', db_index=False
+    )
     direction = models.CharField(max_length=8, choices=DIRECTION_CHOICES)
     content = models.TextField()
     timestamp = models.DateTimeField()
@@ -58,3 +179,50 @@ class Message(models.Model):
 
     class Meta:
         ordering = ['timestamp']
+        indexes = [
+            # Sustenta a paginação por chave (timestamp, id) das mensagens de uma conversa
+            models.Index(fields=['conversation', 'timestamp'], name='message_conversation_ts_idx'),
+            # Sustenta a busca: as correspondências mais recentes são lidas em ordem de timestamp, sem ordenação
+            models.Index(fields=['timestamp'], name='message_timestamp_idx'),
+        ]
+
+
+class PendingEvent(models.Model):
+    """
+    Evento de mensagem recebido antes da conversa à qual pertence.
+
+    Fica estacionado até que a conversa seja criada, quando é aplicado em massa,
+    ou até expirar, quando é movido para DeadLetterEvent.
+
+    Attributes:
+        conversation_id (UUIDField): ID da conversa aguardada
+        payload (JSONField): Evento de webhook completo, já validado
+        received_at (DateTimeField): Data e hora em que o evento foi estacionado
+        expires_at (DateTimeField): Data e hora a partir da qual o evento vai para a dead-letter
+    """
+    conversation_id = models.UUIDField(db_index=True)
+    payload = models.JSONField(encoder=DjangoJSONEncoder)
+    received_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"Pending event for conversation {self.conversation_id}"
+
+
+class DeadLetterEvent(models.Model):
+    """
+    Evento de webhook que não pôde ser aplicado e foi retirado do fluxo de ingestão.
+
+    Attributes:
+        payload (JSONField): Evento de webhook completo
+        reason (CharField): Motivo pelo qual o evento foi descartado
+        received_at (DateTimeField): Data e hora em que o evento foi recebido originalmente
+        created_at (DateTimeField): Data e hora em que o evento entrou na dead-letter
+    """
+    payload = models.JSONField(encoder=DjangoJSONEncoder)
+    reason = models.CharField(max_length=255)
+    received_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Dead letter event ({self.reason})"
@@ -0,0 +1,148 @@
+import base64
+import binascii
+import uuid
+
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination, CursorPagination
+from rest_framework.response import Response
+
+
+class ConversationCursorPagination(CursorPagination):
+    """
+    Paginação por cursor para a listagem de conversas.
+
+    Ao contrário da paginação por offset, o custo de cada página não cresce com a
+    posição na listagem: o cursor vira um filtro `created_at < X` sobre o índice.
+    """
+    ordering = '-created_at'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+
+class MessageKeysetPagination(BasePagination):
+    """
+    Paginação por chave (keyset) das mensagens de uma conversa, ordenadas por (timestamp, id).
+
+    Parâmetros aceitos:
+        after: cursor opaco; retorna as mensagens posteriores a ele (use o `next_cursor`
+            da resposta anterior para buscar só as mensagens novas)
+        before: cursor opaco; retorna as mensagens anteriores a ele, para carregar o histórico
+        since: data/hora ISO 8601; retorna as mensagens a partir desse instante
+        page_size: quantidade de mensagens por página
+
+    Cada página é uma varredura de intervalo no índice (conversation, timestamp),
+    com custo independente do tamanho da conversa. Com a tabela particionada por mês
+    (PostgreSQL), o limite de timestamp do cursor ou de `since` também descarta as
+    partições fora do intervalo.
+    """
+    page_size = 100
+    max_page_size = 500
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self._get_page_size(request)
+        after = request.query_params.get('after')
+        before = request.query_params.get('before')
+        since = request.query_params.get('since')
+
+        if before:
+            timestamp, message_id = decode_message_cursor(before)
+            queryset = queryset.filter(timestamp__lte=timestamp).exclude(timestamp=timestamp, id__gte=message_id)
+            page = list(queryset.order_by('-timestamp', '-id')[:self.page_size + 1])
+            self.has_more = len(page) > self.page_size
+            self.page = page[:self.page_size][::-1]
+            self.cursor = before
+            return self.page
+
+        if after:
+            timestamp, message_id = decode_message_cursor(after)
+            queryset = queryset.filter(timestamp__gte=timestamp).exclude(timestamp=timestamp, id__lte=message_id)
+        elif since:
+            since_value = parse_datetime(since)
+            if since_value is None:
+                raise ValidationError({'since': 'Invalid datetime'})
+            queryset = queryset.filter(timestamp__gte=since_value)
+
+        page = list(queryset.order_by('timestamp', 'id')[:self.page_size + 1])
+        self.has_more = len(page) > self.page_size
+        self.page = page[:self.page_size]
+        self.cursor = after
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response({
+            'results': data,
+            'next_cursor': encode_message_cursor(self.page[-1]) if self.page else self.cursor,
+            'previous_cursor': encode_message_cursor(self.page[0]) if self.page else None,
+            'has_more': self.has_more,
+        })
+
+    def _get_page_size(self, request):
+        try:
+            page_size = int(request.query_params.get('page_size', self.page_size))
+        except ValueError:
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+
+class SearchPagination(BasePagination):
+    """
+    Paginação por página para a busca de mensagens, sem contagem total.
+
+    Resultados ordenados por relevância não têm uma chave estável para cursor, e um
+    COUNT(*) sobre todas as correspondências custaria mais que a própria busca; a
+    página busca uma linha a mais para saber se há outra. A profundidade é limitada
+    a `max_page`.
+
+    Parâmetros aceitos:
+        page: número da página, a partir de 1
+        page_size: quantidade de mensagens por página
+    """
+    page_size = 20
+    max_page_size = 100
+    max_page = 50
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self._get_int(request, 'page_size', self.page_size, self.max_page_size)
+        self.page_number = self._get_int(request, 'page', 1, self.max_page)
+        offset = (self.page_number - 1) * self.page_size
+        page = list(queryset[offset:offset + self.page_size + 1])
+        self.has_more = len(page) > self.page_size and self.page_number < self.max_page
+        return page[:self.page_size]
+
+    def get_paginated_response(self, data):
+        return Response({'results': data, 'page': self.page_number, 'has_more': self.has_more})
+
+    @staticmethod
+    def _get_int(request, name: str, default: int, maximum: int) -> int:
+        try:
+            value = int(request.query_params.get(name, default))
+        except ValueError:
+            raise ValidationError({name: 'A valid integer is required.'})
+        return max(1, min(value, maximum))
+
+
+def encode_message_cursor(message) -> str:
+    """Codifica a posição (timestamp, id) de uma mensagem em um cursor opaco."""
+    position = f'{message.timestamp.isoformat()}|{message.id}'
+    return base64.urlsafe_b64encode(position.encode('utf-8')).decode('ascii')
+
+
+def decode_message_cursor(cursor: str) -> tuple:
+    """
+    Decodifica um cursor gerado por `encode_message_cursor`.
+
+    Raises:
+        ValidationError: Se o cursor for inválido.
+    """
+    try:
+        timestamp, message_id = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').split('|')
+        parsed = parse_datetime(timestamp)
+        if parsed is None:
+            raise ValueError(timestamp)
+        return parsed, uuid.UUID(message_id)
+    except (ValueError, UnicodeError, binascii.Error):
+        raise ValidationError({'cursor': MessageKeysetPagination.invalid_cursor_message})
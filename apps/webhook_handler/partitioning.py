@@ -0,0 +1,313 @@
+import gzip
+import logging
+import os
+import re
+from datetime import date, datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .models import Conversation, Message
+
+logger = logging.getLogger('webhook_handler')
+
+MESSAGE_TABLE = Message._meta.db_table
+DEFAULT_PARTITION = f'{MESSAGE_TABLE}_default'
+PARTITION_NAME = MESSAGE_TABLE + '_p{:04d}_{:02d}'
+PARTITION_NAME_RE = re.compile(re.escape(MESSAGE_TABLE) + r'_p(\d{4})_(\d{2})$')
+# IDs das mensagens de todas as partições, com chave primária em `id` (migração 0010)
+MESSAGE_ID_TABLE = f'{MESSAGE_TABLE}_id'
+
+
+def month_start(value) -> date:
+    """Retorna o primeiro dia do mês (em UTC) de uma data ou datetime."""
+    if isinstance(value, datetime):
+        if timezone.is_aware(value):
+            value = value.astimezone(dt_timezone.utc)
+        value = value.date()
+    return value.replace(day=1)
+
+
+def add_months(month: date, count: int) -> date:
+    """Soma `count` meses (positivo ou negativo) ao primeiro dia de um mês."""
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return PARTITION_NAME.format(month.year, month.month)
+
+
+def partition_month(name: str):
+    """Retorna o mês coberto por uma partição mensal, ou None se o nome não for de uma."""
+    match = PARTITION_NAME_RE.match(name)
+    return date(int(match.group(1)), int(match.group(2)), 1) if match else None
+
+
+def create_partition_sql(month: date, quote_name) -> str:
+    """
+    SQL que cria, se ainda não existir, a partição de mensagens de um mês.
+
+    Os limites são instantes em UTC: [primeiro dia do mês, primeiro dia do mês seguinte).
+    """
+    return (
+        f'CREATE TABLE IF NOT EXISTS {quote_name(partition_name(month))} PARTITION OF {quote_name(MESSAGE_TABLE)} '
+        f"FOR VALUES FROM ('{month.isoformat()} 00:00:00+00') TO ('{add_months(month, 1).isoformat()} 00:00:00+00')"
+    )
+
+
+def is_partitioned(using: str = 'default') -> bool:
+    """
+    Indica se a tabela de mensagens é particionada por mês.
+
+    Só o PostgreSQL é particionado (migração 0006); em outros bancos, como o SQLite
+    usado nos testes, todas as funções deste módulo são no-ops.
+    """
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)', [MESSAGE_TABLE])
+        return cursor.fetchone() is not None
+
+
+def list_partitions(using: str = 'default') -> dict:
+    """
+    Lista as partições mensais anexadas à tabela de mensagens.
+
+    Returns:
+        dict: Mês (primeiro dia) -> nome da partição, em ordem cronológica.
+    """
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            'SELECT child.relname FROM pg_inherits JOIN pg_class child ON child.oid = pg_inherits.inhrelid '
+            'WHERE pg_inherits.inhparent = to_regclass(%s)',
+            [MESSAGE_TABLE]
+        )
+        names = [row[0] for row in cursor.fetchall()]
+    months = {partition_month(name): name for name in names}
+    months.pop(None, None)
+    return dict(sorted(months.items()))
+
+
+def _month_bounds(month: date) -> list:
+    """Limites [início, fim) de um mês, em UTC, como parâmetros de consulta."""
+    return [f'{month.isoformat()} 00:00:00+00', f'{add_months(month, 1).isoformat()} 00:00:00+00']
+
+
+def create_partition(month: date, using: str = 'default') -> int:
+    """
+    Cria a partição de um mês, movendo para ela as mensagens do mês que estejam na partição padrão.
+
+    O PostgreSQL recusa criar a partição de um mês para o qual a partição padrão já
+    tem linhas (eventos atrasados ou de replay). Nesse caso, em uma única transação, a
+    partição padrão é desanexada, a do mês é criada, as linhas do mês são movidas e a
+    padrão é reanexada, o que a percorre para validar os limites sob o bloqueio
+    exclusivo da tabela de mensagens. Os IDs movidos são liberados e reservados de
+    novo em MESSAGE_ID_TABLE, para que o gatilho da migração 0010 não descarte as linhas.
+
+    Returns:
+        int: Mensagens movidas da partição padrão.
+    """
+    connection = connections[using]
+    quote_name = connection.ops.quote_name
+    partition, default = quote_name(partition_name(month)), quote_name(DEFAULT_PARTITION)
+    columns = ', '.join(quote_name(field.column) for field in Message._meta.concrete_fields)
+    in_month = '"timestamp" >= %s AND "timestamp" < %s'
+    bounds = _month_bounds(month)
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        cursor.execute(f'LOCK TABLE {quote_name(MESSAGE_TABLE)} IN ACCESS EXCLUSIVE MODE')
+        cursor.execute(f'SELECT 1 FROM {default} WHERE {in_month} LIMIT 1', bounds)
+        if cursor.fetchone() is None:
+            cursor.execute(create_partition_sql(month, quote_name))
+            return 0
+        cursor.execute(f'ALTER TABLE {quote_name(MESSAGE_TABLE)} DETACH PARTITION {default}')
+        cursor.execute(create_partition_sql(month, quote_name))
+        cursor.execute(
+            f'DELETE FROM {quote_name(MESSAGE_ID_TABLE)} WHERE id IN (SELECT id FROM {default} WHERE {in_month})',
+            bounds
+        )
+        cursor.execute(
+            f'WITH moved AS (DELETE FROM {default} WHERE {in_month} RETURNING {columns}) '
+            f'INSERT INTO {partition} ({columns}) SELECT {columns} FROM moved',
+            bounds
+        )
+        moved = cursor.rowcount
+        cursor.execute(f'INSERT INTO {quote_name(MESSAGE_ID_TABLE)} SELECT id FROM {partition} ON CONFLICT DO NOTHING')
+        cursor.execute(f'ALTER TABLE {quote_name(MESSAGE_TABLE)} ATTACH PARTITION {default} DEFAULT')
+    return moved
+
+
+def _create_partitions(months, using: str) -> list:
+    """
+    Cria as partições de vários meses, cada uma em sua própria transação.
+
+    A falha em um mês é registrada e não impede os demais nem o arquivamento.
+
+    Returns:
+        list: Nomes das partições criadas.
+    """
+    created = []
+    for month in months:
+        name = partition_name(month)
+        try:
+            moved = create_partition(month, using)
+        except Exception as e:
+            logger.error("Failed to create message partition %s: %s", name, e, exc_info=True)
+            continue
+        logger.info("Created message partition %s (%s messages moved from the default partition)", name, moved)
+        created.append(name)
+    return created
+
+
+def ensure_partitions(months_ahead: int = None, using: str = 'default') -> list:
+    """
+    Cria as partições do mês atual e dos `months_ahead` meses seguintes que ainda não existem.
+
+    Roda diariamente pelo celery beat (`maintain-message-partitions`), de modo que a
+    partição de um mês normalmente exista antes da primeira mensagem dele; mensagens
+    fora das partições existentes (por exemplo, um replay de eventos antigos) caem na
+    partição padrão e são movidas quando a partição do mês é criada.
+
+    Returns:
+        list: Nomes das partições criadas.
+    """
+    if not is_partitioned(using):
+        return []
+    if months_ahead is None:
+        months_ahead = settings.WEBHOOK_MESSAGE_PARTITIONS_AHEAD
+
+    existing = list_partitions(using)
+    current = month_start(timezone.now())
+    months = [add_months(current, offset) for offset in range(months_ahead + 1)]
+    return _create_partitions([month for month in months if month not in existing], using)
+
+
+def retention_cutoff(retention_months: int = None):
+    """
+    Primeiro mês mantido no banco, ou None se a retenção estiver desativada.
+
+    Com retenção de N meses, são mantidos o mês atual e os N - 1 anteriores.
+    """
+    if retention_months is None:
+        retention_months = settings.WEBHOOK_MESSAGE_RETENTION_MONTHS
+    if not retention_months:
+        return None
+    return add_months(month_start(timezone.now()), 1 - retention_months)
+
+
+def split_default_partition(retention_months: int = None, using: str = 'default') -> list:
+    """
+    Cria partições para os meses anteriores à retenção que têm mensagens na partição padrão.
+
+    Sem isso, mensagens antigas gravadas na partição padrão (replays, backfills) nunca
+    seriam arquivadas: as novas partições saem da janela e são arquivadas em seguida.
+
+    Returns:
+        list: Nomes das partições criadas.
+    """
+    cutoff = retention_cutoff(retention_months)
+    if cutoff is None or not is_partitioned(using):
+        return []
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT DISTINCT date_trunc(%s, "timestamp" AT TIME ZONE %s)::date '
+            f'FROM {connection.ops.quote_name(DEFAULT_PARTITION)} WHERE "timestamp" < %s',
+            ['month', 'UTC', _month_bounds(cutoff)[0]]
+        )
+        months = sorted(row[0] for row in cursor.fetchall())
+    return _create_partitions(months, using)
+
+
+def expired_partitions(retention_months: int = None, using: str = 'default') -> list:
+    """
+    Lista as partições inteiramente anteriores à janela de retenção.
+
+    Retenção 0 mantém todas as partições (ver `retention_cutoff`).
+
+    Returns:
+        list: Nomes das partições expiradas, da mais antiga para a mais recente.
+    """
+    cutoff = retention_cutoff(retention_months)
+    if cutoff is None or not is_partitioned(using):
+        return []
+    return [name for month, name in list_partitions(using).items() if month < cutoff]
+
+
+def archive_partition(name: str, directory: str = None, using: str = 'default') -> str:
+    """
+    Exporta uma partição de mensagens para um CSV comprimido e a remove da tabela.
+
+    Tudo acontece em uma transação: a partição é bloqueada contra escritas, copiada
+    com `COPY ... TO STDOUT` para `<directory>/<partição>.csv.gz` e só então desanexada
+    e apagada, junto com seus IDs em MESSAGE_ID_TABLE. O bloqueio exclusivo da tabela
+    de mensagens, exigido pelo DETACH, é obtido apenas no fim e dura até o commit. Se
+    a exportação falhar, nada é removido.
+
+    O resumo das conversas não muda: `message_count` continua contando as mensagens
+    arquivadas, somadas também a `archived_message_count`, e `last_message_*` continua
+    apontando para a última mensagem, mesmo arquivada. Assim a reconciliação dos
+    resumos (`summaries.reconcile`) não os reduz aos valores de depois do arquivamento.
+
+    Returns:
+        str: Caminho do arquivo gerado.
+
+    Raises:
+        FileExistsError: Se o arquivo da partição já existir no diretório.
+    """
+    directory = directory or settings.WEBHOOK_MESSAGE_ARCHIVE_DIR
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'{name}.csv.gz')
+    if os.path.exists(path):
+        raise FileExistsError(path)
+
+    connection = connections[using]
+    quote_name = connection.ops.quote_name
+    temporary = f'{path}.tmp'
+    try:
+        with transaction.atomic(using=using), connection.cursor() as cursor:
+            cursor.execute(f'LOCK TABLE {quote_name(name)} IN SHARE MODE')
+            with gzip.open(temporary, 'wb') as archive:
+                cursor.copy_expert(f'COPY {quote_name(name)} TO STDOUT WITH (FORMAT csv, HEADER)', archive)
+            cursor.execute(
+                f'UPDATE {quote_name(Conversation._meta.db_table)} AS conversation '
+                f'SET archived_message_count = conversation.archived_message_count + archived.count '
+                f'FROM (SELECT conversation_id, count(*) AS count FROM {quote_name(name)} GROUP BY conversation_id) '
+                f'AS archived WHERE conversation.id = archived.conversation_id'
+            )
+            # Libera os IDs arquivados, que deixam de existir na tabela de mensagens
+            cursor.execute(
+                f'DELETE FROM {quote_name(MESSAGE_ID_TABLE)} WHERE id IN (SELECT id FROM {quote_name(name)})'
+            )
+            cursor.execute(f'ALTER TABLE {quote_name(MESSAGE_TABLE)} DETACH PARTITION {quote_name(name)}')
+            cursor.execute(f'DROP TABLE {quote_name(name)}')
+        os.replace(temporary, path)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+    logger.info("Archived message partition %s to %s", name, path)
+    return path
+
+
+def maintain_partitions(months_ahead: int = None, retention_months: int = None, directory: str = None,
+                        using: str = 'default') -> dict:
+    """
+    Cria as partições futuras e arquiva as que saíram da janela de retenção.
+
+    Mensagens anteriores à retenção que estejam na partição padrão ganham antes a
+    partição do seu mês, para serem arquivadas com as demais. Uma falha ao criar ou
+    arquivar uma partição é registrada e não impede as demais.
+
+    Returns:
+        dict: {'created': [nomes], 'archived': [caminhos]}
+    """
+    created = ensure_partitions(months_ahead, using) + split_default_partition(retention_months, using)
+    archived = []
+    for name in expired_partitions(retention_months, using):
+        try:
+            archived.append(archive_partition(name, directory, using))
+        except Exception as e:
+            logger.error("Failed to archive message partition %s: %s", name, e, exc_info=True)
+    return {'created': created, 'archived': archived}
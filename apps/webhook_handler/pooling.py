@@ -0,0 +1,62 @@
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from . import metrics
+
+# Papel do processo, rótulo `role` das métricas de conexão
+ROLE_WEB = 'web'
+ROLE_WORKER = 'worker'
+
+# Rótulo `outcome` de DB_CHECKOUTS
+REUSED = 'reused'
+NEW = 'new'
+
+_role = ROLE_WEB
+
+
+def get_role() -> str:
+    return _role
+
+
+def configure_worker() -> None:
+    """
+    Aplica às conexões as configurações dos workers Celery.
+
+    Chamada no `worker_init`, no processo principal do worker e antes do fork dos
+    filhos do pool prefork, que herdam a configuração. Workers executam tarefas em
+    sequência sem o ciclo de requisição: mantêm a conexão por
+    WEBHOOK_WORKER_CONN_MAX_AGE segundos, e o Celery a descarta entre tarefas quando
+    ela expira ou fica inutilizável. A conexão herdada do processo principal é
+    descartada pelo próprio Celery em cada filho (`worker_process_init`), sem
+    encerrar a sessão usada pelo pai.
+    """
+    global _role
+    _role = ROLE_WORKER
+    for alias in connections:
+        connections.settings[alias]['CONN_MAX_AGE'] = settings.WEBHOOK_WORKER_CONN_MAX_AGE
+
+
+def checkout(alias: str = DEFAULT_DB_ALIAS) -> None:
+    """
+    Garante uma conexão utilizável antes de uma tarefa de webhook.
+
+    Reaproveita a conexão persistente do processo quando ela passa na verificação de
+    saúde (CONN_HEALTH_CHECKS); senão abre uma nova, observando em DB_CONNECT_WAIT o
+    tempo de espera. DB_CHECKOUTS mostra a proporção de reaproveitamento.
+    """
+    connection = connections[alias]
+    connection.close_if_health_check_failed()
+    if connection.connection is not None:
+        metrics.count(metrics.DB_CHECKOUTS, role=_role, outcome=REUSED)
+        return
+    with metrics.timer(metrics.DB_CONNECT_WAIT, role=_role):
+        connection.ensure_connection()
+    metrics.count(metrics.DB_CHECKOUTS, role=_role, outcome=NEW)
+
+
+@receiver(connection_created)
+def count_connection(sender, connection, **kwargs):
+    """Conta as conexões abertas por processo web ou worker (DB_CONNECTIONS_OPENED)."""
+    metrics.count(metrics.DB_CONNECTIONS_OPENED, role=_role, alias=connection.alias)
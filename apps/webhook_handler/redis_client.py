@@ -0,0 +1,40 @@
+import asyncio
+import weakref
+
+import redis
+import redis.asyncio
+from django.conf import settings
+
+_client = None
+
+
+def get_redis() -> redis.Redis:
+    """
+    Retorna o cliente Redis compartilhado do processo, conectado a REDIS_URL.
+
+    Usado onde o cache do Django não basta (scripts Lua, pub/sub); o pool de
+    conexões do cliente é reaproveitado entre as requisições.
+    """
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(settings.REDIS_URL)
+    return _client
+
+
+# Fracas: o cliente some junto com o event loop
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_redis() -> redis.asyncio.Redis:
+    """
+    Retorna o cliente Redis assíncrono do event loop atual, conectado a REDIS_URL.
+
+    Conexões assíncronas pertencem ao loop que as criou, por isso há um cliente por loop.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = _async_clients[loop] = redis.asyncio.Redis.from_url(
+            settings.REDIS_URL, max_connections=settings.WEBHOOK_UPDATES_MAX_CONNECTIONS
+        )
+    return client
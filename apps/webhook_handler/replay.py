@@ -0,0 +1,188 @@
+import json
+import logging
+import os
+import re
+import time
+
+from .routing import conversation_id_for, shard_for
+from .services import WebhookService
+from .validators import EventValidationError, validate_event
+
+logger = logging.getLogger('webhook_handler')
+
+
+class ReplayStats:
+    """
+    Contadores de uma execução de replay.
+
+    Attributes:
+        read (int): Linhas lidas e atribuídas a este worker
+        invalid (int): Linhas rejeitadas na leitura ou na validação
+        applied (int): Eventos aplicados (incluindo estacionados e duplicatas)
+        failed (int): Eventos rejeitados pelo WebhookService
+        elapsed (float): Tempo total em segundos
+    """
+
+    def __init__(self):
+        self.read = 0
+        self.invalid = 0
+        self.applied = 0
+        self.failed = 0
+        self.elapsed = 0.0
+
+    @property
+    def throughput(self) -> float:
+        return self.applied / self.elapsed if self.elapsed else 0.0
+
+    def merge(self, other: 'ReplayStats') -> None:
+        self.read += other.read
+        self.invalid += other.invalid
+        self.applied += other.applied
+        self.failed += other.failed
+        self.elapsed = max(self.elapsed, other.elapsed)
+
+
+class CheckpointMismatch(ValueError):
+    """O checkpoint existente foi gravado para outro arquivo ou outra quantidade de workers."""
+
+
+def check_checkpoints(checkpoint: str, path: str, worker_count: int) -> None:
+    """
+    Confere, antes de retomar uma execução, os checkpoints já gravados com o nome `checkpoint`.
+
+    Retomar o offset de outro arquivo pularia ou repetiria eventos arbitrários, e com
+    outra quantidade de workers cada checkpoint corresponde a outro shard de conversas.
+
+    Raises:
+        CheckpointMismatch: Se algum checkpoint for de outro arquivo ou de outra quantidade de workers.
+    """
+    directory = os.path.dirname(checkpoint) or '.'
+    if not os.path.isdir(directory):
+        return
+    # O checkpoint de uma execução com um worker, e `<checkpoint>.<índice>` dos demais
+    pattern = re.compile(re.escape(os.path.basename(checkpoint)) + r'(\.\d+)?$')
+    for name in sorted(os.listdir(directory)):
+        if pattern.match(name):
+            _check_checkpoint(os.path.join(directory, name), path, worker_count)
+
+
+def _check_checkpoint(checkpoint: str, path: str, worker_count: int) -> dict:
+    with open(checkpoint) as source:
+        state = json.load(source)
+    if os.path.abspath(state['path']) != os.path.abspath(path):
+        raise CheckpointMismatch(f"Checkpoint {checkpoint} was written for {state['path']}, not {path}")
+    # Checkpoints antigos não registram a quantidade de workers
+    saved_workers = state.get('worker_count', worker_count)
+    if saved_workers != worker_count:
+        raise CheckpointMismatch(
+            f'Checkpoint {checkpoint} was written with {saved_workers} workers, not {worker_count}'
+        )
+    return state
+
+
+class WebhookReplayer:
+    """
+    Reaplica um arquivo JSONL de eventos de webhook através do WebhookService.
+
+    O arquivo é lido em streaming; cada linha é validada por `validate_event` e os
+    eventos são aplicados em lotes transacionais com `WebhookService.process_batch`.
+    Depois de cada lote, o offset em bytes da próxima linha é gravado no arquivo de
+    checkpoint, permitindo retomar uma execução interrompida com o mesmo arquivo e a
+    mesma quantidade de workers (ver `check_checkpoints`).
+
+    Com vários workers, cada um lê o arquivo inteiro e aplica apenas as conversas do
+    seu shard (`hash(conversation_id) % worker_count`), o que preserva a ordem dos
+    eventos de cada conversa.
+
+    Com `tenant_id`, os eventos são aplicados como se tivessem chegado da origem
+    correspondente.
+    """
+
+    def __init__(self, path: str, batch_size: int = 5000, checkpoint: str = None,
+                 worker_index: int = 0, worker_count: int = 1, progress=None, tenant_id=None):
+        self.path = path
+        self.batch_size = batch_size
+        self.checkpoint = checkpoint
+        self.worker_index = worker_index
+        self.worker_count = worker_count
+        self.progress = progress or (lambda message: None)
+        self.tenant_id = tenant_id
+
+    def run(self) -> ReplayStats:
+        stats = ReplayStats()
+        started = time.monotonic()
+        batch = []
+        with open(self.path, 'rb') as source:
+            source.seek(self._load_checkpoint())
+            for line in iter(source.readline, b''):
+                event = self._parse_line(line, stats)
+                if event is not None:
+                    batch.append(event)
+                if len(batch) >= self.batch_size:
+                    self._apply(batch, stats, source.tell(), started)
+                    batch = []
+            self._apply(batch, stats, source.tell(), started)
+        stats.elapsed = time.monotonic() - started
+        return stats
+
+    def _parse_line(self, line: bytes, stats: ReplayStats):
+        line = line.strip()
+        if not line:
+            return None
+        try:
+            event = json.loads(line)
+        except ValueError:
+            event = None
+        if not isinstance(event, dict):
+            # Linhas ilegíveis são contadas por um único worker
+            stats.invalid += self.worker_index == 0
+            return None
+        if self.worker_count > 1 and shard_for(conversation_id_for(event), self.worker_count) != self.worker_index:
+            return None
+
+        stats.read += 1
+        try:
+            return validate_event(event, self.tenant_id)
+        except EventValidationError as e:
+            stats.invalid += 1
+            logger.warning("Skipping invalid event during replay: %s", e.errors)
+            return None
+
+    def _apply(self, batch: list, stats: ReplayStats, offset: int, started: float) -> None:
+        if batch:
+            results = WebhookService.process_batch(batch)
+            failed = sum(1 for result in results if result['status'] == 'failed')
+            stats.failed += failed
+            stats.applied += len(results) - failed
+        self._save_checkpoint(offset)
+
+        stats.elapsed = time.monotonic() - started
+        self.progress(
+            f'[worker {self.worker_index}] offset={offset} applied={stats.applied} failed={stats.failed} '
+            f'invalid={stats.invalid} ({stats.throughput:.0f} events/s)'
+        )
+
+    def _checkpoint_path(self) -> str:
+        if self.worker_count > 1:
+            return f'{self.checkpoint}.{self.worker_index}'
+        return self.checkpoint
+
+    def _load_checkpoint(self) -> int:
+        """
+        Raises:
+            CheckpointMismatch: Se o checkpoint for de outro arquivo ou de outra quantidade de workers.
+        """
+        if not self.checkpoint or not os.path.exists(self._checkpoint_path()):
+            return 0
+        return _check_checkpoint(self._checkpoint_path(), self.path, self.worker_count)['offset']
+
+    def _save_checkpoint(self, offset: int) -> None:
+        if not self.checkpoint:
+            return
+        # Escrita atômica: o checkpoint nunca fica truncado se o processo for interrompido
+        temporary = f'{self._checkpoint_path()}.tmp'
+        with open(temporary, 'w') as checkpoint:
+            json.dump(
+                {'path': os.path.abspath(self.path), 'worker_count': self.worker_count, 'offset': offset}, checkpoint
+            )
+        os.replace(temporary, self._checkpoint_path())
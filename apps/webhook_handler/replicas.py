@@ -0,0 +1,165 @@
+import logging
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections, transaction
+
+from . import metrics
+from .caching import canonical_id
+
+logger = logging.getLogger('webhook_handler')
+
+STICKY_KEY = 'webhook:replica:sticky:{}'
+
+# Motivos (rótulo `reason` de DB_READ_ROUTES) de uma leitura ir ou não para uma réplica
+ROUTE_REPLICA = 'replica'
+ROUTE_STICKY = 'sticky'
+ROUTE_LAGGING = 'lagging'
+
+# Banco das leituras do contexto atual; None mantém o roteamento padrão (primário)
+_read_alias = ContextVar('webhook_read_alias', default=None)
+
+# Último atraso medido por réplica neste processo: {alias: (instante, segundos)}
+_lags = {}
+
+POSTGRES_LAG_SQL = (
+    "SELECT CASE WHEN NOT pg_is_in_recovery() "
+    "OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+def sticky_seconds() -> float:
+    """
+    Janela após uma escrita em que as leituras da conversa vão para o primário.
+
+    Nunca é menor que o atraso máximo tolerado somado ao intervalo entre as medições
+    de atraso: depois da janela, qualquer réplica elegível já recebeu a escrita.
+    """
+    return max(
+        settings.WEBHOOK_REPLICA_STICKY_SECONDS,
+        settings.WEBHOOK_REPLICA_MAX_LAG_SECONDS + settings.WEBHOOK_REPLICA_LAG_CHECK_SECONDS
+    )
+
+
+def mark_written(conversation_ids) -> None:
+    """
+    Fixa no primário, por `sticky_seconds()`, as leituras das conversas alteradas.
+
+    A janela começa no commit da transação corrente, e é compartilhada entre processos
+    (cache padrão): uma escrita feita no worker vale para as leituras da API.
+    """
+    if not settings.DATABASE_REPLICAS:
+        return
+    keys = {STICKY_KEY.format(canonical_id(conversation_id)): 1 for conversation_id in conversation_ids}
+    if keys:
+        transaction.on_commit(lambda: cache.set_many(keys, timeout=sticky_seconds()))
+
+
+def is_sticky(conversation_id) -> bool:
+    try:
+        key = STICKY_KEY.format(canonical_id(conversation_id))
+    except ValueError:
+        # Não é o ID de uma conversa: a leitura responderá 404 de qualquer banco
+        return False
+    return cache.get(key) is not None
+
+
+def replica_lag(alias: str) -> float:
+    """Atraso de replicação (segundos) da réplica; 0 fora do PostgreSQL."""
+    connection = connections[alias]
+    if connection.vendor != 'postgresql':
+        return 0.0
+    with connection.cursor() as cursor:
+        cursor.execute(POSTGRES_LAG_SQL)
+        return float(cursor.fetchone()[0])
+
+
+def _lag(alias: str) -> float:
+    """Atraso da réplica, medido no máximo uma vez a cada WEBHOOK_REPLICA_LAG_CHECK_SECONDS por processo."""
+    checked_at, lag = _lags.get(alias, (None, None))
+    now = time.monotonic()
+    if checked_at is None or now - checked_at >= settings.WEBHOOK_REPLICA_LAG_CHECK_SECONDS:
+        try:
+            lag = replica_lag(alias)
+        except DatabaseError as e:
+            logger.warning("Replica %s unavailable, reading from primary: %s", alias, e)
+            lag = float('inf')
+        _lags[alias] = (now, lag)
+    return lag
+
+
+def healthy_replicas() -> list:
+    """Réplicas com atraso dentro de WEBHOOK_REPLICA_MAX_LAG_SECONDS."""
+    return [alias for alias in settings.DATABASE_REPLICAS if _lag(alias) <= settings.WEBHOOK_REPLICA_MAX_LAG_SECONDS]
+
+
+def choose_read_alias(conversation_id=None) -> str:
+    """
+    Escolhe o banco de uma leitura da API.
+
+    Uma réplica saudável sorteada, ou o primário se a conversa foi escrita há pouco
+    (ver `mark_written`) ou se todas as réplicas estão atrasadas ou indisponíveis.
+    """
+    if conversation_id is not None and is_sticky(conversation_id):
+        reason, alias = ROUTE_STICKY, DEFAULT_DB_ALIAS
+    else:
+        replicas = healthy_replicas()
+        reason, alias = (ROUTE_REPLICA, random.choice(replicas)) if replicas else (ROUTE_LAGGING, DEFAULT_DB_ALIAS)
+    metrics.count(metrics.DB_READ_ROUTES, database=alias, reason=reason)
+    return alias
+
+
+@contextmanager
+def read_only(conversation_id=None):
+    """
+    Executa o bloco com as leituras roteadas para uma réplica (ver `ReplicaRouter`).
+
+    O banco é escolhido uma vez na entrada e vale para todo o bloco, para que as
+    consultas de uma mesma resposta vejam o mesmo estado. Sem DATABASE_REPLICAS, o
+    bloco lê do primário.
+
+    Yields:
+        str: Alias do banco escolhido, para leituras que continuam fora do bloco
+            (respostas transmitidas, por exemplo) via `.using()`.
+    """
+    if not settings.DATABASE_REPLICAS:
+        yield DEFAULT_DB_ALIAS
+        return
+    alias = choose_read_alias(conversation_id)
+    token = _read_alias.set(alias)
+    try:
+        yield alias
+    finally:
+        _read_alias.reset(token)
+
+
+class ReplicaRouter:
+    """
+    Roteador de banco: leituras dentro de `read_only` vão para a réplica escolhida.
+
+    Fora desse bloco (ingestão, tarefas, escritas da API) tudo vai para o primário.
+    Escritas sempre vão para o primário, mesmo de objetos lidos de uma réplica, e
+    as migrações só rodam no primário.
+    """
+
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
@@ -0,0 +1,90 @@
+import uuid
+import zlib
+
+from django.conf import settings
+
+DEFAULT_QUEUE = 'celery'
+
+
+def conversation_id_for(event: dict) -> str:
+    """
+    Retorna o ID da conversa afetada por um evento de webhook.
+    """
+    data = event.get('data') or {}
+    if event.get('type') == 'NEW_MESSAGE':
+        return str(data.get('conversation_id', ''))
+    return str(data.get('id', ''))
+
+
+def conversation_hash(conversation_id: str) -> int:
+    """
+    Hash estável do ID de uma conversa, igual em todos os processos.
+    """
+    try:
+        return uuid.UUID(str(conversation_id)).int
+    except ValueError:
+        return zlib.crc32(str(conversation_id).encode('utf-8'))
+
+
+def shard_for(conversation_id: str, shard_count: int = None) -> int:
+    """
+    Calcula o shard de uma conversa a partir do hash estável do seu ID.
+
+    O mapeamento depende apenas do ID e do número de shards (por padrão,
+    WEBHOOK_SHARD_COUNT), então é o mesmo em todos os processos web e workers.
+    """
+    if shard_count is None:
+        shard_count = settings.WEBHOOK_SHARD_COUNT
+    return conversation_hash(conversation_id) % shard_count
+
+
+def shard_queue(shard: int) -> str:
+    """Nome da fila Celery de um shard."""
+    return f'{settings.WEBHOOK_SHARD_QUEUE_PREFIX}.{shard}'
+
+
+def sharding_enabled() -> bool:
+    return settings.WEBHOOK_SHARD_COUNT > 0
+
+
+def queue_for_event(event: dict) -> str:
+    """
+    Retorna a fila onde o evento deve ser processado.
+
+    Com sharding ativo, todos os eventos de uma mesma conversa vão para a mesma
+    fila e são processados em ordem; caso contrário, usa a fila padrão do Celery.
+    """
+    if not sharding_enabled():
+        return DEFAULT_QUEUE
+    return shard_queue(shard_for(conversation_id_for(event)))
+
+
+def group_by_queue(events: list) -> dict:
+    """
+    Agrupa eventos por fila de destino, preservando a ordem relativa dentro de cada fila.
+
+    Returns:
+        dict: Mapeamento de nome da fila para lista de pares (índice original, evento).
+    """
+    groups = {}
+    for index, event in enumerate(events):
+        groups.setdefault(queue_for_event(event), []).append((index, event))
+    return groups
+
+
+def queues_for_worker(worker_index: int, worker_count: int) -> list:
+    """
+    Distribui os shards entre os workers: o worker `i` consome os shards `s` com `s % worker_count == i`.
+
+    Como cada shard pertence a exatamente um worker (executando com concurrency 1),
+    a ordem por conversa é preservada. Para adicionar workers, basta pará-los e
+    reiniciá-los com o novo `worker_count`; o número de shards não muda, então as
+    conversas continuam no mesmo shard.
+    """
+    if not 0 <= worker_index < worker_count:
+        raise ValueError('worker_index must be between 0 and worker_count - 1')
+    return [
+        shard_queue(shard)
+        for shard in range(settings.WEBHOOK_SHARD_COUNT)
+        if shard % worker_count == worker_index
+    ]
@@ -0,0 +1,108 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Value
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+
+from .models import Message
+
+# Configuração de texto do PostgreSQL usada na coluna `search_vector` (migração 0007) e nas consultas
+SEARCH_CONFIG = 'portuguese'
+SEARCH_VECTOR_COLUMN = 'search_vector'
+SEARCH_INDEX_NAME = 'message_search_idx'
+
+
+def full_text_enabled() -> bool:
+    """
+    Indica se a busca usa o índice de texto completo.
+
+    Só o PostgreSQL tem a coluna `search_vector`; nos demais bancos, como o SQLite
+    dos testes, a busca recorre a `content__icontains`.
+    """
+    return connection.vendor == 'postgresql'
+
+
+def _vector_sql() -> str:
+    return f'{connection.ops.quote_name(Message._meta.db_table)}.{SEARCH_VECTOR_COLUMN}'
+
+
+def match_messages(queryset, query: str):
+    """
+    Filtra as mensagens cujo conteúdo corresponde à busca.
+
+    No PostgreSQL, `websearch_to_tsquery` aceita a sintaxe de buscadores (termos,
+    "frases entre aspas", OR e -exclusão) e a correspondência usa o índice GIN
+    sobre `search_vector`.
+    """
+    if not full_text_enabled():
+        return queryset.filter(content__icontains=query)
+    return queryset.filter(RawSQL(
+        f'{_vector_sql()} @@ websearch_to_tsquery(%s::regconfig, %s)',
+        [SEARCH_CONFIG, query],
+        output_field=BooleanField(),
+    ))
+
+
+def search_messages(query: str, state: str = None, direction: str = None, since=None, until=None,
+                    tenant=None, ordering: str = 'rank'):
+    """
+    Busca mensagens por texto, com filtros por conversa, direção e período.
+
+    Com `ordering='rank'`, os resultados são ordenados por relevância (`ts_rank_cd`)
+    entre as WEBHOOK_SEARCH_RANK_WINDOW correspondências mais recentes: calcular a
+    relevância exige ler o vetor de cada linha, e limitar a janela mantém o custo
+    constante mesmo para termos presentes em milhões de mensagens. Com
+    `ordering='recent'`, as correspondências vêm da mais nova para a mais antiga.
+
+    Nos dois casos o PostgreSQL escolhe entre o índice GIN (termos raros: lê as
+    correspondências e ordena) e o índice `message_timestamp_idx` de cada partição
+    (termos comuns: percorre as mensagens da mais nova para a mais antiga e para ao
+    completar a janela ou a página). `since` e `until` limitam `timestamp` e, com a
+    tabela particionada, descartam as partições fora do período; sem `since`, o
+    período começa WEBHOOK_SEARCH_DEFAULT_DAYS dias antes de `until` (ou de agora),
+    para que nenhuma busca percorra o histórico inteiro.
+
+    Fora do PostgreSQL, a relevância é sempre 0 e a ordem é a cronológica inversa.
+
+    Args:
+        query (str): Texto buscado
+        state (str): Estado da conversa (OPEN ou CLOSED)
+        direction (str): Direção da mensagem (SENT ou RECEIVED)
+        since, until (datetime): Período de `timestamp`
+        tenant (Tenant): Restringe a busca às conversas de uma origem
+        ordering (str): 'rank' ou 'recent'
+
+    Returns:
+        QuerySet: Mensagens anotadas com `rank`, com a conversa carregada no mesmo SELECT.
+    """
+    messages = match_messages(Message.objects.all(), query)
+    if tenant is not None:
+        messages = messages.filter(conversation__tenant=tenant)
+    if state:
+        messages = messages.filter(conversation__state=state)
+    if direction:
+        messages = messages.filter(direction=direction)
+    if not since and settings.WEBHOOK_SEARCH_DEFAULT_DAYS:
+        since = (until or timezone.now()) - timedelta(days=settings.WEBHOOK_SEARCH_DEFAULT_DAYS)
+    period = {}
+    if since:
+        period['timestamp__gte'] = since
+    if until:
+        period['timestamp__lt'] = until
+    messages = messages.filter(**period)
+
+    if full_text_enabled() and ordering == 'rank':
+        window = messages.order_by('-timestamp').values('pk')[:settings.WEBHOOK_SEARCH_RANK_WINDOW]
+        # O período se repete fora da janela para que a consulta externa também descarte partições
+        messages = Message.objects.filter(pk__in=window, **period).annotate(rank=RawSQL(
+            f'ts_rank_cd({_vector_sql()}, websearch_to_tsquery(%s::regconfig, %s))',
+            [SEARCH_CONFIG, query],
+            output_field=FloatField(),
+        ))
+        order = ('-rank', '-timestamp', '-id')
+    else:
+        messages = messages.annotate(rank=Value(0.0, output_field=FloatField()))
+        order = ('-timestamp', '-id')
+    return messages.select_related('conversation').order_by(*order)
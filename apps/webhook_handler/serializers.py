@@ -1,5 +1,7 @@
+from django.conf import settings
 from rest_framework import serializers
 from .models import Conversation, Message
+from .pagination import encode_message_cursor
 
 
 class MessageSerializer(serializers.ModelSerializer):
@@ -14,6 +16,21 @@ class MessageSerializer(serializers.ModelSerializer):
         fields = ['id', 'direction', 'content', 'timestamp']
 
 
+class MessageSearchResultSerializer(serializers.ModelSerializer):
+    """
+    Serializer para os resultados da busca de mensagens.
+
+    Inclui a conversa da mensagem, seu estado e a relevância calculada pela busca.
+    """
+    conversation_id = serializers.UUIDField(read_only=True)
+    conversation_state = serializers.CharField(source='conversation.state', read_only=True)
+    rank = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = Message
+        fields = ['id', 'conversation_id', 'conversation_state', 'direction', 'content', 'timestamp', 'rank']
+
+
 class ConversationSerializer(serializers.ModelSerializer):
     """
     Serializer para o modelo Conversation.
@@ -28,6 +45,50 @@ class ConversationSerializer(serializers.ModelSerializer):
         fields = ['id', 'state', 'messages']
 
 
+class ConversationDetailSerializer(serializers.ModelSerializer):
+    """
+    Serializer para o detalhe de uma conversa.
+
+    Inclui apenas as CONVERSATION_DETAIL_MESSAGE_LIMIT mensagens mais recentes, em ordem
+    cronológica, carregadas no atributo `recent_messages` (uma a mais que o limite, para
+    saber se há histórico anterior). O restante é obtido pela rota paginada de mensagens,
+    usando `messages_cursor` para buscar só as novas.
+    """
+    messages = serializers.SerializerMethodField()
+    has_earlier_messages = serializers.SerializerMethodField()
+    messages_cursor = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Conversation
+        fields = ['id', 'state', 'messages', 'has_earlier_messages', 'messages_cursor']
+
+    def _recent(self, obj):
+        return obj.recent_messages[:settings.CONVERSATION_DETAIL_MESSAGE_LIMIT]
+
+    def get_messages(self, obj):
+        return MessageSerializer(self._recent(obj)[::-1], many=True).data
+
+    def get_has_earlier_messages(self, obj):
+        return len(obj.recent_messages) > settings.CONVERSATION_DETAIL_MESSAGE_LIMIT
+
+    def get_messages_cursor(self, obj):
+        recent = self._recent(obj)
+        return encode_message_cursor(recent[0]) if recent else None
+
+
+class ConversationListSerializer(serializers.ModelSerializer):
+    """
+    Serializer resumido para a listagem de conversas.
+
+    Não carrega as mensagens: a quantidade, a data, a prévia e a direção da última
+    mensagem são os campos de resumo mantidos na própria conversa pela ingestão.
+    """
+    class Meta:
+        model = Conversation
+        fields = ['id', 'state', 'message_count', 'last_message_at', 'last_message_preview', 'last_direction']
+        read_only_fields = fields
+
+
 class WebhookSerializer(serializers.Serializer):
     """
     Serializer para validar os dados recebidos via webhook.
@@ -1,8 +1,122 @@
 import logging
-from .models import Conversation, Message
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+
+from . import replicas, summaries, updates
+from .caching import invalidate_conversations
+from .models import Conversation, DeadLetterEvent, Message, PendingEvent
 
 logger = logging.getLogger('webhook_handler')
 
+CONVERSATION_NOT_FOUND = 'Conversation not found'
+CONVERSATION_CLOSED = 'Cannot add message to closed conversation'
+FOREIGN_CONVERSATION = 'Conversation belongs to another source'
+
+# Primeira chave das travas consultivas por conversa (ver `_lock_pending_events`), para não colidir com outras
+PENDING_LOCK_NAMESPACE = 4004
+
+
+class BatchPlan:
+    """
+    Plano de escrita de um lote de eventos.
+
+    Aplica os eventos, em ordem, sobre um retrato em memória do estado das conversas
+    e acumula as linhas a inserir e as conversas a fechar, agrupadas por tipo de evento.
+    Mensagens de conversas ainda desconhecidas são estacionadas; se a conversa for
+    criada mais adiante no mesmo lote, elas entram diretamente no lote de mensagens.
+    Conversas e mensagens que já existem são tratadas como reentregas e ignoradas.
+    Eventos que tocam conversas de outra origem (`tenant_id`) falham como se a
+    conversa não existisse.
+
+    Attributes:
+        new_conversations (list): Conversas a criar em massa
+        new_messages (list): Mensagens a criar em massa
+        closed_ids (set): IDs das conversas a fechar com um único `update`
+        parked (dict): Eventos de mensagem por ID de conversa desconhecida, a estacionar
+        results (list): Resultado por evento, na ordem da entrada
+    """
+
+    def __init__(self, states: dict, existing_messages: set, tenants: dict = None):
+        self.states = states
+        self.tenants = tenants or {}
+        self.existing_messages = existing_messages
+        self.new_conversations = []
+        self.new_messages = []
+        self.closed_ids = set()
+        self.parked = {}
+        self.results = []
+
+    def add(self, event: dict, parsed) -> None:
+        """
+        Aplica um evento ao plano e registra seu resultado.
+
+        Args:
+            event (dict): Evento original, usado para estacionar mensagens.
+            parsed (tuple | Exception): Resultado de `WebhookService._parse_event` para o evento.
+        """
+        index = len(self.results)
+        self.results.append({'index': index, 'status': 'processed'})
+        if isinstance(parsed, Exception):
+            return self._reject(index, f'Invalid event: {parsed}')
+
+        event_type, conversation_id, fields = parsed
+        handlers = {
+            'NEW_CONVERSATION': self._add_conversation,
+            'NEW_MESSAGE': self._add_message,
+            'CLOSE_CONVERSATION': self._close_conversation,
+        }
+        handlers[event_type](index, event, conversation_id, fields)
+
+    def _reject(self, index, error):
+        self.results[index] = {'index': index, 'status': 'failed', 'error': error}
+
+    def _skip_duplicate(self, index):
+        self.results[index]['status'] = 'duplicate'
+
+    def _owned(self, conversation_id, event) -> bool:
+        return self.tenants.get(conversation_id) == event.get('tenant_id')
+
+    def _add_conversation(self, index, event, conversation_id, fields):
+        if conversation_id in self.states:
+            return self._skip_duplicate(index)
+        self.states[conversation_id] = Conversation.OPEN_CHOICE
+        self.tenants[conversation_id] = event.get('tenant_id')
+        self.new_conversations.append(Conversation(id=conversation_id, tenant_id=event.get('tenant_id')))
+        still_parked = []
+        for parked_index, parked_event, parked_fields in self.parked.pop(conversation_id, []):
+            if not self._owned(conversation_id, parked_event):
+                still_parked.append((parked_index, parked_event, parked_fields))
+                continue
+            self.new_messages.append(Message(conversation_id=conversation_id, **parked_fields))
+            self.results[parked_index]['status'] = 'processed'
+        if still_parked:
+            self.parked[conversation_id] = still_parked
+
+    def _add_message(self, index, event, conversation_id, fields):
+        if fields['id'] in self.existing_messages:
+            return self._skip_duplicate(index)
+        state = self.states.get(conversation_id)
+        if state is not None and not self._owned(conversation_id, event):
+            return self._reject(index, CONVERSATION_NOT_FOUND)
+        if state == Conversation.CLOSED_CHOICE:
+            return self._reject(index, CONVERSATION_CLOSED)
+        self.existing_messages.add(fields['id'])
+        if state is None:
+            self.parked.setdefault(conversation_id, []).append((index, event, fields))
+            self.results[index]['status'] = 'parked'
+            return
+        self.new_messages.append(Message(conversation_id=conversation_id, **fields))
+
+    def _close_conversation(self, index, event, conversation_id, fields):
+        if conversation_id not in self.states or not self._owned(conversation_id, event):
+            return self._reject(index, CONVERSATION_NOT_FOUND)
+        self.states[conversation_id] = Conversation.CLOSED_CHOICE
+        self.closed_ids.add(conversation_id)
+
 
 class WebhookService:
     """
@@ -11,22 +125,38 @@ class WebhookService:
     Esta classe separa a regra de negócio da camada de visualização para facilitar testes unitários
     e manter a responsabilidade única dos componentes.
     """
+    # Quantidade máxima de linhas por INSERT nas escritas em massa
+    BULK_BATCH_SIZE = 1000
 
     @staticmethod
     def create_conversation(data: dict) -> Conversation:
         """
         Cria uma nova conversa no sistema.
 
+        Mensagens estacionadas à espera desta conversa são aplicadas na mesma transação,
+        sob a trava de `_lock_pending_events`. A inserção usa `ON CONFLICT DO NOTHING`,
+        então a reentrega de uma conversa já existente (inclusive por outra origem) é
+        uma operação sem efeito e não publica atualização.
+
         Args:
-            data (dict): Dicionário contendo os dados da conversa, incluindo o ID.
+            data (dict): Dicionário contendo os dados da conversa, incluindo o ID e,
+                        opcionalmente, o `tenant_id` da origem.
 
         Returns:
-            Conversation: A nova conversa criada.
+            Conversation: A conversa criada (ou a instância do evento, em caso de reentrega).
         """
         conversation_id = data['data']['id']
-        logger.info(f"Creating new conversation with ID: {conversation_id}")
-        conversation = Conversation.objects.create(id=conversation_id)
-        logger.debug(f"Conversation {conversation_id} created successfully")
+        logger.info("Creating new conversation with ID: %s", conversation_id)
+        conversation = Conversation(id=conversation_id, tenant_id=data.get('tenant_id'))
+        with transaction.atomic():
+            WebhookService._lock_pending_events([conversation_id])
+            if WebhookService._insert_ignoring_conflicts([conversation]):
+                replicas.mark_written([conversation_id])
+                updates.publish(
+                    updates.conversation_changed(conversation_id, Conversation.OPEN_CHOICE, conversation.tenant_id)
+                )
+            WebhookService.flush_pending_events([conversation_id])
+        logger.debug("Conversation %s created successfully", conversation_id)
         return conversation
 
     @staticmethod
@@ -34,46 +164,155 @@ class WebhookService:
         """
         Cria uma nova mensagem em uma conversa existente.
 
+        A verificação do estado da conversa e a inserção acontecem em um único comando
+        (ver `_insert_message_if_open`); só quando nada é inserido uma segunda consulta
+        descobre o motivo. Se a conversa ainda não existir (eventos fora de ordem), a
+        mensagem é estacionada em PendingEvent e aplicada quando a conversa for criada.
+
         Args:
             data (dict): Dicionário contendo os dados da mensagem, incluindo ID da conversa,
                         direção, conteúdo e timestamp.
 
         Returns:
-            Message: A nova mensagem criada.
+            Message: A nova mensagem criada, ou None se ela foi estacionada.
 
         Raises:
-            ValueError: Se tentar adicionar mensagem a uma conversa fechada ou se a conversa não existir.
+            ValueError: Se tentar adicionar mensagem a uma conversa fechada.
         """
         conversation_id = data['data']['conversation_id']
         message_id = data['data']['id']
-        logger.info(f"Creating new message {message_id} for conversation {conversation_id}")
+        logger.info("Creating new message %s for conversation %s", message_id, conversation_id)
 
-        try:
-            conversation = Conversation.objects.get(id=conversation_id)
-            logger.debug(f"Found conversation {conversation_id}")
-        except Conversation.DoesNotExist:
-            logger.error(f"Conversation {conversation_id} not found")
-            raise ValueError('Conversation not found')
-
-        if conversation.state == Conversation.CLOSED_CHOICE:
-            logger.error(f"Attempted to add message to closed conversation {conversation_id}")
-            raise ValueError('Cannot add message to closed conversation')
-
-        message = Message.objects.create(
+        message = Message(
             id=message_id,
-            conversation=conversation,
+            conversation_id=conversation_id,
             direction=data['data']['direction'],
             content=data['data']['content'],
             timestamp=data['timestamp']
         )
-        logger.info(f"Message {message_id} created successfully in conversation {conversation_id}")
+        with transaction.atomic():
+            inserted = WebhookService._insert_message_if_open(message, data.get('tenant_id'))
+            if inserted:
+                summaries.apply_messages([message])
+        if inserted:
+            invalidate_conversations([conversation_id])
+            replicas.mark_written([conversation_id])
+            updates.publish(updates.message_created(message, data.get('tenant_id')))
+            logger.info("Message %s created successfully in conversation %s", message_id, conversation_id)
+            return message
+
+        # Nada foi inserido: a conversa não existe, é de outra origem, está fechada ou a mensagem é uma reentrega
+        conversation = Conversation.objects.filter(id=conversation_id).values_list('state', 'tenant_id').first()
+        if conversation is None:
+            logger.warning("Conversation %s not found, parking message %s", conversation_id, message_id)
+            WebhookService.park_events([data])
+            return None
+        state, tenant_id = conversation
+        if tenant_id != data.get('tenant_id'):
+            logger.error("Conversation %s belongs to another source", conversation_id)
+            raise ValueError(CONVERSATION_NOT_FOUND)
+        if state == Conversation.CLOSED_CHOICE:
+            logger.error("Attempted to add message to closed conversation %s", conversation_id)
+            raise ValueError(CONVERSATION_CLOSED)
+
+        logger.info("Message %s already exists in conversation %s, ignoring redelivery", message_id, conversation_id)
         return message
 
+    @staticmethod
+    def _insert_message_if_open(message: Message, tenant_id=None) -> bool:
+        """
+        Insere uma mensagem somente se sua conversa existir, pertencer à origem `tenant_id`
+        e estiver aberta, em um único comando SQL.
+
+        O `INSERT ... SELECT` lê o estado da conversa no mesmo comando que grava a mensagem,
+        sem uma consulta prévia. No PostgreSQL, a linha da conversa é travada com
+        `FOR NO KEY UPDATE`: um fechamento concorrente espera a inserção terminar ou, se
+        vier antes, faz a inserção não encontrar a conversa aberta, então nenhuma mensagem
+        entra depois do fechamento. A trava é exclusiva porque a mesma transação atualiza
+        em seguida o resumo da conversa; com `FOR SHARE`, duas inserções concorrentes na
+        mesma conversa entrariam em deadlock. Mensagens de uma mesma conversa são, assim,
+        gravadas uma de cada vez. Reentregas são ignoradas com `ON CONFLICT DO NOTHING`.
+
+        Returns:
+            bool: True se a mensagem foi inserida.
+        """
+        conversation_table = connection.ops.quote_name(Conversation._meta.db_table)
+        fields = Message._meta.concrete_fields
+        columns = ', '.join(connection.ops.quote_name(field.column) for field in fields)
+        lock = ' FOR NO KEY UPDATE' if connection.vendor == 'postgresql' else ''
+        tenant_field = Conversation._meta.get_field('tenant')
+        tenant_column = f'{conversation_table}.{connection.ops.quote_name(tenant_field.column)}'
+        tenant_condition = f'{tenant_column} IS NULL' if tenant_id is None else f'{tenant_column} = %s'
+        sql = (
+            f"INSERT INTO {connection.ops.quote_name(Message._meta.db_table)} ({columns}) "
+            f"SELECT {', '.join(['%s'] * len(fields))} FROM {conversation_table} "
+            f"WHERE {conversation_table}.id = %s AND {conversation_table}.state = %s AND {tenant_condition}{lock} "
+            f"ON CONFLICT DO NOTHING"
+        )
+        # `pre_save` preenche os campos automáticos (created_at, updated_at), como no `save()`
+        params = [field.get_db_prep_save(field.pre_save(message, True), connection) for field in fields]
+        conversation_field = Message._meta.get_field('conversation')
+        params += [conversation_field.get_db_prep_save(message.conversation_id, connection), Conversation.OPEN_CHOICE]
+        if tenant_id is not None:
+            params.append(tenant_id)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.rowcount == 1
+
+    @staticmethod
+    def _insert_ignoring_conflicts(objs: list) -> set:
+        """
+        Insere instâncias de um modelo em massa, ignorando as que já existem.
+
+        Como `bulk_create(ignore_conflicts=True)`, mas com `RETURNING`: informa quais
+        linhas foram de fato inseridas, para que reentregas (e inserções concorrentes da
+        mesma linha) fiquem fora do resumo das conversas e das atualizações em tempo
+        real. Usa um comando por bloco de BULK_BATCH_SIZE linhas.
+
+        Args:
+            objs (list): Instâncias não salvas, todas do mesmo modelo.
+
+        Returns:
+            set: Chaves primárias das linhas inseridas.
+        """
+        if not objs:
+            return set()
+        meta = objs[0]._meta
+        fields = meta.concrete_fields
+        columns = ', '.join(connection.ops.quote_name(field.column) for field in fields)
+        row = f"({', '.join(['%s'] * len(fields))})"
+        inserted = set()
+        with connection.cursor() as cursor:
+            for start in range(0, len(objs), WebhookService.BULK_BATCH_SIZE):
+                chunk = objs[start:start + WebhookService.BULK_BATCH_SIZE]
+                # `pre_save` preenche os campos automáticos (created_at, updated_at), como no `save()`
+                params = [
+                    field.get_db_prep_save(field.pre_save(obj, True), connection) for obj in chunk for field in fields
+                ]
+                cursor.execute(
+                    f"INSERT INTO {connection.ops.quote_name(meta.db_table)} ({columns}) "
+                    f"VALUES {', '.join([row] * len(chunk))} "
+                    f"ON CONFLICT DO NOTHING RETURNING {connection.ops.quote_name(meta.pk.column)}",
+                    params
+                )
+                inserted.update(meta.pk.to_python(value) for value, in cursor.fetchall())
+        return inserted
+
+    @staticmethod
+    def _inserted(objs: list) -> list:
+        """Insere as instâncias com `_insert_ignoring_conflicts` e retorna só as inseridas, uma por chave."""
+        inserted = WebhookService._insert_ignoring_conflicts(objs)
+        return list({obj.pk: obj for obj in objs if obj.pk in inserted}.values())
+
     @staticmethod
     def close_conversation(data: dict) -> Conversation:
         """
         Fecha uma conversa existente.
 
+        O fechamento é um único `UPDATE` condicional, sem leitura prévia da linha.
+        Fechar uma conversa já fechada é uma operação sem efeito. Conversas de outra
+        origem são tratadas como inexistentes.
+
         Args:
             data (dict): Dicionário contendo o ID da conversa a ser fechada.
 
@@ -81,18 +320,374 @@ class WebhookService:
             Conversation: A conversa atualizada.
 
         Raises:
-            Http404: Se a conversa não for encontrada.
+            ValueError: Se a conversa não for encontrada.
         """
         conversation_id = data['data']['id']
-        logger.info(f"Closing conversation {conversation_id}")
+        logger.info("Closing conversation %s", conversation_id)
+        updated = Conversation.objects.filter(id=conversation_id, tenant_id=data.get('tenant_id')).update(
+            state=Conversation.CLOSED_CHOICE, updated_at=timezone.now()
+        )
+        if not updated:
+            logger.error("Conversation %s not found", conversation_id)
+            raise ValueError(CONVERSATION_NOT_FOUND)
+        invalidate_conversations([conversation_id])
+        replicas.mark_written([conversation_id])
+        updates.publish(
+            updates.conversation_changed(conversation_id, Conversation.CLOSED_CHOICE, data.get('tenant_id'))
+        )
+
+        logger.info("Conversation %s closed successfully", conversation_id)
+        return Conversation(id=conversation_id, state=Conversation.CLOSED_CHOICE)
+
+    @staticmethod
+    def _lock_pending_events(conversation_ids) -> None:
+        """
+        Serializa, por conversa, a criação da conversa e o estacionamento de mensagens.
+
+        Em READ COMMITTED, um worker que cria a conversa e outro que estaciona uma
+        mensagem dela podem não ver a escrita um do outro: a criação não encontra a
+        mensagem, ainda não confirmada, e o estacionamento não encontra a conversa, e a
+        mensagem fica presa até expirar. Com uma trava consultiva de transação por
+        conversa (`pg_advisory_xact_lock`), quem chega depois espera o commit do outro
+        e, como cada comando vê os dados já confirmados, encontra a conversa ou a
+        mensagem. As travas são tomadas em ordem, evitando deadlocks entre lotes. Fora
+        do PostgreSQL (SQLite), as escritas já são serializadas pelo próprio banco.
+        """
+        if connection.vendor != 'postgresql' or not conversation_ids:
+            return
+        keys = sorted({str(uuid.UUID(str(conversation_id))) for conversation_id in conversation_ids})
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT pg_advisory_xact_lock(%s, hashtext(id)) FROM unnest(%s::text[]) AS id",
+                [PENDING_LOCK_NAMESPACE, keys]
+            )
+
+    @staticmethod
+    def park_events(events: list) -> None:
+        """
+        Estaciona eventos de mensagem cujas conversas ainda não existem.
+
+        Depois de gravar os eventos, verifica se alguma das conversas já foi criada e,
+        nesse caso, aplica os eventos imediatamente. A gravação e a verificação rodam na
+        mesma transação, sob a trava de `_lock_pending_events`: uma criação concorrente
+        da conversa ou termina antes, e é encontrada aqui, ou espera este commit, e
+        então aplica os eventos estacionados.
+
+        Args:
+            events (list): Eventos NEW_MESSAGE já validados.
+        """
+        if not events:
+            return
+        conversation_ids = {event['data']['conversation_id'] for event in events}
+        expires_at = timezone.now() + timedelta(seconds=settings.WEBHOOK_PENDING_EVENT_TTL)
+        with transaction.atomic():
+            WebhookService._lock_pending_events(conversation_ids)
+            PendingEvent.objects.bulk_create(
+                [
+                    PendingEvent(
+                        conversation_id=event['data']['conversation_id'],
+                        payload=event,
+                        expires_at=expires_at
+                    )
+                    for event in events
+                ],
+                batch_size=WebhookService.BULK_BATCH_SIZE
+            )
+            arrived = list(Conversation.objects.filter(id__in=conversation_ids).values_list('id', flat=True))
+            WebhookService.flush_pending_events(arrived)
+
+    @staticmethod
+    def flush_pending_events(conversation_ids: list) -> int:
+        """
+        Aplica em massa as mensagens estacionadas para as conversas informadas.
+
+        As conversas são travadas (`FOR NO KEY UPDATE`, como em `_insert_message_if_open`),
+        para que um fechamento concorrente espere a aplicação, e só as abertas recebem
+        mensagens. As linhas pendentes são travadas com `SKIP LOCKED`, de modo que
+        workers concorrentes nunca apliquem o mesmo evento duas vezes. Eventos de
+        conversas já fechadas, ou enviados por uma origem diferente da dona da conversa,
+        vão para a dead-letter.
+
+        Args:
+            conversation_ids (list): IDs das conversas recém-criadas.
+
+        Returns:
+            int: Quantidade de eventos retirados da fila de pendentes.
+        """
+        if not conversation_ids:
+            return 0
+        with transaction.atomic():
+            conversations = {
+                conversation_id: (state, tenant_id)
+                for conversation_id, state, tenant_id in Conversation.objects.select_for_update(no_key=True)
+                .filter(id__in=conversation_ids).order_by('id').values_list('id', 'state', 'tenant_id')
+            }
+            pending = list(
+                PendingEvent.objects.select_for_update(skip_locked=True)
+                .filter(conversation_id__in=conversations)
+                .order_by('received_at')
+            )
+            if not pending:
+                return 0
+            messages, rejected = WebhookService._split_pending(pending, conversations)
+            # Reentregas estacionadas não contam no resumo das conversas
+            messages = WebhookService._inserted(messages)
+            summaries.apply_messages(messages)
+            DeadLetterEvent.objects.bulk_create([
+                DeadLetterEvent(payload=event.payload, reason=reason, received_at=event.received_at)
+                for event, reason in rejected
+            ])
+            PendingEvent.objects.filter(id__in=[event.id for event in pending]).delete()
+            invalidate_conversations(event.conversation_id for event in pending)
+            replicas.mark_written(conversation_ids)
+            updates.publish([
+                delta for message in messages
+                for delta in updates.message_created(message, conversations[message.conversation_id][1])
+            ])
+        logger.info("Flushed %s pending messages for %s conversations", len(pending), len(conversation_ids))
+        return len(pending)
+
+    @staticmethod
+    def _split_pending(pending: list, conversations: dict) -> tuple:
+        """
+        Separa os eventos estacionados entre mensagens a inserir e eventos a descartar.
+
+        Args:
+            pending (list): Eventos estacionados (PendingEvent).
+            conversations (dict): (estado, origem) por ID de conversa.
+
+        Returns:
+            tuple: (mensagens, lista de pares (evento, motivo do descarte))
+        """
+        messages = []
+        rejected = []
+        for event in pending:
+            state, tenant_id = conversations[event.conversation_id]
+            if event.payload.get('tenant_id') != tenant_id:
+                rejected.append((event, FOREIGN_CONVERSATION))
+            elif state != Conversation.OPEN_CHOICE:
+                rejected.append((event, CONVERSATION_CLOSED))
+            else:
+                messages.append(Message(
+                    id=uuid.UUID(str(event.payload['data']['id'])),
+                    conversation_id=event.conversation_id,
+                    direction=event.payload['data']['direction'],
+                    content=event.payload['data']['content'],
+                    timestamp=event.payload['timestamp']
+                ))
+        return messages, rejected
+
+    @staticmethod
+    def expire_pending_events() -> int:
+        """
+        Move para a dead-letter os eventos estacionados cujo prazo expirou.
+
+        Antes, aplica os eventos cuja conversa já existe (ver `flush_pending_events`),
+        esperando as criações de conversa em andamento (`_lock_pending_events`): um
+        evento só é descartado se a conversa nunca chegou.
+
+        Returns:
+            int: Quantidade de eventos movidos.
+        """
+        with transaction.atomic():
+            expired = list(
+                PendingEvent.objects.select_for_update(skip_locked=True)
+                .filter(expires_at__lte=timezone.now())
+            )
+            WebhookService._lock_pending_events({event.conversation_id for event in expired})
+            arrived = set(
+                Conversation.objects.filter(id__in={event.conversation_id for event in expired})
+                .values_list('id', flat=True)
+            )
+            if arrived:
+                logger.warning("Applying expired pending events of %s existing conversations", len(arrived))
+                WebhookService.flush_pending_events(list(arrived))
+                expired = [event for event in expired if event.conversation_id not in arrived]
+            DeadLetterEvent.objects.bulk_create(
+                [
+                    DeadLetterEvent(
+                        payload=event.payload,
+                        reason='Conversation not found before pending event expired',
+                        received_at=event.received_at
+                    )
+                    for event in expired
+                ],
+                batch_size=WebhookService.BULK_BATCH_SIZE
+            )
+            PendingEvent.objects.filter(id__in=[event.id for event in expired]).delete()
+        if expired:
+            logger.warning("Moved %s expired pending events to dead letter", len(expired))
+        return len(expired)
+
+    @staticmethod
+    def process_event(data: dict):
+        """
+        Encaminha um evento para o handler correspondente ao seu tipo.
+
+        Args:
+            data (dict): Evento já validado pelo WebhookSerializer.
+
+        Returns:
+            Conversation | Message: O objeto criado ou atualizado pelo handler.
+        """
+        handlers = {
+            'NEW_CONVERSATION': WebhookService.create_conversation,
+            'NEW_MESSAGE': WebhookService.create_message,
+            'CLOSE_CONVERSATION': WebhookService.close_conversation,
+        }
+        return handlers[data['type']](data)
+
+    @staticmethod
+    def process_batch(events: list) -> list:
+        """
+        Processa um lote de eventos de webhook com escrita em massa.
+
+        Os eventos são avaliados na ordem recebida contra um retrato em memória do
+        estado das conversas envolvidas (carregado com uma única consulta), o que
+        preserva a semântica do processamento individual: mensagens em conversas
+        fechadas são rejeitadas, mensagens de conversas desconhecidas são estacionadas
+        e fechamentos de conversas desconhecidas falham. As escritas são
+        agrupadas por tipo de evento e persistidas em massa dentro de uma única
+        transação, com `ON CONFLICT DO NOTHING` para que reentregas concorrentes não
+        desfaçam o lote. O resumo das conversas (contagem e última mensagem) é
+        atualizado na mesma transação, com um `UPDATE` por conversa tocada, somente
+        com as mensagens que o banco de fato inseriu (`RETURNING`).
+
+        Args:
+            events (list): Lista de eventos já validados pelo WebhookSerializer.
+
+        Returns:
+            list: Resultado por evento, na mesma ordem da entrada, no formato
+                {'index': int, 'status': 'processed' | 'parked' | 'duplicate' | 'failed', 'error': str}.
+        """
+        logger.info("Processing batch of %s webhook events", len(events))
+        parsed = []
+        for event in events:
+            try:
+                parsed.append(WebhookService._parse_event(event))
+            except (KeyError, TypeError, ValueError) as e:
+                parsed.append(e)
+
+        conversation_ids = {item[1] for item in parsed if isinstance(item, tuple)}
+        message_ids = {item[2]['id'] for item in parsed if isinstance(item, tuple) and item[0] == 'NEW_MESSAGE'}
+        states = {}
+        tenants = {}
+        for conversation_id, state, tenant_id in (
+            Conversation.objects.filter(id__in=conversation_ids).values_list('id', 'state', 'tenant_id')
+        ):
+            states[conversation_id] = state
+            tenants[conversation_id] = tenant_id
+        existing_messages = set(
+            Message.objects.filter(id__in=message_ids).values_list('id', flat=True)
+        )
+
+        plan = BatchPlan(states, existing_messages, tenants)
+        for event, item in zip(events, parsed):
+            plan.add(event, item)
+        results = plan.results
+
+        with transaction.atomic():
+            WebhookService._lock_pending_events(
+                [conversation.id for conversation in plan.new_conversations] + list(plan.parked)
+            )
+            # Conversas criadas por uma entrega concorrente não geram atualização de novo
+            plan.new_conversations = WebhookService._inserted(plan.new_conversations)
+            # Mensagens inseridas por uma entrega concorrente não contam de novo no resumo
+            plan.new_messages = WebhookService._inserted(plan.new_messages)
+            summaries.apply_messages(plan.new_messages)
+            WebhookService.flush_pending_events([conversation.id for conversation in plan.new_conversations])
+            WebhookService.park_events([event for items in plan.parked.values() for _, event, _ in items])
+            if plan.closed_ids:
+                Conversation.objects.filter(id__in=plan.closed_ids).update(
+                    state=Conversation.CLOSED_CHOICE,
+                    updated_at=timezone.now()
+                )
+            written = [message.conversation_id for message in plan.new_messages] + list(plan.closed_ids)
+            invalidate_conversations(written)
+            replicas.mark_written(written + [conversation.id for conversation in plan.new_conversations])
+            updates.publish(WebhookService._batch_updates(plan))
+
+        failed = sum(1 for result in results if result['status'] == 'failed')
+        logger.info(
+            "Batch processed: %s conversations created, %s messages created, %s conversations closed, "
+            "%s messages parked, %s events failed",
+            len(plan.new_conversations), len(plan.new_messages), len(plan.closed_ids),
+            sum(len(items) for items in plan.parked.values()), failed
+        )
+        return results
+
+    @staticmethod
+    def _batch_updates(plan: BatchPlan) -> list:
+        """Deltas de atualização em tempo real das escritas de um lote."""
+        deltas = []
+        for conversation in plan.new_conversations:
+            deltas += updates.conversation_changed(conversation.id, Conversation.OPEN_CHOICE, conversation.tenant_id)
+        for message in plan.new_messages:
+            deltas += updates.message_created(message, plan.tenants.get(message.conversation_id))
+        for conversation_id in plan.closed_ids:
+            deltas += updates.conversation_changed(
+                conversation_id, Conversation.CLOSED_CHOICE, plan.tenants.get(conversation_id)
+            )
+        return deltas
+
+    @staticmethod
+    def process_micro_batch(events: list) -> list:
+        """
+        Processa um micro-lote com o caminho em massa, recorrendo ao processamento
+        individual se o lote falhar no banco.
+
+        Um erro de banco em `process_batch` (por exemplo, uma violação de integridade
+        causada por escrita concorrente) desfaz o lote inteiro; nesse caso cada evento
+        é reprocessado em sua própria transação, para que um evento problemático não
+        contamine os demais.
+
+        Args:
+            events (list): Lista de eventos já validados pelo WebhookSerializer.
+
+        Returns:
+            list: Resultado por evento, no mesmo formato de `process_batch`.
+        """
         try:
-            conversation = Conversation.objects.get(id=conversation_id)
-            logger.debug(f"Found conversation {conversation_id}")
-        except Conversation.DoesNotExist:
-            logger.error(f"Conversation {conversation_id} not found")
-            raise ValueError('Conversation not found')
-        conversation.state = Conversation.CLOSED_CHOICE
-        conversation.save()
-
-        logger.info(f"Conversation {conversation_id} closed successfully")
-        return conversation
+            return WebhookService.process_batch(events)
+        except DatabaseError as e:
+            logger.warning("Batch of %s events failed, falling back to per-event processing: %s", len(events), e)
+
+        results = []
+        for index, event in enumerate(events):
+            try:
+                with transaction.atomic():
+                    outcome = WebhookService.process_event(event)
+            except (DatabaseError, KeyError, TypeError, ValueError) as e:
+                results.append(WebhookService._batch_result(index, error=str(e)))
+            else:
+                # create_message retorna None quando a mensagem foi estacionada
+                results.append(WebhookService._batch_result(index, parked=outcome is None))
+        return results
+
+    @staticmethod
+    def _parse_event(event: dict) -> tuple:
+        """
+        Extrai de um evento o tipo, o ID da conversa afetada e os campos da mensagem.
+
+        Raises:
+            KeyError, TypeError, ValueError: Se o evento estiver incompleto ou malformado.
+        """
+        event_type = event['type']
+        data = event['data']
+        if event_type == 'NEW_MESSAGE':
+            fields = {
+                'id': uuid.UUID(str(data['id'])),
+                'direction': data['direction'],
+                'content': data['content'],
+                'timestamp': event['timestamp'],
+            }
+            return event_type, uuid.UUID(str(data['conversation_id'])), fields
+        if event_type in ('NEW_CONVERSATION', 'CLOSE_CONVERSATION'):
+            return event_type, uuid.UUID(str(data['id'])), None
+        raise ValueError(f'Unknown event type {event_type}')
+
+    @staticmethod
+    def _batch_result(index: int, error: str = None, parked: bool = False) -> dict:
+        if error:
+            return {'index': index, 'status': 'failed', 'error': error}
+        return {'index': index, 'status': 'parked' if parked else 'processed'}
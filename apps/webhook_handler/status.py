@@ -0,0 +1,130 @@
+import random
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from django_celery_results.models import TaskResult
+
+EVENT_STATUS_KEY = 'webhook:event-status:{}'
+
+PENDING = 'PENDING'
+PARKED = 'PARKED'
+SUCCESS = 'SUCCESS'
+FAILURE = 'FAILURE'
+
+# Modos de rastreamento do resultado das tarefas de webhook (WEBHOOK_RESULT_MODE)
+RESULT_MODE_DB = 'db'            # Toda tarefa grava um TaskResult (django-celery-results)
+RESULT_MODE_REDIS = 'redis'      # Status gravado apenas no armazenamento de status, com TTL
+RESULT_MODE_SAMPLED = 'sampled'  # Uma amostra grava TaskResult; as demais usam o armazenamento de status
+RESULT_MODE_NONE = 'none'        # Nenhum resultado é armazenado
+
+
+def set_event_statuses(statuses: dict) -> None:
+    """
+    Registra o resultado de vários eventos processados fora de uma tarefa própria.
+
+    Args:
+        statuses (dict): Mapeamento de ID do evento para um dicionário com
+            `status` (PENDING, PARKED, SUCCESS ou FAILURE) e, opcionalmente, `error`.
+    """
+    cache.set_many(
+        {EVENT_STATUS_KEY.format(event_id): value for event_id, value in statuses.items()},
+        timeout=settings.WEBHOOK_EVENT_STATUS_TTL
+    )
+
+
+def get_event_status(event_id: str) -> dict:
+    """
+    Retorna o resultado registrado para um evento, ou None se não houver registro.
+    """
+    return cache.get(EVENT_STATUS_KEY.format(event_id))
+
+
+def from_batch_result(result: dict) -> dict:
+    """
+    Converte um resultado de `WebhookService.process_batch` no formato do armazenamento de status.
+    """
+    if result['status'] == 'failed':
+        return {'status': FAILURE, 'error': result['error']}
+    if result['status'] == 'parked':
+        return {'status': PARKED}
+    if result['status'] == 'duplicate':
+        return {'status': SUCCESS, 'duplicate': True}
+    return {'status': SUCCESS}
+
+
+def stores_result_in_db() -> bool:
+    """
+    Decide se a próxima tarefa de webhook deve gravar seu resultado no banco.
+
+    No modo `sampled`, apenas a fração WEBHOOK_RESULT_SAMPLE_RATE das tarefas grava TaskResult.
+    """
+    mode = settings.WEBHOOK_RESULT_MODE
+    if mode == RESULT_MODE_SAMPLED:
+        return random.random() < settings.WEBHOOK_RESULT_SAMPLE_RATE
+    return mode == RESULT_MODE_DB
+
+
+def apply_tracked(task, args: list, **options):
+    """
+    Enfileira uma tarefa de webhook respeitando o modo de rastreamento de resultados.
+
+    Tarefas que não gravam TaskResult são enviadas com `ignore_result`, evitando uma
+    escrita no banco por evento; fora do modo `none`, o status PENDING é registrado no
+    armazenamento de status antes da publicação e o worker o atualiza ao terminar
+    (ver `record_task_status` em tasks.py).
+
+    Args:
+        task: Tarefa Celery a ser enfileirada.
+        args (list): Argumentos posicionais da tarefa.
+        **options: Opções repassadas para `apply_async` (por exemplo, `queue`, `task_id` ou `producer`).
+
+    Returns:
+        AsyncResult: Resultado assíncrono da tarefa enfileirada.
+    """
+    if stores_result_in_db():
+        return task.apply_async(args=args, **options)
+
+    task_id = options.pop('task_id', None) or str(uuid.uuid4())
+    if settings.WEBHOOK_RESULT_MODE != RESULT_MODE_NONE:
+        # Gravado antes da publicação: um worker rápido não pode ter seu resultado sobrescrito
+        set_event_statuses({task_id: {'status': PENDING}})
+    return task.apply_async(args=args, task_id=task_id, ignore_result=True, **options)
+
+
+def get_task_result_status(task_id: str) -> str:
+    """
+    Retorna o status gravado em TaskResult para uma tarefa, ou None se não houver registro.
+
+    Lê apenas a coluna `status` pelo índice único de `task_id`, sem carregar o resultado serializado.
+    """
+    return TaskResult.objects.filter(task_id=task_id).values_list('status', flat=True)[:1].first()
+
+
+def purge_task_results(max_age_seconds: int = None, batch_size: int = 1000) -> int:
+    """
+    Remove os registros de TaskResult concluídos há mais de `max_age_seconds`.
+
+    A remoção é feita em lotes de `batch_size` para não manter transações longas
+    nem bloquear a tabela enquanto os workers continuam gravando resultados.
+
+    Args:
+        max_age_seconds (int): Idade máxima dos registros. Padrão: CELERY_RESULT_EXPIRES.
+        batch_size (int): Quantidade de registros removidos por comando DELETE.
+
+    Returns:
+        int: Quantidade de registros removidos.
+    """
+    if max_age_seconds is None:
+        max_age_seconds = settings.CELERY_RESULT_EXPIRES
+    cutoff = timezone.now() - timedelta(seconds=max_age_seconds)
+    expired = TaskResult.objects.filter(date_done__lt=cutoff)
+
+    total = 0
+    while True:
+        ids = list(expired.values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return total
+        total += TaskResult.objects.filter(pk__in=ids).delete()[0]
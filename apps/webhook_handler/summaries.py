@@ -0,0 +1,131 @@
+import logging
+import uuid
+
+from django.db import transaction
+from django.db.models import Case, Count, Exists, F, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce, Substr
+
+from .models import Conversation, Message
+from .validators import parse_timestamp
+
+logger = logging.getLogger('webhook_handler')
+
+SUMMARY_FIELDS = ('message_count', 'last_message_at', 'last_message_preview', 'last_direction')
+
+
+def apply_messages(messages: list) -> None:
+    """
+    Atualiza o resumo das conversas (contagem e última mensagem) com mensagens recém-inseridas.
+
+    Deve ser chamada na mesma transação da inserção. Cada conversa recebe um único
+    `UPDATE` que soma a contagem e só troca a última mensagem se a nova for mais
+    recente, o que mantém o resumo correto com eventos fora de ordem e com escritas
+    concorrentes. Mensagens com o mesmo timestamp são desempatadas pelo maior ID,
+    como em `actual_summaries`, para que a reconciliação não aponte falsas divergências.
+    As conversas são atualizadas em ordem de ID, para que lotes concorrentes travem as
+    linhas sempre na mesma ordem.
+
+    Args:
+        messages (list): Mensagens efetivamente inseridas (reentregas não devem ser incluídas).
+    """
+    summaries = {}
+    for message in messages:
+        key = (parse_timestamp(message.timestamp), uuid.UUID(str(message.id)))
+        count, latest, latest_key = summaries.get(message.conversation_id, (0, None, None))
+        if latest is None or key > latest_key:
+            latest, latest_key = message, key
+        summaries[message.conversation_id] = (count + 1, latest, latest_key)
+
+    for conversation_id in sorted(summaries, key=str):
+        count, latest, (latest_at, latest_id) = summaries[conversation_id]
+        # Empate no timestamp: a mensagem atual só é mantida se houver outra com ID maior nesse instante
+        tied_with_greater_id = Exists(
+            Message.objects.filter(conversation_id=conversation_id, timestamp=latest_at, id__gt=latest_id)
+        )
+        newer = (
+            Q(last_message_at__isnull=True) | Q(last_message_at__lt=latest_at)
+            | (Q(last_message_at=latest_at) & ~Q(tied_with_greater_id))
+        )
+        Conversation.objects.filter(id=conversation_id).update(
+            message_count=F('message_count') + count,
+            last_message_at=Case(When(newer, then=Value(latest_at)), default=F('last_message_at')),
+            last_message_preview=Case(
+                When(newer, then=Value(latest.content[:Conversation.PREVIEW_LENGTH])),
+                default=F('last_message_preview')
+            ),
+            last_direction=Case(When(newer, then=Value(latest.direction)), default=F('last_direction')),
+        )
+
+
+def actual_summaries(queryset):
+    """
+    Anota as conversas com o resumo calculado a partir da tabela de mensagens.
+
+    Usa subconsultas correlacionadas, avaliadas só para as conversas do queryset. As
+    mensagens de partições arquivadas contam por `archived_message_count`; se todas as
+    mensagens de uma conversa foram arquivadas, a última mensagem registrada é mantida.
+
+    Returns:
+        QuerySet: Conversas com `actual_message_count`, `actual_last_message_at`,
+            `actual_last_message_preview` e `actual_last_direction`.
+    """
+    messages = Message.objects.filter(conversation=OuterRef('pk'))
+    latest = messages.order_by('-timestamp', '-id')
+    archived = Q(archived_message_count__gt=0)
+
+    def last(subquery, field, empty):
+        return Coalesce(subquery, Case(When(archived, then=F(field)), default=empty))
+
+    return queryset.annotate(
+        actual_message_count=F('archived_message_count') + Coalesce(
+            Subquery(messages.order_by().values('conversation').annotate(count=Count('*')).values('count')),
+            0
+        ),
+        actual_last_message_at=last(Subquery(latest.values('timestamp')[:1]), 'last_message_at', None),
+        actual_last_message_preview=last(
+            Subquery(latest.annotate(preview=Substr('content', 1, Conversation.PREVIEW_LENGTH)).values('preview')[:1]),
+            'last_message_preview', Value('')
+        ),
+        actual_last_direction=last(Subquery(latest.values('direction')[:1]), 'last_direction', Value('')),
+    )
+
+
+def reconcile(batch_size: int = 500, dry_run: bool = False) -> tuple:
+    """
+    Recalcula o resumo de todas as conversas e corrige as que divergirem.
+
+    Percorre as conversas em lotes por ID; cada lote é travado (`SELECT ... FOR UPDATE`)
+    enquanto o resumo é recalculado e gravado, para não sobrescrever uma escrita
+    concorrente da ingestão.
+
+    Args:
+        batch_size (int): Conversas por transação.
+        dry_run (bool): Apenas conta as divergências, sem corrigi-las.
+
+    Returns:
+        tuple: (conversas verificadas, conversas com resumo divergente)
+    """
+    checked = drifted = 0
+    last_id = None
+    while True:
+        with transaction.atomic():
+            conversations = Conversation.objects.order_by('id')
+            if last_id is not None:
+                conversations = conversations.filter(id__gt=last_id)
+            ids = list(conversations.select_for_update().values_list('id', flat=True)[:batch_size])
+            if not ids:
+                break
+            stale = []
+            for conversation in actual_summaries(Conversation.objects.filter(id__in=ids)):
+                actual = [getattr(conversation, f'actual_{field}') for field in SUMMARY_FIELDS]
+                if actual != [getattr(conversation, field) for field in SUMMARY_FIELDS]:
+                    for field, value in zip(SUMMARY_FIELDS, actual):
+                        setattr(conversation, field, value)
+                    stale.append(conversation)
+            if stale and not dry_run:
+                Conversation.objects.bulk_update(stale, SUMMARY_FIELDS)
+        checked += len(ids)
+        drifted += len(stale)
+        last_id = ids[-1]
+    logger.info("Reconciled conversation summaries: %s of %s conversations drifted", drifted, checked)
+    return checked, drifted
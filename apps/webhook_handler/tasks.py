@@ -1,9 +1,64 @@
 import logging
+import time
+
 from celery import shared_task
-from .services import WebhookService
+from celery.signals import before_task_publish, task_postrun, task_prerun, worker_init, worker_process_shutdown
+from django.conf import settings
+
+from . import dedup, logs, metrics, partitioning, pooling, status
+from .buffer import read_buffer, release_drain, schedule_drain
+from .services import CONVERSATION_CLOSED, CONVERSATION_NOT_FOUND, WebhookService
 
 logger = logging.getLogger('webhook_handler')
 
+# Cabeçalho da mensagem com o instante (epoch) da publicação, usado na métrica de espera na fila
+ENQUEUED_AT_HEADER = 'enqueued_at'
+
+# Cabeçalho da mensagem com o ID de correlação da requisição que enfileirou a tarefa
+CORRELATION_HEADER = 'correlation_id'
+
+# Tokens de `logs.set_correlation_id` por tarefa em execução, desfeitos no task_postrun
+_correlation_tokens = {}
+
+FAILURE_REASONS = {
+    CONVERSATION_NOT_FOUND: metrics.FAILURE_NOT_FOUND,
+    CONVERSATION_CLOSED: metrics.FAILURE_CLOSED,
+}
+
+
+def failure_reason(error: str) -> str:
+    """Motivo de falha (rótulo `reason` de EVENT_FAILURES) correspondente à mensagem de erro do serviço."""
+    if error.startswith('Invalid event'):
+        return metrics.FAILURE_INVALID
+    return FAILURE_REASONS.get(error, metrics.FAILURE_ERROR)
+
+
+def record_batch_failures(results: list) -> None:
+    """Conta, por motivo, os eventos de um lote que falharam ou eram reentregas."""
+    reasons = {}
+    for result in results:
+        if result['status'] == 'failed':
+            reason = failure_reason(result.get('error') or '')
+        elif result['status'] == 'duplicate':
+            reason = metrics.FAILURE_DUPLICATE
+        else:
+            continue
+        reasons[reason] = reasons.get(reason, 0) + 1
+    for reason, amount in reasons.items():
+        metrics.count(metrics.EVENT_FAILURES, amount, reason=reason)
+
+
+def forget_failed(events: list, results: list) -> None:
+    """
+    Libera a deduplicação dos eventos de um lote que falharam (ver `dedup.forget`).
+
+    O evento é marcado como visto ao ser enfileirado; sem isso, uma reentrega do
+    provedor após a falha seria descartada como duplicata durante WEBHOOK_DEDUP_TTL.
+    """
+    for event, result in zip(events, results):
+        if result['status'] == 'failed':
+            dedup.forget(event)
+
 
 @shared_task
 def process_webhook(data: dict) -> None:
@@ -17,20 +72,213 @@ def process_webhook(data: dict) -> None:
         data (dict): Dicionário contendo o tipo de evento e seus dados,
                     já validado pelo WebhookSerializer.
     """
-    logger.info(f"Processing webhook event: {data['type']}")
-    handlers = {
-        'NEW_CONVERSATION': WebhookService.create_conversation,
-        'NEW_MESSAGE': WebhookService.create_message,
-        'CLOSE_CONVERSATION': WebhookService.close_conversation,
-    }
-
+    logger.info("Processing webhook event: %s", data['type'])
     event_type = data['type']
-    handler = handlers.get(event_type)
 
     try:
-        logger.debug(f"Executing handler for {event_type} with data: {data}")
-        handler(data)
-        logger.info(f"Successfully processed {event_type} event")
+        logger.debug("Executing handler for %s event %s", event_type, data['data'].get('id'))
+        pooling.checkout()
+        with metrics.stage(metrics.STAGE_PROCESSING, metrics.event_type_label(event_type)), \
+                metrics.track_queries(task='process_webhook'):
+            WebhookService.process_event(data)
+        logger.info("Successfully processed %s event", event_type)
+    except Exception as e:
+        metrics.count(metrics.EVENT_FAILURES, reason=failure_reason(str(e)))
+        logger.error("Error processing webhook %s: %s", event_type, e, exc_info=True)
+        # O evento não foi aplicado: uma reentrega do provedor deve ser aceita
+        dedup.forget(data)
+        raise e
+
+
+@shared_task
+def process_webhook_batch(events: list) -> list:
+    """
+    Tarefa Celery assíncrona para processar um lote de eventos de webhook.
+
+    Encaminha todos os eventos para o caminho em massa do WebhookService,
+    usando uma única mensagem no broker e uma única transação no banco.
+
+    Args:
+        events (list): Lista de eventos já validados pelo WebhookSerializer.
+
+    Returns:
+        list: Resultado por evento, na mesma ordem da entrada.
+    """
+    logger.info("Processing webhook batch with %s events", len(events))
+    try:
+        pooling.checkout()
+        with metrics.stage(metrics.STAGE_PROCESSING, metrics.BATCH), \
+                metrics.track_queries(task='process_webhook_batch'):
+            results = WebhookService.process_batch(events)
     except Exception as e:
-        logger.error(f"Error processing webhook {event_type}: {str(e)}", exc_info=True)
+        metrics.count(metrics.EVENT_FAILURES, len(events), reason=metrics.FAILURE_ERROR)
+        logger.error("Error processing webhook batch: %s", e, exc_info=True)
+        for event in events:
+            dedup.forget(event)
         raise e
+    record_batch_failures(results)
+    forget_failed(events, results)
+    return results
+
+
+@shared_task(ignore_result=True)
+def drain_webhook_buffer(shard: int = 0) -> int:
+    """
+    Tarefa Celery que consome o buffer de micro-lotes de um shard.
+
+    Lê até WEBHOOK_MICROBATCH_SIZE eventos acumulados no buffer, aplica-os em uma
+    única transação com escrita em massa e registra o resultado de cada evento no
+    armazenamento de status. As mensagens só são confirmadas no broker após o
+    processamento. Se o lote veio cheio, agenda imediatamente a próxima drenagem.
+
+    Args:
+        shard (int): Shard cujo buffer deve ser drenado (0 quando o sharding está desativado).
+
+    Returns:
+        int: Quantidade de eventos drenados.
+    """
+    release_drain(shard)
+    max_events = settings.WEBHOOK_MICROBATCH_SIZE
+    with read_buffer(shard, max_events) as messages:
+        if not messages:
+            return 0
+
+        payloads = [message.payload for message in messages]
+        logger.info("Draining %s buffered webhook events", len(payloads))
+        pooling.checkout()
+        with metrics.stage(metrics.STAGE_PROCESSING, metrics.BATCH), metrics.track_queries(task='drain_webhook_buffer'):
+            events = [payload['event'] for payload in payloads]
+            results = WebhookService.process_micro_batch(events)
+        record_batch_failures(results)
+        forget_failed(events, results)
+        status.set_event_statuses({
+            payload['event_id']: status.from_batch_result(result)
+            for payload, result in zip(payloads, results)
+        })
+        for message in messages:
+            message.ack()
+
+    if len(messages) == max_events:
+        schedule_drain(shard, countdown=0)
+    return len(messages)
+
+
+@shared_task(ignore_result=True)
+def expire_pending_events() -> int:
+    """
+    Tarefa periódica que move para a dead-letter as mensagens estacionadas que expiraram.
+
+    Returns:
+        int: Quantidade de eventos movidos.
+    """
+    return WebhookService.expire_pending_events()
+
+
+@shared_task(ignore_result=True)
+def purge_task_results() -> int:
+    """
+    Tarefa periódica que remove os registros de TaskResult mais antigos que CELERY_RESULT_EXPIRES.
+
+    Returns:
+        int: Quantidade de registros removidos.
+    """
+    removed = status.purge_task_results()
+    logger.info("Purged %s expired task results", removed)
+    return removed
+
+
+@shared_task(ignore_result=True)
+def maintain_message_partitions() -> dict:
+    """
+    Tarefa periódica que cria as partições futuras de mensagens e arquiva as expiradas.
+
+    Returns:
+        dict: Partições criadas e arquivos gerados (vazio fora do PostgreSQL).
+    """
+    return partitioning.maintain_partitions()
+
+
+@task_postrun.connect
+def record_task_status(sender=None, task_id=None, task=None, retval=None, state=None, **kwargs):
+    """
+    Registra no armazenamento de status o resultado das tarefas de webhook que não gravam TaskResult.
+
+    Tarefas enfileiradas por `status.apply_tracked` fora do modo `db` chegam com
+    `ignore_result`; para elas, o estado final é gravado com TTL em vez de uma linha
+    no banco, e `task_status` o lê do mesmo lugar.
+    """
+    if sender.name not in (process_webhook.name, process_webhook_batch.name) or not task.request.ignore_result:
+        return
+    if settings.WEBHOOK_RESULT_MODE == status.RESULT_MODE_NONE:
+        return
+
+    value = {'status': state}
+    if state == status.FAILURE:
+        value['error'] = str(retval)
+    elif retval is not None:
+        value['result'] = retval
+    status.set_event_statuses({task_id: value})
+
+
+@before_task_publish.connect
+def stamp_enqueued_at(headers=None, **kwargs):
+    """Anota na mensagem o instante da publicação, lido por `record_queue_lag` no worker."""
+    if headers is not None:
+        headers[ENQUEUED_AT_HEADER] = time.time()
+
+
+@before_task_publish.connect
+def stamp_correlation_id(headers=None, **kwargs):
+    """Propaga para a tarefa o ID de correlação da requisição (ou tarefa) que a enfileirou."""
+    correlation_id = logs.get_correlation_id()
+    if headers is not None and correlation_id and CORRELATION_HEADER not in headers:
+        headers[CORRELATION_HEADER] = correlation_id
+
+
+@task_prerun.connect
+def bind_correlation_id(task_id=None, task=None, **kwargs):
+    """
+    Define o ID de correlação durante a execução da tarefa.
+
+    Usa o ID recebido no cabeçalho; em modo eager a tarefa roda no contexto de quem a
+    chamou e herda o ID dele. Tarefas sem origem (celery beat) usam o próprio ID.
+    """
+    correlation_id = (
+        task.request.get(CORRELATION_HEADER) or (task.request.headers or {}).get(CORRELATION_HEADER)
+        or logs.get_correlation_id() or task_id
+    )
+    _correlation_tokens[task_id] = logs.set_correlation_id(correlation_id)
+
+
+@task_postrun.connect
+def unbind_correlation_id(task_id=None, **kwargs):
+    token = _correlation_tokens.pop(task_id, None)
+    if token is not None:
+        logs.reset_correlation_id(token)
+
+
+@task_prerun.connect
+def record_queue_lag(task=None, **kwargs):
+    """
+    Observa em QUEUE_LAG o tempo entre a publicação da tarefa e o início da execução.
+
+    Os instantes vêm de relógios de máquinas diferentes (web e worker): diferenças de
+    sincronização entram na medida. Tarefas executadas em modo eager não são medidas.
+    """
+    enqueued_at = task.request.get(ENQUEUED_AT_HEADER) or (task.request.headers or {}).get(ENQUEUED_AT_HEADER)
+    if enqueued_at:
+        queue = (task.request.delivery_info or {}).get('routing_key') or 'celery'
+        metrics.observe(metrics.QUEUE_LAG, max(0.0, time.time() - enqueued_at), queue=queue, task=task.name)
+
+
+@worker_init.connect
+def configure_worker_connections(**kwargs):
+    """Aplica as configurações de conexão com o banco dos workers (ver `pooling.configure_worker`)."""
+    pooling.configure_worker()
+
+
+@worker_process_shutdown.connect
+def flush_metrics(**kwargs):
+    """Descarrega as métricas e os logs acumulados no processo do worker antes de ele terminar."""
+    metrics.flush()
+    logs.stop_queue_handlers()
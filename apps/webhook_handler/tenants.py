@@ -0,0 +1,103 @@
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.exceptions import AuthenticationFailed
+
+from .models import Tenant
+
+TENANT_HEADER = 'X-Webhook-Source'
+
+# Cache em memória do processo: slug -> (origem ou None, instante de expiração)
+_tenants = {}
+# Limite de entradas, para que cabeçalhos arbitrários não façam o cache crescer sem fim
+MAX_CACHED_TENANTS = 10000
+
+# Versão das origens no cache compartilhado, trocada a cada alteração de uma delas
+TENANT_VERSION_KEY = 'webhook:tenants:version'
+# Versão que o cache deste processo reflete e instante da última conferência
+_version = None
+_synced_at = float('-inf')
+
+
+def _sync_due() -> bool:
+    return time.monotonic() - _synced_at >= settings.WEBHOOK_TENANT_SYNC_SECONDS
+
+
+def _sync(version) -> None:
+    """Esvazia o cache do processo se alguma origem foi alterada desde a última conferência."""
+    global _version, _synced_at
+    if version != _version:
+        _tenants.clear()
+        _version = version
+    _synced_at = time.monotonic()
+
+
+def _cached(slug: str):
+    entry = _tenants.get(slug)
+    if entry and entry[1] > time.monotonic():
+        return True, entry[0]
+    return False, None
+
+
+def _remember(slug: str, tenant):
+    if len(_tenants) >= MAX_CACHED_TENANTS:
+        _tenants.clear()
+    _tenants[slug] = (tenant, time.monotonic() + settings.WEBHOOK_TENANT_CACHE_TTL)
+    return tenant
+
+
+def get_tenant(slug: str) -> Tenant:
+    """
+    Retorna a origem ativa com o slug informado, ou None se não existir.
+
+    O resultado, inclusive a ausência, fica em memória por WEBHOOK_TENANT_CACHE_TTL
+    segundos, evitando uma consulta por requisição. No máximo a cada
+    WEBHOOK_TENANT_SYNC_SECONDS, o processo confere a versão das origens no cache
+    compartilhado e descarta as entradas se alguma origem mudou (ver `forget_tenant`):
+    rotações de segredo e desativações valem em todos os processos nesse intervalo.
+    """
+    if _sync_due():
+        _sync(cache.get(TENANT_VERSION_KEY))
+    hit, tenant = _cached(slug)
+    if hit:
+        return tenant
+    return _remember(slug, Tenant.objects.filter(slug=slug, is_active=True).first())
+
+
+async def aget_tenant(slug: str) -> Tenant:
+    """Versão assíncrona de `get_tenant`; só consulta o banco quando a origem não está em cache."""
+    if _sync_due():
+        _sync(await cache.aget(TENANT_VERSION_KEY))
+    hit, tenant = _cached(slug)
+    if hit:
+        return tenant
+    return _remember(slug, await Tenant.objects.filter(slug=slug, is_active=True).afirst())
+
+
+def check_source(slug: str, tenant: Tenant) -> None:
+    """
+    Valida a origem informada em X-Webhook-Source, já resolvida por `get_tenant`.
+
+    Raises:
+        AuthenticationFailed: Se a origem for desconhecida, ou se nenhuma for informada
+            com WEBHOOK_REQUIRE_TENANT ativo.
+    """
+    if slug and tenant is None:
+        raise AuthenticationFailed('Unknown webhook source')
+    if not slug and settings.WEBHOOK_REQUIRE_TENANT:
+        raise AuthenticationFailed('No webhook source provided')
+
+
+@receiver([post_save, post_delete], sender=Tenant)
+def forget_tenant(sender, instance, **kwargs):
+    """
+    Descarta a origem alterada do cache deste processo e, após o commit, troca a versão
+    compartilhada, para que os demais processos descartem as suas na próxima conferência.
+    """
+    _tenants.pop(instance.slug, None)
+    transaction.on_commit(lambda: cache.set(TENANT_VERSION_KEY, uuid.uuid4().hex, timeout=None))
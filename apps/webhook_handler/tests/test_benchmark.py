@@ -0,0 +1,52 @@
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from apps.webhook_handler.management.commands.benchmark_ingestion import generate_traffic, percentile
+from apps.webhook_handler.models import Conversation
+
+WORKLOAD = {
+    'conversations': 20, 'messages': 5, 'concurrency': 5, 'duplicate_rate': 0.1, 'out_of_order_rate': 0.1, 'seed': 7
+}
+
+
+def shape(events: list) -> list:
+    return [event['type'] for event in events]
+
+
+def test_generate_traffic_is_reproducible():
+    first = generate_traffic(**WORKLOAD)
+    second = generate_traffic(**WORKLOAD)
+
+    assert shape(first) == shape(second)
+    assert first[0]['data']['id'] != second[0]['data']['id']
+    unique = {json.dumps(event, sort_keys=True) for event in first}
+    assert len(unique) == 20 * 7
+    assert len(first) > len(unique)
+
+
+def test_percentile():
+    values = list(range(1, 101))
+    assert (percentile(values, 0.5), percentile(values, 0.99), percentile([], 0.5)) == (50, 99, 0.0)
+
+
+@pytest.mark.django_db
+def test_benchmark_command_reports_and_cleans_up(tmp_path):
+    output = tmp_path / 'bench.json'
+    out = StringIO()
+    options = ['--conversations', '5', '--messages', '3', '--concurrency', '2', '--output', str(output)]
+    call_command('benchmark_ingestion', *options, stdout=out)
+
+    report = json.loads(output.read_text())
+    assert set(report['targets']) == {'view', 'task'}
+    for result in report['targets'].values():
+        assert result['events'] == sum(result['outcomes'].values())
+        assert result['events_per_second'] > 0
+        assert result['queries_per_event'] > 0
+        assert result['latency_ms']['p50'] <= result['latency_ms']['p99']
+    assert not Conversation.objects.exists()
+
+    call_command('benchmark_ingestion', '--target', 'task', '--compare', str(output), *options[:6], stdout=out)
+    assert 'vs baseline' in out.getvalue()
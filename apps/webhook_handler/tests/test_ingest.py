@@ -0,0 +1,158 @@
+import asyncio
+import uuid
+
+import pytest
+from django.test import Client
+
+from apps.webhook_handler import ingest
+from apps.webhook_handler.ingest import AsyncEventBuffer, BufferFull
+from apps.webhook_handler.models import Conversation, DeadLetterEvent
+
+
+def _event():
+    return {
+        'type': 'NEW_CONVERSATION', 'timestamp': '2025-02-21T10:20:41.349308+00:00', 'data': {'id': str(uuid.uuid4())}
+    }
+
+
+class TestAsyncEventBuffer:
+    def test_flushes_buffered_events_in_one_batch(self):
+        published = []
+
+        async def scenario():
+            buffer = AsyncEventBuffer(maxsize=10, flush_size=10, flush_interval=0.01, publish=published.append)
+            task_ids = [buffer.put(_event()) for _ in range(3)]
+            await asyncio.sleep(0.1)
+            return task_ids
+
+        task_ids = asyncio.run(scenario())
+        assert len(published) == 1
+        assert [task_id for task_id, _ in published[0]] == task_ids
+
+    def test_put_fails_when_full(self):
+        async def scenario():
+            buffer = AsyncEventBuffer(maxsize=1, flush_size=10, flush_interval=0.01, publish=lambda items: None)
+            buffer.put(_event())
+            with pytest.raises(BufferFull):
+                buffer.put(_event())
+
+        asyncio.run(scenario())
+
+    def test_retries_failed_batch_until_published(self):
+        published = []
+        failures = [ConnectionError('broker down')]
+
+        def publish(items):
+            if failures:
+                raise failures.pop()
+            published.append(items)
+
+        async def scenario():
+            buffer = AsyncEventBuffer(maxsize=10, flush_size=10, flush_interval=0.01, publish=publish)
+            buffer.put(_event())
+            await asyncio.sleep(0.5)
+            return buffer.pending
+
+        assert asyncio.run(scenario()) == 0
+        assert len(published) == 1
+
+    def test_counts_events_once_after_publishing(self, monkeypatch):
+        counted = []
+        failures = [ConnectionError('broker down')]
+
+        def publish(items):
+            if failures:
+                raise failures.pop()
+
+        monkeypatch.setattr(ingest, 'count_received', counted.append)
+
+        async def scenario():
+            buffer = AsyncEventBuffer(maxsize=10, flush_size=10, flush_interval=0.01, publish=publish)
+            buffer.put(_event())
+            buffer.put(_event())
+            await buffer.close(timeout=1)
+
+        asyncio.run(scenario())
+        assert [len(batch) for batch in counted] == [2]
+
+    def test_dead_letters_batch_after_max_attempts(self, monkeypatch):
+        dead = []
+        monkeypatch.setattr(ingest, 'count_received', lambda items: pytest.fail('counted an unpublished batch'))
+
+        def publish(items):
+            raise ConnectionError('broker down')
+
+        async def scenario():
+            buffer = AsyncEventBuffer(
+                maxsize=10, flush_size=10, flush_interval=0.01, max_attempts=2, publish=publish,
+                dead_letter=lambda items, reason: dead.append((items, reason))
+            )
+            task_id = buffer.put(_event())
+            await buffer.close(timeout=1)
+            return task_id, buffer.pending
+
+        task_id, pending = asyncio.run(scenario())
+        assert pending == 0
+        assert [[item[0] for item in items] for items, _ in dead] == [[task_id]]
+        assert dead[0][1] == 'Publish failed: broker down'
+
+    def test_close_publishes_pending_events_and_refuses_new_ones(self):
+        published = []
+
+        async def scenario():
+            buffer = AsyncEventBuffer(maxsize=10, flush_size=10, flush_interval=0.01, publish=published.append)
+            buffer.put(_event())
+            buffer.put(_event())
+            await buffer.close(timeout=1)
+            with pytest.raises(BufferFull):
+                buffer.put(_event())
+
+        asyncio.run(scenario())
+        assert sum(len(batch) for batch in published) == 2
+
+    def test_lifespan_shutdown_closes_buffer(self, monkeypatch):
+        closed = []
+        monkeypatch.setattr(ingest, 'close_buffer', lambda: _record(closed))
+        messages = iter([{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}])
+        sent = []
+
+        async def receive():
+            return next(messages)
+
+        async def send(message):
+            sent.append(message['type'])
+
+        asyncio.run(ingest.lifespan(None)({'type': 'lifespan'}, receive, send))
+        assert sent == ['lifespan.startup.complete', 'lifespan.shutdown.complete']
+        assert closed == [True]
+
+
+async def _record(calls):
+    calls.append(True)
+
+
+@pytest.mark.django_db
+class TestAsyncWebhookView:
+    def test_accepts_and_processes_event(self):
+        event = _event()
+        response = Client().post(
+            '/webhooks/async/', event, content_type='application/json', HTTP_AUTHORIZATION='debug'
+        )
+
+        assert response.status_code == 202
+        assert 'task_id' in response.json()
+        assert Conversation.objects.filter(id=event['data']['id']).exists()
+
+    def test_rejects_invalid_signature(self):
+        response = Client().post(
+            '/webhooks/async/', _event(), content_type='application/json', HTTP_AUTHORIZATION='wrong'
+        )
+        assert response.status_code == 401
+
+    def test_dead_letter_keeps_unpublished_events(self):
+        event = _event()
+
+        ingest.dead_letter_events([('task-1', event)], 'Publish failed: broker down')
+
+        dead = DeadLetterEvent.objects.get()
+        assert (dead.payload, dead.reason) == (event, 'Publish failed: broker down')
@@ -0,0 +1,114 @@
+import io
+import json
+import logging
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from django.core.management import call_command
+from rest_framework.test import APIClient
+
+from apps.webhook_handler import logs
+from apps.webhook_handler.tasks import CORRELATION_HEADER, bind_correlation_id, stamp_correlation_id, \
+    unbind_correlation_id
+
+
+class RecordCollector(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+        self.addFilter(logs.CorrelationIdFilter())
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+@pytest.fixture
+def collector():
+    handler = RecordCollector()
+    logger = logging.getLogger('webhook_handler')
+    level = logger.level
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    yield handler
+    logger.removeHandler(handler)
+    logger.setLevel(level)
+
+
+def test_queue_handler_writes_json_lines():
+    stream = io.StringIO()
+    handler = logs.QueueStreamHandler(stream, maxsize=10)
+    handler.setFormatter(logs.JsonFormatter())
+    handler.addFilter(logs.CorrelationIdFilter())
+    logger = logging.getLogger('webhook_handler.tests.queue')
+    logger.addHandler(handler)
+    try:
+        with logs.correlation('req-1'):
+            logger.warning("Message %s parked", 'abc', extra={'conversation_id': 'c-1'})
+    finally:
+        logger.removeHandler(handler)
+        handler.close()
+
+    entry = json.loads(stream.getvalue())
+    assert entry['message'] == 'Message abc parked'
+    assert entry['level'] == 'WARNING'
+    assert entry['correlation_id'] == 'req-1'
+    assert entry['conversation_id'] == 'c-1'
+
+
+def test_sampling_keeps_whole_correlation_and_all_warnings():
+    sampling = logs.SamplingFilter({'webhook_handler': 0.5})
+
+    def kept(name, level, correlation_id):
+        record = logging.LogRecord(name, level, '', 0, 'msg', None, None)
+        record.correlation_id = correlation_id
+        return sampling.filter(record)
+
+    decisions = [kept('webhook_handler.tasks', logging.INFO, f'req-{index}') for index in range(1000)]
+    assert 350 < sum(decisions) < 650
+    for index in range(50):
+        assert kept('webhook_handler', logging.DEBUG, f'req-{index}') == decisions[index]
+    assert all(kept('webhook_handler', logging.ERROR, f'req-{index}') for index in range(50))
+    assert all(kept('django.request', logging.INFO, f'req-{index}') for index in range(50))
+
+
+def test_invalid_correlation_header_is_replaced():
+    assert logs.clean_correlation_id('abc-123') == 'abc-123'
+    assert logs.clean_correlation_id('bad\nid') != 'bad\nid'
+    assert len(logs.clean_correlation_id('x' * 200)) == 32
+
+
+@pytest.mark.django_db
+def test_request_id_reaches_task_logs(collector):
+    client = APIClient(HTTP_AUTHORIZATION='debug')
+    response = client.post('/webhooks/webhook/', {
+        'type': 'NEW_CONVERSATION', 'timestamp': '2025-02-21T10:20:41.349308+00:00', 'data': {'id': str(uuid.uuid4())}
+    }, format='json', HTTP_X_REQUEST_ID='req-42')
+
+    assert response['X-Request-ID'] == 'req-42'
+    processed = [record for record in collector.records if record.getMessage().startswith('Processing webhook')]
+    assert processed and all(record.correlation_id == 'req-42' for record in processed)
+
+    generated = client.get('/conversations/')['X-Request-ID']
+    assert generated and generated != 'req-42'
+
+
+def test_correlation_id_travels_in_task_headers():
+    headers = {}
+    with logs.correlation('req-7'):
+        stamp_correlation_id(headers=headers)
+    assert headers[CORRELATION_HEADER] == 'req-7'
+
+    task = SimpleNamespace(request=SimpleNamespace(get=headers.get, headers=None))
+    bind_correlation_id(task_id='task-1', task=task)
+    assert logs.get_correlation_id() == 'req-7'
+    unbind_correlation_id(task_id='task-1')
+    assert logs.get_correlation_id() is None
+
+
+def test_benchmark_logging_reports_every_mode():
+    output = io.StringIO()
+    call_command('benchmark_logging', events=50, stdout=output)
+    lines = output.getvalue().splitlines()
+    assert [line.split(':')[0].strip() for line in lines] == ['eager', 'text', 'json', 'sampled']
+    assert all('us/event' in line for line in lines)
@@ -0,0 +1,100 @@
+import uuid
+
+import pytest
+from redis.exceptions import RedisError
+from rest_framework.test import APIClient
+
+from apps.webhook_handler import metrics
+from apps.webhook_handler.factories import ConversationFactory
+from apps.webhook_handler.models import Conversation
+from apps.webhook_handler.tasks import failure_reason
+
+
+@pytest.fixture
+def client():
+    return APIClient(HTTP_AUTHORIZATION='debug')
+
+
+@pytest.fixture(autouse=True)
+def store(settings):
+    # Descarta o que outros testes deixaram no buffer e começa com um armazenamento vazio
+    metrics.flush()
+    settings.WEBHOOK_METRICS_STORE = 'apps.webhook_handler.metrics.LocalMetricsStore'
+    return metrics.get_store()
+
+
+def test_histogram_is_rendered_cumulatively():
+    metrics.observe(metrics.STAGE_DURATION, 0.002, stage='validation', event_type='NEW_MESSAGE')
+    metrics.observe(metrics.STAGE_DURATION, 0.02, stage='validation', event_type='NEW_MESSAGE')
+    metrics.observe(metrics.STAGE_DURATION, 60, stage='validation', event_type='NEW_MESSAGE')
+
+    lines = metrics.render().splitlines()
+    labels = 'event_type="NEW_MESSAGE",stage="validation"'
+    assert '# TYPE webhook_stage_duration_seconds histogram' in lines
+    assert f'webhook_stage_duration_seconds_bucket{{{labels},le="0.001"}} 0' in lines
+    assert f'webhook_stage_duration_seconds_bucket{{{labels},le="0.0025"}} 1' in lines
+    assert f'webhook_stage_duration_seconds_bucket{{{labels},le="10"}} 2' in lines
+    assert f'webhook_stage_duration_seconds_bucket{{{labels},le="+Inf"}} 3' in lines
+    assert f'webhook_stage_duration_seconds_count{{{labels}}} 3' in lines
+
+
+def test_counters_are_buffered_per_tenant(store, settings, monkeypatch):
+    settings.WEBHOOK_METRICS_FLUSH_SECONDS = 60
+    metrics.increment(metrics.EVENTS_RECEIVED, 2, tenant=7)
+    metrics.increment(metrics.EVENTS_RECEIVED)
+    assert store.read([metrics.SHARED_COUNTERS_SERIES])[metrics.SHARED_COUNTERS_SERIES] == {}
+
+    assert metrics.get_counters([metrics.EVENTS_RECEIVED, metrics.EVENTS_DUPLICATE]) == {
+        metrics.EVENTS_RECEIVED: 3, metrics.EVENTS_DUPLICATE: 0
+    }
+    assert metrics.get_counters([metrics.EVENTS_RECEIVED], tenant=7) == {metrics.EVENTS_RECEIVED: 2}
+
+    def unavailable(values):
+        raise RedisError('Connection refused')
+
+    monkeypatch.setattr(store, 'add', unavailable)
+    settings.WEBHOOK_METRICS_FLUSH_SECONDS = 0
+    metrics.increment(metrics.EVENTS_RECEIVED, tenant=7)
+
+
+def test_failure_reasons():
+    assert failure_reason('Conversation not found') == metrics.FAILURE_NOT_FOUND
+    assert failure_reason('Cannot add message to closed conversation') == metrics.FAILURE_CLOSED
+    assert failure_reason('Invalid event: boom') == metrics.FAILURE_INVALID
+    assert failure_reason('database is locked') == metrics.FAILURE_ERROR
+
+
+@pytest.mark.django_db
+def test_metrics_endpoint_reports_pipeline(client):
+    closed = ConversationFactory(state=Conversation.CLOSED_CHOICE)
+    message = {
+        'type': 'NEW_MESSAGE',
+        'timestamp': '2025-02-21T10:20:42.349308+00:00',
+        'data': {
+            'id': str(uuid.uuid4()), 'direction': 'RECEIVED', 'content': 'Oi', 'conversation_id': str(closed.id)
+        }
+    }
+    client.post('/webhooks/batch/', [message, message, {'type': 'NEW_CONVERSATION'}], format='json')
+    client.post('/webhooks/webhook/', {
+        'type': 'NEW_CONVERSATION', 'timestamp': '2025-02-21T10:20:41.349308+00:00', 'data': {'id': str(uuid.uuid4())}
+    }, format='json')
+
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response['Content-Type'].startswith('text/plain; version=0.0.4')
+    body = response.content.decode()
+    assert 'webhook_event_failures_total{reason="closed_conversation"} 1' in body
+    assert 'webhook_event_failures_total{reason="duplicate"} 1' in body
+    assert 'webhook_event_failures_total{reason="invalid"} 1' in body
+    assert 'webhook_stage_duration_seconds_count{event_type="unknown",stage="authentication"} 2' in body
+    assert 'webhook_stage_duration_seconds_count{event_type="NEW_CONVERSATION",stage="publish"} 1' in body
+    assert 'webhook_stage_duration_seconds_count{event_type="batch",stage="processing"} 1' in body
+    assert 'webhook_task_db_queries_count{task="process_webhook"} 1' in body
+    assert 'webhook_events_received_total' in body
+
+
+@pytest.mark.django_db
+def test_metrics_token(client, settings):
+    settings.WEBHOOK_METRICS_TOKEN = 's3cret'
+    assert client.get('/metrics').status_code == 401
+    assert client.get('/metrics', HTTP_AUTHORIZATION='Bearer s3cret').status_code == 200
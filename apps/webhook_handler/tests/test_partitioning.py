@@ -0,0 +1,56 @@
+from datetime import date, datetime, timezone
+
+import pytest
+from django.core.management import call_command
+
+from apps.webhook_handler import partitioning
+
+
+class TestPartitionHelpers:
+    def test_month_arithmetic(self):
+        assert partitioning.month_start(datetime(2025, 3, 31, 23, 30, tzinfo=timezone.utc)) == date(2025, 3, 1)
+        assert partitioning.add_months(date(2025, 11, 1), 3) == date(2026, 2, 1)
+        assert partitioning.add_months(date(2025, 1, 1), -1) == date(2024, 12, 1)
+
+    def test_partition_names_round_trip(self):
+        name = partitioning.partition_name(date(2025, 2, 1))
+
+        assert name == 'webhook_handler_message_p2025_02'
+        assert partitioning.partition_month(name) == date(2025, 2, 1)
+        assert partitioning.partition_month(partitioning.DEFAULT_PARTITION) is None
+
+    def test_create_partition_sql_uses_utc_month_bounds(self):
+        sql = partitioning.create_partition_sql(date(2025, 12, 1), lambda name: f'"{name}"')
+
+        assert "FROM ('2025-12-01 00:00:00+00') TO ('2026-01-01 00:00:00+00')" in sql
+
+
+@pytest.mark.django_db
+class TestPartitionMaintenance:
+    def test_is_a_no_op_without_postgres(self, capsys):
+        assert partitioning.maintain_partitions(retention_months=1) == {'created': [], 'archived': []}
+
+        call_command('maintain_message_partitions')
+        assert 'not partitioned' in capsys.readouterr().out
+
+    def test_failed_month_does_not_stop_maintenance(self, monkeypatch, tmp_path):
+        months = []
+
+        def create_partition(month, using):
+            months.append(month)
+            if len(months) == 1:
+                raise RuntimeError('updated partition constraint for default partition would be violated')
+            return 0
+
+        monkeypatch.setattr(partitioning, 'is_partitioned', lambda using='default': True)
+        monkeypatch.setattr(partitioning, 'list_partitions', lambda using='default': {})
+        monkeypatch.setattr(partitioning, 'create_partition', create_partition)
+        monkeypatch.setattr(partitioning, 'split_default_partition', lambda retention_months, using: [])
+        monkeypatch.setattr(partitioning, 'expired_partitions', lambda retention_months, using: ['old'])
+        monkeypatch.setattr(partitioning, 'archive_partition', lambda name, directory, using: f'{directory}/{name}')
+
+        result = partitioning.maintain_partitions(months_ahead=2, retention_months=1, directory=str(tmp_path))
+
+        assert result['created'] == [partitioning.partition_name(month) for month in months[1:]]
+        assert len(months) == 3
+        assert result['archived'] == [f'{tmp_path}/old']
@@ -0,0 +1,49 @@
+import pytest
+from django.db import connection, connections
+
+from apps.webhook_handler import metrics, pooling
+from apps.webhook_handler.exporters import export_records
+from apps.webhook_handler.factories import ConversationFactory, MessageFactory
+
+
+@pytest.fixture(autouse=True)
+def store(settings):
+    metrics.flush()
+    settings.WEBHOOK_METRICS_STORE = 'apps.webhook_handler.metrics.LocalMetricsStore'
+    return metrics.get_store()
+
+
+@pytest.mark.django_db
+def test_checkout_reuses_open_connection():
+    connection.ensure_connection()
+    pooling.checkout()
+    pooling.count_connection(sender=None, connection=connection)
+    metrics.flush()
+
+    rendered = metrics.render().splitlines()
+    assert 'webhook_db_connection_checkouts_total{outcome="reused",role="web"} 1' in rendered
+    assert 'webhook_db_connections_opened_total{alias="default",role="web"} 1' in rendered
+
+
+def test_worker_connection_settings(settings):
+    settings.WEBHOOK_WORKER_CONN_MAX_AGE = 321
+    previous = connections.settings['default']['CONN_MAX_AGE']
+    try:
+        pooling.configure_worker()
+        assert pooling.get_role() == pooling.ROLE_WORKER
+        assert connections['default'].settings_dict['CONN_MAX_AGE'] == 321
+    finally:
+        connections.settings['default']['CONN_MAX_AGE'] = previous
+        pooling._role = pooling.ROLE_WEB
+
+
+@pytest.mark.django_db
+def test_export_pages_by_id_without_server_side_cursors():
+    conversations = ConversationFactory.create_batch(5)
+    for conversation in conversations:
+        MessageFactory(conversation=conversation)
+
+    records = list(export_records(chunk_size=2))
+    exported = [record['id'] for record in records if record['record'] == 'conversation']
+    assert exported == sorted(conversation.id for conversation in conversations)
+    assert sum(1 for record in records if record['record'] == 'message') == 5
@@ -0,0 +1,67 @@
+import json
+import uuid
+from io import StringIO
+
+import pytest
+from django.core.management import CommandError, call_command
+
+from apps.webhook_handler.models import Conversation, Message
+from apps.webhook_handler.replay import WebhookReplayer
+
+
+@pytest.mark.django_db
+class TestWebhookReplayer:
+    def test_replay_resumes_from_checkpoint(self, tmp_path):
+        conversation_id = str(uuid.uuid4())
+        events = [
+            {
+                'type': 'NEW_CONVERSATION',
+                'timestamp': '2025-02-21T10:20:41.349308Z',
+                'data': {'id': conversation_id}
+            },
+            {
+                'type': 'NEW_MESSAGE',
+                'timestamp': '2025-02-21T10:20:42.349308Z',
+                'data': {
+                    'id': str(uuid.uuid4()),
+                    'direction': 'RECEIVED',
+                    'content': 'Olá',
+                    'conversation_id': conversation_id
+                }
+            },
+        ]
+        path = tmp_path / 'events.jsonl'
+        path.write_text('\n'.join(json.dumps(event) for event in events) + '\nnot json\n')
+        checkpoint = str(tmp_path / 'replay.ckpt')
+
+        stats = WebhookReplayer(str(path), batch_size=1, checkpoint=checkpoint).run()
+        assert (stats.applied, stats.failed, stats.invalid) == (2, 0, 1)
+        assert Conversation.objects.filter(id=conversation_id).exists()
+        assert Message.objects.filter(conversation_id=conversation_id).count() == 1
+
+        stats = WebhookReplayer(str(path), batch_size=1, checkpoint=checkpoint).run()
+        assert stats.read == 0
+
+    def test_command_rejects_checkpoint_of_another_run(self, tmp_path):
+        first = tmp_path / 'first.jsonl'
+        second = tmp_path / 'second.jsonl'
+        for path in (first, second):
+            path.write_text(json.dumps({
+                'type': 'NEW_CONVERSATION', 'timestamp': '2025-02-21T10:20:41Z', 'data': {'id': str(uuid.uuid4())}
+            }) + '\n')
+        checkpoint = str(tmp_path / 'replay.ckpt')
+        output = StringIO()
+        call_command('replay_webhooks', str(first), checkpoint=checkpoint, stdout=output)
+        assert 'offset=' in output.getvalue()
+
+        with pytest.raises(CommandError, match='was written for'):
+            call_command('replay_webhooks', str(second), checkpoint=checkpoint, stdout=StringIO())
+        with pytest.raises(CommandError, match='written with 1 workers, not 2'):
+            call_command('replay_webhooks', str(first), checkpoint=checkpoint, workers=2, stdout=StringIO())
+
+    def test_command_rejects_non_positive_batch_size(self, tmp_path):
+        path = tmp_path / 'events.jsonl'
+        path.write_text('')
+
+        with pytest.raises(CommandError, match='--batch-size must be at least 1'):
+            call_command('replay_webhooks', str(path), batch_size=0, stdout=StringIO())
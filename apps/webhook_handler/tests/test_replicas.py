@@ -0,0 +1,81 @@
+import time
+import uuid
+
+import pytest
+from django.db import connections
+from rest_framework.test import APIClient
+
+from apps.webhook_handler import replicas
+from apps.webhook_handler.factories import ConversationFactory
+from apps.webhook_handler.models import Conversation
+from apps.webhook_handler.services import WebhookService
+
+
+@pytest.fixture
+def replica(settings):
+    settings.DATABASE_REPLICAS = ['replica']
+    settings.WEBHOOK_REPLICA_MAX_LAG_SECONDS = 5
+    replicas._lags.clear()
+    yield 'replica'
+    replicas._lags.clear()
+
+
+@pytest.fixture
+def router():
+    return replicas.ReplicaRouter()
+
+
+def test_reads_inside_read_only_go_to_a_replica(replica, router):
+    assert router.db_for_read(Conversation) is None
+    with replicas.read_only() as alias:
+        assert alias == 'replica'
+        assert router.db_for_read(Conversation) == 'replica'
+        assert router.db_for_write(Conversation) == 'default'
+    assert router.db_for_read(Conversation) is None
+    assert router.allow_migrate('replica', 'webhook_handler') is False
+
+
+def test_lagging_replica_falls_back_to_primary(replica, router):
+    replicas._lags['replica'] = (time.monotonic(), 30.0)
+    with replicas.read_only() as alias:
+        assert alias == 'default'
+        assert router.db_for_read(Conversation) == 'default'
+
+
+def test_without_replicas_reads_stay_on_primary(router):
+    with replicas.read_only() as alias:
+        assert alias == 'default'
+        assert router.db_for_read(Conversation) is None
+
+
+@pytest.mark.django_db
+def test_written_conversation_is_read_from_primary(replica, django_capture_on_commit_callbacks):
+    conversation_id = str(uuid.uuid4())
+    with django_capture_on_commit_callbacks(execute=True):
+        WebhookService.create_conversation({'type': 'NEW_CONVERSATION', 'data': {'id': conversation_id}})
+
+    assert replicas.is_sticky(conversation_id)
+    assert replicas.is_sticky(conversation_id.upper())
+    assert not replicas.is_sticky('not-a-uuid')
+    with replicas.read_only(conversation_id=conversation_id) as alias:
+        assert alias == 'default'
+    with replicas.read_only(conversation_id=str(uuid.uuid4())) as alias:
+        assert alias == 'replica'
+
+
+# Sem a transação do teste: a réplica (espelho do banco padrão) usa outra conexão
+@pytest.mark.django_db(transaction=True, databases=['default', 'replica'])
+def test_conversation_list_queries_the_replica(replica):
+    ConversationFactory()
+    executed = []
+
+    def record(execute, sql, params, many, context):
+        executed.append(sql)
+        return execute(sql, params, many, context)
+
+    with connections['replica'].execute_wrapper(record):
+        response = APIClient(HTTP_AUTHORIZATION='debug').get('/conversations/')
+
+    assert response.status_code == 200
+    assert len(response.json()['results']) == 1
+    assert any('webhook_handler_conversation' in sql for sql in executed)
@@ -0,0 +1,29 @@
+import uuid
+
+from apps.webhook_handler.routing import group_by_queue, queue_for_event, queues_for_worker
+
+
+class TestRouting:
+    def test_events_of_a_conversation_share_a_queue(self, settings):
+        settings.WEBHOOK_SHARD_COUNT = 8
+        conversation_id = str(uuid.uuid4())
+        events = [
+            {'type': 'NEW_CONVERSATION', 'data': {'id': conversation_id}},
+            {'type': 'NEW_MESSAGE', 'data': {'id': str(uuid.uuid4()), 'conversation_id': conversation_id}},
+            {'type': 'CLOSE_CONVERSATION', 'data': {'id': conversation_id}},
+        ]
+
+        assert len({queue_for_event(event) for event in events}) == 1
+        groups = group_by_queue(events)
+        assert [index for index, _ in groups[queue_for_event(events[0])]] == [0, 1, 2]
+
+    def test_default_queue_without_sharding(self, settings):
+        settings.WEBHOOK_SHARD_COUNT = 0
+        assert queue_for_event({'type': 'NEW_CONVERSATION', 'data': {'id': str(uuid.uuid4())}}) == 'celery'
+
+    def test_shards_are_split_across_workers(self, settings):
+        settings.WEBHOOK_SHARD_COUNT = 8
+        assigned = [queues_for_worker(index, 3) for index in range(3)]
+        all_queues = [queue for queues in assigned for queue in queues]
+        assert sorted(all_queues) == sorted(f'webhook.shard.{shard}' for shard in range(8))
+        assert len(all_queues) == len(set(all_queues))
@@ -0,0 +1,100 @@
+from datetime import timedelta
+
+import pytest
+from django.contrib.admin.sites import site
+from django.test import RequestFactory
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.webhook_handler import search
+from apps.webhook_handler.factories import ConversationFactory, MessageFactory
+from apps.webhook_handler.models import Conversation, Message
+from apps.webhook_handler.search import search_messages
+
+
+@pytest.fixture
+def client():
+    return APIClient(HTTP_AUTHORIZATION='debug')
+
+
+@pytest.mark.django_db
+class TestMessageSearch:
+    def test_filters_and_orders_matches(self, client):
+        now = timezone.now()
+        open_conversation = ConversationFactory()
+        closed_conversation = ConversationFactory(state=Conversation.CLOSED_CHOICE)
+        older = MessageFactory(conversation=open_conversation, content='Pedido atrasado', timestamp=now)
+        newer = MessageFactory(
+            conversation=open_conversation, content='Meu pedido chegou', timestamp=now + timedelta(minutes=1)
+        )
+        MessageFactory(conversation=closed_conversation, content='Outro pedido', timestamp=now)
+        MessageFactory(conversation=open_conversation, content='Sem relação', timestamp=now)
+
+        response = client.get('/messages/search/', {'q': 'pedido', 'state': 'OPEN'})
+
+        assert response.status_code == 200
+        assert [item['id'] for item in response.data['results']] == [str(newer.id), str(older.id)]
+        assert response.data['results'][0]['conversation_state'] == 'OPEN'
+        assert not response.data['has_more']
+
+    def test_paginates_without_count(self, client):
+        conversation = ConversationFactory()
+        for _ in range(3):
+            MessageFactory(conversation=conversation, content='pedido', direction=Message.RECEIVED_CHOICE)
+
+        response = client.get('/messages/search/', {'q': 'pedido', 'direction': 'RECEIVED', 'page_size': 2})
+
+        assert len(response.data['results']) == 2
+        assert response.data['has_more']
+        assert len(client.get('/messages/search/', {'q': 'pedido', 'page_size': 2, 'page': 2}).data['results']) == 1
+
+    def test_defaults_to_recent_window(self, client, settings):
+        settings.WEBHOOK_SEARCH_DEFAULT_DAYS = 30
+        conversation = ConversationFactory()
+        recent = MessageFactory(conversation=conversation, content='pedido', timestamp=timezone.now())
+        old = MessageFactory(
+            conversation=conversation, content='pedido', timestamp=timezone.now() - timedelta(days=60)
+        )
+
+        response = client.get('/messages/search/', {'q': 'pedido'})
+        assert [item['id'] for item in response.data['results']] == [str(recent.id)]
+
+        since = (timezone.now() - timedelta(days=90)).isoformat()
+        response = client.get('/messages/search/', {'q': 'pedido', 'since': since, 'ordering': 'recent'})
+        assert [item['id'] for item in response.data['results']] == [str(recent.id), str(old.id)]
+
+    def test_plan_reads_matches_through_timestamp_index(self):
+        plan = search_messages('pedido', ordering='recent')[:20].explain()
+
+        assert 'message_timestamp_idx' in plan
+
+    def test_ranked_search_bounds_the_outer_query(self, monkeypatch):
+        monkeypatch.setattr(search, 'full_text_enabled', lambda: True)
+        until = timezone.now()
+
+        sql = str(search_messages('pedido', since=until - timedelta(days=7), until=until).query)
+
+        # Período na janela e na consulta externa, para descartar partições nas duas
+        assert sql.count('"timestamp" >=') == 2
+        assert sql.count('"timestamp" <') == 2
+
+    def test_requires_query(self, client):
+        assert client.get('/messages/search/').status_code == 400
+        assert client.get('/messages/search/', {'q': 'x', 'ordering': 'size'}).status_code == 400
+
+
+@pytest.mark.django_db
+class TestMessageAdminSearch:
+    def test_searches_by_id_or_content(self):
+        message = MessageFactory(content='Boleto vencido')
+        MessageFactory(content='Outro assunto')
+        model_admin = site._registry[Message]
+        request = RequestFactory().get('/')
+
+        by_content, _ = model_admin.get_search_results(request, Message.objects.all(), 'boleto')
+        by_conversation, _ = model_admin.get_search_results(
+            request, Message.objects.all(), str(message.conversation_id)
+        )
+
+        assert list(by_content) == [message]
+        assert list(by_conversation) == [message]
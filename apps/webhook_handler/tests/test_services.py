@@ -1,8 +1,11 @@
 import pytest
 import uuid
-from apps.webhook_handler.models import Conversation, Message
+from datetime import timedelta
+from django.db import DatabaseError
+from django.utils import timezone
+from apps.webhook_handler.models import Conversation, DeadLetterEvent, Message, PendingEvent
 from apps.webhook_handler.services import WebhookService
-from apps.webhook_handler.factories import ConversationFactory
+from apps.webhook_handler.factories import ConversationFactory, MessageFactory
 
 
 @pytest.mark.django_db
@@ -75,20 +78,94 @@ class TestWebhookService:
         with pytest.raises(ValueError):
             WebhookService.create_message(data)
 
-    def test_create_message_nonexistent_conversation(self):
+    def test_create_message_nonexistent_conversation_is_parked(self):
+        conversation_id = str(uuid.uuid4())
+        message_id = str(uuid.uuid4())
         data = {
             'type': 'NEW_MESSAGE',
             'timestamp': '2025-02-21T10:20:42.349308',
+            'data': {
+                'id': message_id,
+                'direction': 'RECEIVED',
+                'content': 'Test message',
+                'conversation_id': conversation_id
+            }
+        }
+
+        assert WebhookService.create_message(data) is None
+        assert PendingEvent.objects.filter(conversation_id=conversation_id).count() == 1
+
+        WebhookService.create_conversation({
+            'type': 'NEW_CONVERSATION',
+            'timestamp': '2025-02-21T10:20:41.349308+00:00',
+            'data': {'id': conversation_id}
+        })
+        assert PendingEvent.objects.count() == 0
+        assert Message.objects.get(id=message_id).conversation_id == uuid.UUID(conversation_id)
+
+    def test_expired_pending_events_go_to_dead_letter(self):
+        event = PendingEvent.objects.create(
+            conversation_id=uuid.uuid4(),
+            payload={'type': 'NEW_MESSAGE'},
+            expires_at=timezone.now() - timedelta(seconds=1)
+        )
+
+        assert WebhookService.expire_pending_events() == 1
+        assert not PendingEvent.objects.filter(id=event.id).exists()
+        assert DeadLetterEvent.objects.get().payload == {'type': 'NEW_MESSAGE'}
+
+    def _parked_message(self, conversation_id, expires_at):
+        message_id = uuid.uuid4()
+        PendingEvent.objects.create(
+            conversation_id=conversation_id,
+            payload={
+                'type': 'NEW_MESSAGE', 'timestamp': '2025-02-21T10:20:42.349308+00:00',
+                'data': {'id': str(message_id), 'direction': 'RECEIVED', 'content': 'Late',
+                         'conversation_id': str(conversation_id)},
+            },
+            expires_at=expires_at
+        )
+        return message_id
+
+    def test_expire_applies_events_whose_conversation_exists(self):
+        conversation = ConversationFactory()
+        message_id = self._parked_message(conversation.id, timezone.now() - timedelta(seconds=1))
+
+        assert WebhookService.expire_pending_events() == 0
+        assert Message.objects.get(id=message_id).conversation_id == conversation.id
+        assert not PendingEvent.objects.exists()
+        assert not DeadLetterEvent.objects.exists()
+
+    def test_flush_does_not_insert_into_closed_conversations(self):
+        conversation = ConversationFactory(state=Conversation.CLOSED_CHOICE)
+        message_id = self._parked_message(conversation.id, timezone.now() + timedelta(hours=1))
+
+        assert WebhookService.flush_pending_events([conversation.id]) == 1
+        assert not Message.objects.filter(id=message_id).exists()
+        assert DeadLetterEvent.objects.get().reason == 'Cannot add message to closed conversation'
+
+    def test_message_id_is_unique_across_timestamps(self):
+        conversation = ConversationFactory()
+        data = {
+            'type': 'NEW_MESSAGE',
+            'timestamp': '2025-02-21T10:20:42+00:00',
             'data': {
                 'id': str(uuid.uuid4()),
                 'direction': 'RECEIVED',
                 'content': 'Test message',
-                'conversation_id': str(uuid.uuid4())
+                'conversation_id': str(conversation.id)
             }
         }
+        WebhookService.create_message(data)
 
-        with pytest.raises(ValueError, match='Conversation not found'):
-            WebhookService.create_message(data)
+        # Mesmo ID em outro mês (outra partição no PostgreSQL): tratado como reentrega
+        WebhookService.create_message({**data, 'timestamp': '2025-03-21T10:20:42+00:00'})
+        WebhookService.process_batch([{**data, 'timestamp': '2025-04-21T10:20:42+00:00'}])
+
+        message = Message.objects.get(id=data['data']['id'])
+        assert message.timestamp.month == 2
+        conversation.refresh_from_db()
+        assert conversation.message_count == 1
 
     def test_close_conversation(self):
         conversation = ConversationFactory()
@@ -121,3 +198,123 @@ class TestWebhookService:
 
         updated_conversation = WebhookService.close_conversation(data)
         assert updated_conversation.state == Conversation.CLOSED_CHOICE
+
+    def test_process_batch(self):
+        conversation_id = str(uuid.uuid4())
+        message_id = str(uuid.uuid4())
+        events = [
+            {
+                'type': 'NEW_CONVERSATION',
+                'timestamp': '2025-02-21T10:20:41.349308+00:00',
+                'data': {'id': conversation_id}
+            },
+            {
+                'type': 'NEW_MESSAGE',
+                'timestamp': '2025-02-21T10:20:42.349308+00:00',
+                'data': {
+                    'id': message_id,
+                    'direction': 'RECEIVED',
+                    'content': 'Test message',
+                    'conversation_id': conversation_id
+                }
+            },
+            {
+                'type': 'CLOSE_CONVERSATION',
+                'timestamp': '2025-02-21T10:20:45.349308+00:00',
+                'data': {'id': conversation_id}
+            },
+        ]
+
+        results = WebhookService.process_batch(events)
+        assert [result['status'] for result in results] == ['processed'] * 3
+        conversation = Conversation.objects.get(id=conversation_id)
+        assert conversation.state == Conversation.CLOSED_CHOICE
+        assert list(conversation.messages.values_list('content', flat=True)) == ['Test message']
+
+    def test_process_batch_keeps_per_event_semantics(self):
+        closed = ConversationFactory(state=Conversation.CLOSED_CHOICE)
+        events = [
+            {
+                'type': 'NEW_MESSAGE',
+                'timestamp': '2025-02-21T10:20:42.349308+00:00',
+                'data': {
+                    'id': str(uuid.uuid4()),
+                    'direction': 'RECEIVED',
+                    'content': 'Test message',
+                    'conversation_id': str(closed.id)
+                }
+            },
+            {
+                'type': 'NEW_MESSAGE',
+                'timestamp': '2025-02-21T10:20:42.349308+00:00',
+                'data': {
+                    'id': str(uuid.uuid4()),
+                    'direction': 'SENT',
+                    'content': 'Test message',
+                    'conversation_id': str(uuid.uuid4())
+                }
+            },
+            {
+                'type': 'CLOSE_CONVERSATION',
+                'timestamp': '2025-02-21T10:20:45.349308+00:00',
+                'data': {}
+            },
+        ]
+
+        results = WebhookService.process_batch(events)
+        assert [result['status'] for result in results] == ['failed', 'parked', 'failed']
+        assert results[0]['error'] == 'Cannot add message to closed conversation'
+        assert results[2]['error'] == "Invalid event: 'id'"
+        assert Message.objects.count() == 0
+        assert PendingEvent.objects.count() == 1
+
+    def test_process_micro_batch_falls_back_to_per_event(self, monkeypatch):
+        conversation = ConversationFactory()
+        events = [
+            {
+                'type': 'CLOSE_CONVERSATION',
+                'timestamp': '2025-02-21T10:20:41.349308+00:00',
+                'data': {'id': str(uuid.uuid4())}
+            },
+            {
+                'type': 'CLOSE_CONVERSATION',
+                'timestamp': '2025-02-21T10:20:45.349308+00:00',
+                'data': {'id': str(conversation.id)}
+            },
+        ]
+
+        def failing_batch(events):
+            raise DatabaseError('simulated failure')
+
+        monkeypatch.setattr(WebhookService, 'process_batch', failing_batch)
+        results = WebhookService.process_micro_batch(events)
+        assert [result['status'] for result in results] == ['failed', 'processed']
+        conversation.refresh_from_db()
+        assert conversation.state == Conversation.CLOSED_CHOICE
+
+    def test_redelivered_events_are_no_ops(self):
+        conversation = ConversationFactory()
+        message = MessageFactory(conversation=conversation)
+        events = [
+            {
+                'type': 'NEW_CONVERSATION',
+                'timestamp': '2025-02-21T10:20:41.349308+00:00',
+                'data': {'id': str(conversation.id)}
+            },
+            {
+                'type': 'NEW_MESSAGE',
+                'timestamp': '2025-02-21T10:20:42.349308+00:00',
+                'data': {
+                    'id': str(message.id),
+                    'direction': 'RECEIVED',
+                    'content': 'Test message',
+                    'conversation_id': str(conversation.id)
+                }
+            },
+        ]
+
+        WebhookService.create_conversation(events[0])
+        WebhookService.create_message(events[1])
+        results = WebhookService.process_batch(events)
+        assert [result['status'] for result in results] == ['duplicate', 'duplicate']
+        assert Message.objects.filter(conversation=conversation).count() == 1
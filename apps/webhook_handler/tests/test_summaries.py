@@ -0,0 +1,142 @@
+import uuid
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+from apps.webhook_handler import services, summaries
+from apps.webhook_handler.factories import ConversationFactory, MessageFactory
+from apps.webhook_handler.models import Conversation
+from apps.webhook_handler.services import WebhookService
+
+
+def message_event(conversation_id, content, timestamp, message_id=None):
+    return {
+        'type': 'NEW_MESSAGE',
+        'timestamp': timestamp,
+        'data': {
+            'id': message_id or str(uuid.uuid4()),
+            'direction': 'RECEIVED',
+            'content': content,
+            'conversation_id': str(conversation_id)
+        }
+    }
+
+
+@pytest.mark.django_db
+class TestConversationSummaries:
+    def test_create_message_updates_summary(self):
+        conversation = ConversationFactory()
+        event = message_event(conversation.id, 'olá', '2025-02-21T10:20:42+00:00')
+        WebhookService.create_message(event)
+        WebhookService.create_message(event)
+
+        conversation.refresh_from_db()
+        assert conversation.message_count == 1
+        assert conversation.last_message_preview == 'olá'
+        assert conversation.last_direction == 'RECEIVED'
+
+    def test_out_of_order_message_keeps_latest(self):
+        conversation = ConversationFactory()
+        WebhookService.create_message(message_event(conversation.id, 'nova', '2025-02-21T10:20:42+00:00'))
+        WebhookService.create_message(message_event(conversation.id, 'antiga', '2025-02-21T10:00:00+00:00'))
+
+        conversation.refresh_from_db()
+        assert conversation.message_count == 2
+        assert conversation.last_message_preview == 'nova'
+        assert conversation.last_message_at.isoformat() == '2025-02-21T10:20:42+00:00'
+
+    def test_batch_counts_only_rows_actually_inserted(self, monkeypatch):
+        conversation = ConversationFactory()
+        event = message_event(conversation.id, 'olá', '2025-02-21T10:20:42+00:00')
+        WebhookService.create_message(event)
+        # Simula uma entrega concorrente confirmada depois do retrato das mensagens existentes
+        plan = services.BatchPlan
+        monkeypatch.setattr(services, 'BatchPlan', lambda states, existing, tenants: plan(states, set(), tenants))
+
+        WebhookService.process_batch([event, message_event(conversation.id, 'nova', '2025-02-21T10:21:00+00:00')])
+
+        conversation.refresh_from_db()
+        assert conversation.message_count == 2
+        assert conversation.last_message_preview == 'nova'
+
+    def test_timestamp_ties_keep_the_greatest_id(self):
+        conversation = ConversationFactory()
+        timestamp = '2025-02-21T10:20:42+00:00'
+        low, high = sorted(uuid.uuid4() for _ in range(2))
+        WebhookService.create_message(message_event(conversation.id, 'maior', timestamp, str(high)))
+        WebhookService.create_message(message_event(conversation.id, 'menor', timestamp, str(low)))
+        WebhookService.process_batch([
+            message_event(conversation.id, 'lote', timestamp, str(uuid.UUID(int=0))),
+        ])
+
+        conversation.refresh_from_db()
+        assert conversation.last_message_preview == 'maior'
+        assert summaries.reconcile(dry_run=True) == (1, 0)
+
+    def test_batch_updates_summary(self):
+        existing = ConversationFactory()
+        conversation_id = str(uuid.uuid4())
+        WebhookService.process_batch([
+            {'type': 'NEW_CONVERSATION', 'timestamp': '2025-02-21T10:00:00+00:00', 'data': {'id': conversation_id}},
+            message_event(conversation_id, 'segunda', '2025-02-21T10:02:00+00:00'),
+            message_event(conversation_id, 'primeira', '2025-02-21T10:01:00+00:00'),
+            message_event(existing.id, 'oi', '2025-02-21T10:03:00+00:00'),
+        ])
+
+        conversation = Conversation.objects.get(id=conversation_id)
+        assert conversation.message_count == 2
+        assert conversation.last_message_preview == 'segunda'
+        existing.refresh_from_db()
+        assert existing.message_count == 1
+
+    def test_flushed_pending_messages_update_summary(self):
+        conversation_id = str(uuid.uuid4())
+        parked = message_event(conversation_id, 'estacionada', '2025-02-21T10:01:00+00:00')
+        WebhookService.create_message(parked)
+        WebhookService.create_message(parked)
+        WebhookService.create_conversation(
+            {'type': 'NEW_CONVERSATION', 'timestamp': '2025-02-21T10:00:00+00:00', 'data': {'id': conversation_id}}
+        )
+
+        conversation = Conversation.objects.get(id=conversation_id)
+        assert conversation.message_count == 1
+        assert conversation.last_message_preview == 'estacionada'
+
+    def test_reconcile_repairs_drift(self):
+        drifted = ConversationFactory()
+        MessageFactory(conversation=drifted, content='x' * 150)
+        empty = ConversationFactory(message_count=3, last_message_preview='fantasma')
+        out = StringIO()
+
+        call_command('reconcile_conversation_summaries', '--dry-run', stdout=out)
+        assert '2 would be fixed' in out.getvalue()
+        drifted.refresh_from_db()
+        assert drifted.message_count == 0
+
+        call_command('reconcile_conversation_summaries', '--batch-size', '1', stdout=out)
+        drifted.refresh_from_db()
+        empty.refresh_from_db()
+        assert drifted.message_count == 1
+        assert drifted.last_message_preview == 'x' * Conversation.PREVIEW_LENGTH
+        assert (empty.message_count, empty.last_message_at, empty.last_message_preview) == (0, None, '')
+
+    def test_reconcile_keeps_archived_messages(self):
+        last_at = timezone.now() - timedelta(days=400)
+        archived = ConversationFactory(
+            message_count=3, archived_message_count=3, last_message_at=last_at,
+            last_message_preview='arquivada', last_direction='SENT'
+        )
+        partly = ConversationFactory(message_count=1, archived_message_count=2, last_message_preview='arquivada')
+        MessageFactory(conversation=partly, content='recente')
+
+        call_command('reconcile_conversation_summaries', stdout=StringIO())
+
+        archived.refresh_from_db()
+        partly.refresh_from_db()
+        assert (archived.message_count, archived.last_message_at, archived.last_message_preview) == (
+            3, last_at, 'arquivada'
+        )
+        assert (partly.message_count, partly.last_message_preview) == (3, 'recente')
@@ -0,0 +1,150 @@
+import uuid
+
+import pytest
+from rest_framework.test import APIClient
+
+from apps.webhook_handler import tenants
+from apps.webhook_handler.factories import ConversationFactory
+from apps.webhook_handler.models import Conversation, Message, Tenant
+from apps.webhook_handler.services import WebhookService
+
+
+def _client(tenant):
+    return APIClient(HTTP_AUTHORIZATION=tenant.secret, HTTP_X_WEBHOOK_SOURCE=tenant.slug)
+
+
+def _reader(tenant):
+    return APIClient(HTTP_AUTHORIZATION=f'Bearer {tenant.rotate_read_token()}', HTTP_X_WEBHOOK_SOURCE=tenant.slug)
+
+
+def _post(client, event_type, data):
+    return client.post(
+        '/webhooks/webhook/', {'type': event_type, 'timestamp': '2025-02-21T10:20:41Z', 'data': data}, format='json'
+    )
+
+
+@pytest.fixture
+def acme():
+    return Tenant.objects.create(slug='acme', name='Acme', secret='acme-secret')
+
+
+@pytest.fixture
+def globex():
+    return Tenant.objects.create(slug='globex', name='Globex', secret='globex-secret')
+
+
+@pytest.mark.django_db
+class TestTenantWebhooks:
+    def test_events_are_tagged_with_source(self, acme):
+        conversation_id = str(uuid.uuid4())
+
+        response = _post(_client(acme), 'NEW_CONVERSATION', {'id': conversation_id})
+
+        assert response.status_code == 202
+        assert Conversation.objects.get(id=conversation_id).tenant == acme
+
+    def test_rejects_secret_of_another_source(self, acme, globex):
+        client = APIClient(HTTP_AUTHORIZATION=globex.secret, HTTP_X_WEBHOOK_SOURCE=acme.slug)
+
+        response = _post(client, 'NEW_CONVERSATION', {'id': str(uuid.uuid4())})
+
+        assert response.status_code == 403
+
+    def test_rejects_unknown_source(self):
+        client = APIClient(HTTP_AUTHORIZATION='debug', HTTP_X_WEBHOOK_SOURCE='unknown')
+
+        response = _post(client, 'NEW_CONVERSATION', {'id': str(uuid.uuid4())})
+
+        assert response.status_code == 403
+
+    def test_previous_secret_is_accepted_after_rotation(self, acme):
+        old_secret = acme.secret
+        acme.rotate_secret()
+        client = APIClient(HTTP_AUTHORIZATION=old_secret, HTTP_X_WEBHOOK_SOURCE=acme.slug)
+
+        response = _post(client, 'NEW_CONVERSATION', {'id': str(uuid.uuid4())})
+
+        assert response.status_code == 202
+
+    def test_change_in_another_process_is_seen_after_sync(self, acme, settings, django_capture_on_commit_callbacks):
+        settings.WEBHOOK_TENANT_SYNC_SECONDS = 0
+        assert tenants.get_tenant(acme.slug) == acme
+        Tenant.objects.filter(pk=acme.pk).update(is_active=False)
+        assert tenants.get_tenant(acme.slug) == acme
+
+        # Outro processo salvou a origem: este não recebe o sinal, só a nova versão compartilhada
+        with django_capture_on_commit_callbacks(execute=True):
+            tenants.forget_tenant(Tenant, Tenant(slug='other-process'))
+
+        assert tenants.get_tenant(acme.slug) is None
+
+    def test_cannot_write_to_conversation_of_another_source(self, acme, globex):
+        conversation = ConversationFactory(tenant=acme)
+        message = {
+            'type': 'NEW_MESSAGE', 'timestamp': '2025-02-21T10:20:42Z', 'tenant_id': globex.pk,
+            'data': {'id': str(uuid.uuid4()), 'direction': 'RECEIVED', 'content': 'Oi',
+                     'conversation_id': str(conversation.id)},
+        }
+        close = {'type': 'CLOSE_CONVERSATION', 'timestamp': '2025-02-21T10:30:42Z', 'tenant_id': globex.pk,
+                 'data': {'id': str(conversation.id)}}
+
+        with pytest.raises(ValueError, match='Conversation not found'):
+            WebhookService.create_message(message)
+        with pytest.raises(ValueError, match='Conversation not found'):
+            WebhookService.close_conversation(close)
+        results = WebhookService.process_batch([message, close])
+
+        assert [result['status'] for result in results] == ['failed', 'failed']
+        conversation.refresh_from_db()
+        assert conversation.state == Conversation.OPEN_CHOICE
+        assert not Message.objects.filter(conversation=conversation).exists()
+
+
+@pytest.mark.django_db
+class TestTenantReads:
+    def test_list_and_detail_are_scoped_to_source(self, acme, globex):
+        own = ConversationFactory(tenant=acme)
+        foreign = ConversationFactory(tenant=globex)
+        client = _reader(acme)
+
+        listed = client.get('/conversations/').json()['results']
+
+        assert [item['id'] for item in listed] == [str(own.id)]
+        assert client.get(f'/conversations/{foreign.id}/').status_code == 404
+
+    def test_cached_detail_is_not_served_to_another_source(self, acme, globex):
+        conversation = ConversationFactory(tenant=globex)
+        assert _reader(globex).get(f'/conversations/{conversation.id}/').status_code == 200
+
+        assert _reader(acme).get(f'/conversations/{conversation.id}/').status_code == 404
+
+    def test_signing_secret_is_not_a_read_credential(self, acme):
+        acme.rotate_read_token()
+
+        assert _client(acme).get('/conversations/').status_code == 403
+        bearer = APIClient(HTTP_AUTHORIZATION=f'Bearer {acme.secret}', HTTP_X_WEBHOOK_SOURCE=acme.slug)
+        assert bearer.get('/conversations/').status_code == 403
+
+    def test_rotating_read_token_invalidates_the_previous_one(self, acme):
+        old_token = acme.rotate_read_token()
+        new_token = acme.rotate_read_token()
+
+        old = APIClient(HTTP_AUTHORIZATION=f'Bearer {old_token}', HTTP_X_WEBHOOK_SOURCE=acme.slug)
+        new = APIClient(HTTP_AUTHORIZATION=f'Bearer {new_token}', HTTP_X_WEBHOOK_SOURCE=acme.slug)
+        assert old.get('/conversations/').status_code == 403
+        assert new.get('/conversations/').status_code == 200
+
+    def test_require_tenant_rejects_reads_without_source(self, settings):
+        settings.WEBHOOK_REQUIRE_TENANT = True
+
+        response = APIClient().get('/conversations/')
+
+        assert response.status_code == 403
+
+    def test_require_tenant_rejects_export_without_source(self, settings, acme):
+        settings.WEBHOOK_REQUIRE_TENANT = True
+        ConversationFactory(tenant=acme)
+
+        response = APIClient().get('/conversations/export/')
+
+        assert response.status_code == 403
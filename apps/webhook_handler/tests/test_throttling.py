@@ -0,0 +1,40 @@
+import uuid
+
+import pytest
+from rest_framework.test import APIClient
+
+from apps.webhook_handler.models import Tenant
+from apps.webhook_handler.throttling import LocalTokenBucket
+
+
+class TestLocalTokenBucket:
+    def test_allows_burst_then_limits(self):
+        limiter = LocalTokenBucket(rate=1, burst=3)
+
+        assert [limiter.consume('ip:1')[0] for _ in range(4)] == [True, True, True, False]
+        allowed, retry_after = limiter.consume('ip:1')
+        assert not allowed
+        assert 0 < retry_after <= 1
+        assert limiter.consume('ip:2')[0]
+
+
+@pytest.mark.django_db
+class TestWebhookRateLimit:
+    def test_exceeding_burst_returns_429(self, settings):
+        settings.WEBHOOK_RATE_LIMIT_RATE = 0.01
+        settings.WEBHOOK_RATE_LIMIT_BURST = 2
+        settings.WEBHOOK_RATE_LIMIT_IDENTITY = 'tenant'
+        Tenant.objects.create(slug='noisy', name='Noisy', secret='debug')
+        client = APIClient(HTTP_AUTHORIZATION='debug', HTTP_X_WEBHOOK_SOURCE='noisy')
+
+        responses = [
+            client.post(
+                '/webhooks/webhook/',
+                {'type': 'NEW_CONVERSATION', 'timestamp': '2025-02-21T10:20:41Z', 'data': {'id': str(uuid.uuid4())}},
+                format='json'
+            )
+            for _ in range(3)
+        ]
+
+        assert [response.status_code for response in responses] == [202, 202, 429]
+        assert int(responses[-1]['Retry-After']) > 0
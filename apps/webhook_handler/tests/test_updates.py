@@ -0,0 +1,117 @@
+import uuid
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient, Client
+
+from apps.webhook_handler import services, updates
+from apps.webhook_handler.factories import ConversationFactory, MessageFactory
+from apps.webhook_handler.models import Conversation, Tenant
+from apps.webhook_handler.services import WebhookService
+
+
+class TestDeltas:
+    def test_message_delta_goes_to_conversation_and_list_streams(self):
+        message = MessageFactory.build(content='x' * 300)
+
+        deltas = updates.message_created(message, tenant_id=7)
+
+        assert [stream for stream, _ in deltas] == [
+            f'webhook:updates:conversation:{message.conversation_id}',
+            'webhook:updates:conversations:all',
+            'webhook:updates:conversations:7',
+        ]
+        assert deltas[0][1]['type'] == updates.MESSAGE_CREATED
+        assert len(deltas[1][1]['data']['last_message_preview']) == Conversation.PREVIEW_LENGTH
+        assert deltas[1][1]['data']['message_id'] == message.id
+
+    def test_event_ids(self):
+        assert updates.valid_event_id('1700000000000-3')
+        assert not updates.valid_event_id('abc')
+        assert updates.format_event('1-0', 'message', '{}') == 'id: 1-0\nevent: message\ndata: {}\n\n'
+
+
+@pytest.mark.django_db
+class TestPublish:
+    def test_publishes_after_commit_only_when_enabled(self, settings, django_capture_on_commit_callbacks):
+        deltas = updates.conversation_changed(uuid.uuid4(), Conversation.CLOSED_CHOICE)
+
+        with django_capture_on_commit_callbacks() as callbacks:
+            updates.publish(deltas)
+        assert callbacks == []
+
+        settings.WEBHOOK_UPDATES_ENABLED = True
+        with django_capture_on_commit_callbacks() as callbacks:
+            updates.publish(deltas)
+        assert len(callbacks) == 1
+
+
+@pytest.mark.django_db
+class TestServiceDeltas:
+    @pytest.fixture
+    def published(self, monkeypatch):
+        deltas = []
+        monkeypatch.setattr(updates, 'publish', deltas.extend)
+        return deltas
+
+    def test_redelivered_conversation_publishes_nothing(self, published):
+        conversation = ConversationFactory(state=Conversation.CLOSED_CHOICE)
+        event = {'type': 'NEW_CONVERSATION', 'timestamp': '2025-02-21T10:20:41Z', 'data': {'id': str(conversation.id)}}
+
+        WebhookService.create_conversation(event)
+        WebhookService.create_conversation({**event, 'tenant_id': Tenant.objects.create(slug='acme', name='A').pk})
+
+        assert published == []
+        conversation.refresh_from_db()
+        assert conversation.state == Conversation.CLOSED_CHOICE
+
+    def test_batch_publishes_only_inserted_conversations(self, published, monkeypatch):
+        conversation = ConversationFactory(state=Conversation.CLOSED_CHOICE)
+        # Simula uma criação concorrente confirmada depois do retrato das conversas existentes
+        plan = services.BatchPlan
+        monkeypatch.setattr(services, 'BatchPlan', lambda states, existing, tenants: plan({}, existing, {}))
+        new_id = str(uuid.uuid4())
+
+        WebhookService.process_batch([
+            {'type': 'NEW_CONVERSATION', 'timestamp': '2025-02-21T10:20:41Z', 'data': {'id': str(conversation.id)}},
+            {'type': 'NEW_CONVERSATION', 'timestamp': '2025-02-21T10:20:41Z', 'data': {'id': new_id}},
+        ])
+
+        assert {str(delta['data']['id']) for _, delta in published} == {new_id}
+
+
+def _get_async(path, data=None, **kwargs):
+    return async_to_sync(AsyncClient().get)(path, data, **kwargs)
+
+
+@pytest.mark.django_db
+class TestConversationUpdatesView:
+    def test_rejects_invalid_token(self):
+        acme = Tenant.objects.create(slug='acme', name='Acme', secret='acme-secret')
+        acme.rotate_read_token()
+
+        response = _get_async('/conversations/updates/', {'source': 'acme', 'token': 'wrong'})
+        assert response.status_code == 401
+
+        response = _get_async('/conversations/updates/', {'source': 'acme', 'token': acme.secret})
+        assert response.status_code == 401
+
+    def test_hides_conversations_of_another_source(self):
+        acme = Tenant.objects.create(slug='acme', name='Acme', secret='acme-secret')
+        globex = Tenant.objects.create(slug='globex', name='Globex', secret='globex-secret')
+        conversation = ConversationFactory(tenant=globex)
+        token = acme.rotate_read_token()
+
+        response = _get_async(f'/conversations/{conversation.id}/updates/', {'source': acme.slug, 'token': token})
+
+        assert response.status_code == 404
+
+    def test_rejects_invalid_last_event_id(self):
+        response = _get_async('/conversations/updates/', headers={'Last-Event-ID': 'nope'})
+
+        assert response.status_code == 400
+
+    def test_requires_asgi(self):
+        conversation = ConversationFactory()
+
+        assert Client().get(f'/conversations/{conversation.id}/updates/').status_code == 501
@@ -0,0 +1,54 @@
+import uuid
+
+import pytest
+
+from apps.webhook_handler.validators import EventValidationError, validate_event
+
+
+class TestValidateEvent:
+    def test_valid_message(self):
+        event = validate_event({
+            'type': 'NEW_MESSAGE',
+            'timestamp': '2025-02-21T10:20:42.349308+00:00',
+            'data': {
+                'id': str(uuid.uuid4()),
+                'direction': 'SENT',
+                'content': 'Olá',
+                'conversation_id': str(uuid.uuid4())
+            }
+        })
+
+        assert event['type'] == 'NEW_MESSAGE'
+        assert event['timestamp'].tzinfo is not None
+
+    def test_message_without_conversation_id_is_rejected(self):
+        with pytest.raises(EventValidationError) as exc_info:
+            validate_event({
+                'type': 'NEW_MESSAGE',
+                'timestamp': '2025-02-21T10:20:42.349308+00:00',
+                'data': {'id': str(uuid.uuid4()), 'direction': 'OUT', 'content': 'Olá'}
+            })
+
+        assert exc_info.value.errors == {
+            'data': {
+                'conversation_id': ['This field is required.'],
+                'direction': ['"OUT" is not a valid choice.'],
+            }
+        }
+
+    def test_invalid_type_timestamp_and_uuid(self):
+        with pytest.raises(EventValidationError) as exc_info:
+            validate_event({'type': 'UNKNOWN', 'timestamp': 'ontem', 'data': {'id': 'abc'}})
+
+        assert set(exc_info.value.errors) == {'type', 'timestamp'}
+
+        with pytest.raises(EventValidationError) as exc_info:
+            validate_event({'type': 'CLOSE_CONVERSATION', 'timestamp': '2025-02-21T10:20:42Z', 'data': {'id': 'abc'}})
+        assert exc_info.value.errors == {'data': {'id': ['Must be a valid UUID.']}}
+
+    def test_non_dict_payloads(self):
+        with pytest.raises(EventValidationError):
+            validate_event(['NEW_CONVERSATION'])
+        with pytest.raises(EventValidationError) as exc_info:
+            validate_event({'type': ['NEW_CONVERSATION'], 'timestamp': '2025-02-21T10:20:42Z', 'data': 'x'})
+        assert set(exc_info.value.errors) == {'type', 'data'}
@@ -0,0 +1,277 @@
+import gzip
+import json
+import uuid
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+from django_celery_results.models import TaskResult
+from rest_framework.test import APIClient
+
+from apps.webhook_handler import caching, dedup, summaries
+from apps.webhook_handler.factories import ConversationFactory, MessageFactory
+from apps.webhook_handler.models import Conversation, Message
+from apps.webhook_handler.services import WebhookService
+from apps.webhook_handler.status import purge_task_results
+from apps.webhook_handler.tasks import process_webhook
+from apps.webhook_handler.validators import validate_event
+
+
+@pytest.fixture
+def client():
+    return APIClient(HTTP_AUTHORIZATION='debug')
+
+
+@pytest.mark.django_db
+class TestWebhookBatch:
+    def test_batch_json_array(self, client):
+        conversation_id = str(uuid.uuid4())
+        events = [
+            {
+                'type': 'NEW_CONVERSATION',
+                'timestamp': '2025-02-21T10:20:41.349308+00:00',
+                'data': {'id': conversation_id}
+            },
+            {
+                'type': 'NEW_MESSAGE',
+                'timestamp': '2025-02-21T10:20:42.349308+00:00',
+                'data': {
+                    'id': str(uuid.uuid4()),
+                    'direction': 'RECEIVED',
+                    'content': 'Olá',
+                    'conversation_id': conversation_id
+                }
+            },
+            {'type': 'UNKNOWN', 'timestamp': '2025-02-21T10:20:42.349308+00:00', 'data': {}},
+        ]
+
+        response = client.post('/webhooks/batch/', events, format='json')
+        assert response.status_code == 202
+        assert [result['status'] for result in response.data['results']] == ['accepted', 'accepted', 'invalid']
+        assert response.data['results'][0]['task_id'] == response.data['results'][1]['task_id']
+        assert Conversation.objects.filter(id=conversation_id).exists()
+        assert Message.objects.filter(conversation_id=conversation_id).count() == 1
+
+    def test_batch_ndjson(self, client):
+        conversation_ids = [str(uuid.uuid4()) for _ in range(3)]
+        body = '\n'.join(
+            json.dumps({
+                'type': 'NEW_CONVERSATION',
+                'timestamp': '2025-02-21T10:20:41.349308+00:00',
+                'data': {'id': conversation_id}
+            })
+            for conversation_id in conversation_ids
+        )
+
+        response = client.post('/webhooks/batch/', body, content_type='application/x-ndjson')
+        assert response.status_code == 202
+        assert Conversation.objects.filter(id__in=conversation_ids).count() == 3
+
+    def test_batch_requires_list(self, client):
+        response = client.post('/webhooks/batch/', {'type': 'NEW_CONVERSATION'}, format='json')
+        assert response.status_code == 400
+
+    def test_batch_drops_redelivered_events(self, client):
+        event = {
+            'type': 'NEW_CONVERSATION',
+            'timestamp': '2025-02-21T10:20:41.349308+00:00',
+            'data': {'id': str(uuid.uuid4())}
+        }
+
+        response = client.post('/webhooks/batch/', [event, event], format='json')
+        assert [result['status'] for result in response.data['results']] == ['accepted', 'duplicate']
+
+        response = client.post('/webhooks/webhook/', event, format='json')
+        assert response.status_code == 200
+        assert response.data == {'status': 'duplicate'}
+
+    def test_failed_events_can_be_redelivered(self, client):
+        conversation = ConversationFactory(state=Conversation.CLOSED_CHOICE)
+        event = {
+            'type': 'NEW_MESSAGE',
+            'timestamp': '2025-02-21T10:20:42.349308+00:00',
+            'data': {
+                'id': str(uuid.uuid4()),
+                'direction': 'RECEIVED',
+                'content': 'Late message',
+                'conversation_id': str(conversation.id)
+            }
+        }
+
+        response = client.post('/webhooks/batch/', [event], format='json')
+        assert response.data['results'][0]['status'] == 'accepted'
+        response = client.post('/webhooks/batch/', [event], format='json')
+        assert response.data['results'][0]['status'] == 'accepted'
+
+        validated = validate_event(event)
+        assert dedup.mark_seen(validated)
+        with pytest.raises(ValueError):
+            process_webhook(validated)
+        assert dedup.mark_seen(validated)
+
+
+@pytest.mark.django_db
+class TestTaskStatus:
+    def _post_conversation(self, client):
+        event = {
+            'type': 'NEW_CONVERSATION',
+            'timestamp': '2025-02-21T10:20:41.349308+00:00',
+            'data': {'id': str(uuid.uuid4())}
+        }
+        return client.post('/webhooks/webhook/', event, format='json').data['task_id']
+
+    def test_redis_mode_skips_task_result_rows(self, client, settings):
+        settings.WEBHOOK_RESULT_MODE = 'redis'
+        task_id = self._post_conversation(client)
+
+        assert not TaskResult.objects.exists()
+        response = client.get(f'/webhooks/{task_id}/task_status/')
+        assert response.data == {'status': 'SUCCESS'}
+
+    def test_db_mode_reads_task_result(self, client, settings):
+        settings.WEBHOOK_RESULT_MODE = 'db'
+        task_id = self._post_conversation(client)
+        TaskResult.objects.create(task_id=task_id, status='SUCCESS')
+
+        response = client.get(f'/webhooks/{task_id}/task_status/')
+        assert response.data == {'status': 'SUCCESS'}
+
+    def test_none_mode_stores_nothing(self, client, settings):
+        settings.WEBHOOK_RESULT_MODE = 'none'
+        task_id = self._post_conversation(client)
+
+        response = client.get(f'/webhooks/{task_id}/task_status/')
+        assert response.data == {'status': 'NOT_FOUND'}
+
+    def test_purge_removes_only_expired_results(self):
+        old = TaskResult.objects.create(task_id='old', status='SUCCESS')
+        TaskResult.objects.filter(pk=old.pk).update(date_done=timezone.now() - timedelta(days=2))
+        TaskResult.objects.create(task_id='recent', status='SUCCESS')
+
+        assert purge_task_results(max_age_seconds=86400, batch_size=1) == 1
+        assert list(TaskResult.objects.values_list('task_id', flat=True)) == ['recent']
+
+
+@pytest.mark.django_db
+class TestConversationViewSet:
+    def test_list_is_cursor_paginated_summary(self, client):
+        conversation = ConversationFactory()
+        MessageFactory(conversation=conversation, content='primeira', timestamp=timezone.now() - timedelta(minutes=1))
+        MessageFactory(conversation=conversation, content='última', timestamp=timezone.now())
+        ConversationFactory.create_batch(2)
+        # Mensagens criadas pela factory não passam pela ingestão
+        summaries.reconcile()
+
+        response = client.get('/conversations/', {'page_size': 2})
+        assert response.status_code == 200
+        assert len(response.data['results']) == 2
+        assert response.data['next']
+
+        response = client.get(response.data['next'])
+        summary = response.data['results'][0]
+        assert summary['id'] == str(conversation.id)
+        assert summary['message_count'] == 2
+        assert summary['last_message_preview'] == 'última'
+        assert 'messages' not in summary
+
+    def test_retrieve_includes_recent_messages(self, client, settings):
+        settings.CONVERSATION_DETAIL_MESSAGE_LIMIT = 2
+        conversation = ConversationFactory()
+        now = timezone.now()
+        messages = [
+            MessageFactory(conversation=conversation, timestamp=now + timedelta(seconds=offset))
+            for offset in range(3)
+        ]
+
+        response = client.get(f'/conversations/{conversation.id}/')
+        assert [item['id'] for item in response.data['messages']] == [str(m.id) for m in messages[1:]]
+        assert response.data['has_earlier_messages']
+        assert response.data['messages_cursor']
+
+    def test_messages_keyset_pagination(self, client):
+        conversation = ConversationFactory()
+        now = timezone.now()
+        messages = [
+            MessageFactory(conversation=conversation, timestamp=now + timedelta(seconds=offset))
+            for offset in range(3)
+        ]
+        url = f'/conversations/{conversation.id}/messages/'
+
+        response = client.get(url, {'page_size': 2})
+        assert [item['id'] for item in response.data['results']] == [str(m.id) for m in messages[:2]]
+        assert response.data['has_more']
+
+        response = client.get(url, {'after': response.data['next_cursor']})
+        assert [item['id'] for item in response.data['results']] == [str(messages[2].id)]
+        assert not response.data['has_more']
+
+        cursor = response.data['next_cursor']
+        response = client.get(url, {'after': cursor})
+        assert response.data['results'] == []
+        assert response.data['next_cursor'] == cursor
+
+        response = client.get(url, {'before': cursor})
+        assert [item['id'] for item in response.data['results']] == [str(m.id) for m in messages[:2]]
+
+    def test_export_streams_ndjson(self, client):
+        message = MessageFactory()
+        ConversationFactory(state=Conversation.CLOSED_CHOICE)
+
+        response = client.get('/conversations/export/', {'state': 'OPEN'})
+        records = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        assert [record['record'] for record in records] == ['conversation', 'message']
+        assert records[1]['id'] == str(message.id)
+
+        response = client.get('/conversations/export/', {'compress': 'gzip'})
+        lines = gzip.decompress(b''.join(response.streaming_content)).splitlines()
+        assert len(lines) == 3
+
+    def test_retrieve_uses_etag_and_invalidates_on_write(self, client, django_capture_on_commit_callbacks):
+        conversation = ConversationFactory()
+        url = f'/conversations/{conversation.id}/'
+
+        response = client.get(url)
+        etag = response['ETag']
+        assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+        with django_capture_on_commit_callbacks(execute=True):
+            WebhookService.create_message({
+                'type': 'NEW_MESSAGE',
+                'timestamp': timezone.now(),
+                'data': {
+                    'id': str(uuid.uuid4()),
+                    'direction': 'SENT',
+                    'content': 'Nova mensagem',
+                    'conversation_id': str(conversation.id)
+                }
+            })
+
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert response['ETag'] != etag
+        assert [item['content'] for item in response.data['messages']] == ['Nova mensagem']
+
+    def test_stale_read_finishing_after_a_write_is_not_served(self, client, django_capture_on_commit_callbacks):
+        conversation = ConversationFactory()
+        url = f'/conversations/{conversation.id}/'
+        # Uma leitura começa (versão e estado do banco) antes de a escrita ser confirmada...
+        version = caching.conversation_version(conversation.id)
+        stale = client.get(url).data
+
+        with django_capture_on_commit_callbacks(execute=True):
+            WebhookService.close_conversation({'type': 'CLOSE_CONVERSATION', 'data': {'id': str(conversation.id)}})
+        # ...e grava o estado anterior no cache depois da invalidação
+        caching.set_conversation_detail(conversation.id, version, stale)
+
+        assert client.get(url).data['state'] == Conversation.CLOSED_CHOICE
+
+    def test_retrieve_cache_key_is_case_insensitive(self, client, django_capture_on_commit_callbacks):
+        conversation = ConversationFactory()
+        url = f'/conversations/{str(conversation.id).upper()}/'
+        assert client.get(url).data['messages'] == []
+
+        with django_capture_on_commit_callbacks(execute=True):
+            WebhookService.close_conversation({'type': 'CLOSE_CONVERSATION', 'data': {'id': str(conversation.id)}})
+
+        assert client.get(url).data['state'] == Conversation.CLOSED_CHOICE
+        assert client.get('/conversations/not-a-uuid/').status_code == 404
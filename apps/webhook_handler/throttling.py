@@ -0,0 +1,183 @@
+import hashlib
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+from redis.exceptions import RedisError
+from rest_framework.throttling import BaseThrottle
+
+from .redis_client import get_redis
+
+logger = logging.getLogger('webhook_handler')
+
+RATE_LIMIT_KEY = 'webhook:ratelimit:{}'
+
+IDENTITY_IP = 'ip'
+IDENTITY_KEY = 'key'
+IDENTITY_TENANT = 'tenant'
+
+# Balde de fichas atômico: repõe `rate` fichas por segundo até `burst` e consome `cost`.
+# O relógio é o do próprio Redis, o mesmo para todos os processos web.
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local retry_after = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    retry_after = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return {allowed, tostring(retry_after)}
+"""
+
+
+class BaseRateLimiter:
+    """
+    Limitador de taxa com semântica de balde de fichas.
+
+    Cada identidade tem um balde com capacidade `burst`, reabastecido a `rate`
+    fichas por segundo; cada requisição consome uma ficha.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+
+    def consume(self, identity: str, cost: int = 1, rate: float = None, burst: int = None) -> tuple:
+        """
+        Tenta consumir `cost` fichas do balde de uma identidade.
+
+        `rate` e `burst` substituem os limites padrão do limitador para esta
+        identidade (por exemplo, os limites próprios de uma origem).
+
+        Returns:
+            tuple: (permitido, segundos até haver fichas suficientes)
+        """
+        raise NotImplementedError
+
+
+class RedisTokenBucket(BaseRateLimiter):
+    """
+    Balde de fichas no Redis, compartilhado por todos os processos web.
+
+    Cada verificação é uma única chamada EVALSHA, O(1), sobre um hash com as fichas
+    restantes e o horário da última reposição, que expira quando o balde enche.
+    Se o Redis estiver indisponível, a requisição é permitida: o limitador não deve
+    derrubar a ingestão.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        super().__init__(rate, burst)
+        self.script = get_redis().register_script(TOKEN_BUCKET_SCRIPT)
+
+    def consume(self, identity: str, cost: int = 1, rate: float = None, burst: int = None) -> tuple:
+        try:
+            allowed, retry_after = self.script(
+                keys=[RATE_LIMIT_KEY.format(identity)], args=[rate or self.rate, burst or self.burst, cost]
+            )
+        except RedisError as e:
+            logger.warning("Rate limiter unavailable, allowing request: %s", e)
+            return True, 0.0
+        return bool(allowed), float(retry_after)
+
+
+class LocalTokenBucket(BaseRateLimiter):
+    """
+    Balde de fichas em memória, por processo. Para desenvolvimento e testes, sem Redis.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        super().__init__(rate, burst)
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def consume(self, identity: str, cost: int = 1, rate: float = None, burst: int = None) -> tuple:
+        rate = rate or self.rate
+        burst = burst or self.burst
+        now = time.monotonic()
+        with self.lock:
+            tokens, updated = self.buckets.get(identity, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self.buckets[identity] = (tokens, now)
+        return allowed, 0.0 if allowed else (cost - tokens) / rate
+
+
+_limiter = None
+
+
+def get_limiter() -> BaseRateLimiter:
+    """
+    Retorna o limitador configurado em WEBHOOK_RATE_LIMITER, ou None se a limitação estiver desativada.
+    """
+    global _limiter
+    if not settings.WEBHOOK_RATE_LIMITER:
+        return None
+    if _limiter is None:
+        limiter_class = import_string(settings.WEBHOOK_RATE_LIMITER)
+        _limiter = limiter_class(settings.WEBHOOK_RATE_LIMIT_RATE, settings.WEBHOOK_RATE_LIMIT_BURST)
+    return _limiter
+
+
+@receiver(setting_changed)
+def reset_limiter(setting, **kwargs):
+    """Recria o limitador quando as configurações de limite mudam (por exemplo, em testes)."""
+    global _limiter
+    if setting.startswith('WEBHOOK_RATE_LIMIT'):
+        _limiter = None
+
+
+def rate_limit_identity(request, tenant=None) -> str:
+    """
+    Retorna a identidade usada para limitar uma requisição, segundo WEBHOOK_RATE_LIMIT_IDENTITY.
+
+    - `ip`: endereço do cliente (respeitando NUM_PROXIES do DRF)
+    - `key`: chave de assinatura; todas as requisições assinadas com a mesma chave dividem o limite
+    - `tenant`: origem autenticada (requisições sem origem dividem o balde `default`)
+    """
+    identity = settings.WEBHOOK_RATE_LIMIT_IDENTITY
+    if identity == IDENTITY_TENANT:
+        return f"tenant:{tenant.slug if tenant else 'default'}"
+    if identity == IDENTITY_KEY:
+        if tenant:
+            secret = tenant.secret
+        else:
+            secret = settings.WEBHOOK_API_KEY if settings.DEBUG else settings.WEBHOOK_SECRET
+        return f"key:{hashlib.sha256(secret.encode('utf-8')).hexdigest()[:16]}"
+    return f'ip:{BaseThrottle().get_ident(request)}'
+
+
+def check_rate_limit(request, tenant=None) -> tuple:
+    """
+    Consome uma ficha do balde da identidade da requisição.
+
+    Com a identidade `tenant`, os limites próprios da origem (`rate_limit` e
+    `rate_burst`), quando definidos, substituem os padrões.
+
+    Returns:
+        tuple: (permitido, segundos até a próxima ficha)
+    """
+    limiter = get_limiter()
+    if limiter is None:
+        return True, 0.0
+    identity = rate_limit_identity(request, tenant)
+    if tenant and settings.WEBHOOK_RATE_LIMIT_IDENTITY == IDENTITY_TENANT:
+        return limiter.consume(identity, rate=tenant.rate_limit, burst=tenant.rate_burst)
+    return limiter.consume(identity)
@@ -0,0 +1,178 @@
+import json
+import logging
+import time
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from redis.exceptions import RedisError
+
+from .models import Conversation
+from .redis_client import get_async_redis, get_redis
+
+logger = logging.getLogger('webhook_handler')
+
+CONVERSATION_STREAM = 'webhook:updates:conversation:{}'
+LIST_STREAM = 'webhook:updates:conversations:{}'
+# Stream da listagem sem origem (todas as conversas)
+ALL_TENANTS = 'all'
+
+MESSAGE_CREATED = 'message'
+CONVERSATION_CHANGED = 'conversation'
+RESET = 'reset'
+
+
+def list_stream(tenant_id=None) -> str:
+    return LIST_STREAM.format(ALL_TENANTS if tenant_id is None else tenant_id)
+
+
+def message_created(message, tenant_id=None) -> list:
+    """
+    Deltas de uma mensagem nova: a mensagem, no stream da conversa, e o resumo, nos streams da listagem.
+
+    O resumo traz o ID da mensagem (`message_id`), para que o cliente não some
+    `new_messages` duas vezes quando um delta se repete.
+
+    Returns:
+        list: Pares (stream, delta).
+    """
+    data = {
+        'id': message.id,
+        'conversation_id': message.conversation_id,
+        'direction': message.direction,
+        'content': message.content,
+        'timestamp': message.timestamp,
+    }
+    summary = {
+        'id': message.conversation_id,
+        'message_id': message.id,
+        'last_message_at': message.timestamp,
+        'last_message_preview': message.content[:Conversation.PREVIEW_LENGTH],
+        'last_direction': message.direction,
+        'new_messages': 1,
+    }
+    return [(CONVERSATION_STREAM.format(message.conversation_id), {'type': MESSAGE_CREATED, 'data': data})] + \
+        _list_deltas(tenant_id, summary)
+
+
+def conversation_changed(conversation_id, state: str, tenant_id=None) -> list:
+    """
+    Deltas de uma conversa criada ou fechada, para o stream da conversa e os da listagem.
+
+    Returns:
+        list: Pares (stream, delta).
+    """
+    data = {'id': conversation_id, 'state': state}
+    return [(CONVERSATION_STREAM.format(conversation_id), {'type': CONVERSATION_CHANGED, 'data': data})] + \
+        _list_deltas(tenant_id, data)
+
+
+def _list_deltas(tenant_id, data: dict) -> list:
+    delta = {'type': CONVERSATION_CHANGED, 'data': data}
+    streams = [list_stream()]
+    if tenant_id is not None:
+        streams.append(list_stream(tenant_id))
+    return [(stream, delta) for stream in streams]
+
+
+def publish(deltas: list) -> None:
+    """
+    Publica deltas nos streams do Redis após o commit da transação corrente.
+
+    Cada stream é limitado por tamanho (WEBHOOK_UPDATES_*_MAXLEN) e expira após
+    WEBHOOK_UPDATES_TTL segundos sem escritas. Uma falha do Redis é registrada e
+    ignorada: as atualizações em tempo real são um complemento, e os dados
+    continuam disponíveis pela API.
+
+    Args:
+        deltas (list): Pares (stream, delta), como os retornados por `message_created`
+            e `conversation_changed`.
+    """
+    if deltas and settings.WEBHOOK_UPDATES_ENABLED:
+        transaction.on_commit(lambda: _send(deltas))
+
+
+def _send(deltas: list) -> None:
+    try:
+        pipeline = get_redis().pipeline(transaction=False)
+        for stream, delta in deltas:
+            is_list = stream.startswith(LIST_STREAM.format(''))
+            maxlen = settings.WEBHOOK_UPDATES_LIST_MAXLEN if is_list else settings.WEBHOOK_UPDATES_CONVERSATION_MAXLEN
+            pipeline.xadd(
+                stream,
+                {'type': delta['type'], 'data': json.dumps(delta['data'], cls=DjangoJSONEncoder)},
+                maxlen=maxlen,
+                approximate=True,
+            )
+            pipeline.expire(stream, settings.WEBHOOK_UPDATES_TTL)
+        pipeline.execute()
+    except RedisError as e:
+        logger.warning("Failed to publish %s conversation updates: %s", len(deltas), e)
+
+
+def format_event(event_id: str, event_type: str, data: str) -> str:
+    """Formata um evento no protocolo Server-Sent Events."""
+    return f'id: {event_id}\nevent: {event_type}\ndata: {data}\n\n'
+
+
+def _stream_id_ms(stream_id: str) -> int:
+    return int(stream_id.split('-')[0])
+
+
+async def _missed_entries(redis, stream: str, last_event_id: str) -> bool:
+    """
+    Indica se entradas posteriores a `last_event_id` podem ter sido descartadas do stream.
+
+    Entradas somem quando o stream é aparado (MAXLEN) ou quando ele expira por
+    inatividade; nos dois casos o cliente precisa recarregar o estado pela API.
+    """
+    if not await redis.exists(stream):
+        # Sem escritas por WEBHOOK_UPDATES_TTL: só houve perda se o cliente está ausente há mais que isso
+        return _stream_id_ms(last_event_id) < (time.time() - settings.WEBHOOK_UPDATES_TTL) * 1000
+    info = await redis.xinfo_stream(stream)
+    deleted = info.get('max-deleted-entry-id', b'0-0')
+    deleted = deleted.decode() if isinstance(deleted, bytes) else deleted
+    return tuple(map(int, last_event_id.split('-'))) < tuple(map(int, deleted.split('-')))
+
+
+async def stream_events(stream: str, last_event_id: str = None):
+    """
+    Gera os eventos SSE de um stream, a partir de `last_event_id` (exclusivo) ou do momento atual.
+
+    O ID de cada evento é o ID da entrada no stream; ao reconectar, o EventSource o
+    reenvia em `Last-Event-ID` e recebe exatamente as entradas seguintes. Se elas
+    já não estiverem disponíveis, um evento `reset` pede ao cliente que recarregue.
+    Um comentário é enviado a cada WEBHOOK_UPDATES_HEARTBEAT_SECONDS sem eventos, e a
+    conexão é encerrada após WEBHOOK_UPDATES_MAX_SECONDS, para que o cliente reconecte
+    e libere a conexão com o Redis.
+
+    Yields:
+        str: Eventos no formato SSE.
+    """
+    redis = get_async_redis()
+    yield f'retry: {settings.WEBHOOK_UPDATES_RETRY_MS}\n\n'
+    missed = last_event_id is not None and await _missed_entries(redis, stream, last_event_id)
+    if last_event_id is None or missed:
+        # Posição concreta em vez de '$': entradas gravadas entre duas leituras não se perdem
+        latest = await redis.xrevrange(stream, count=1)
+        last_event_id = latest[0][0].decode() if latest else '0-0'
+    if missed:
+        yield format_event(last_event_id, RESET, '{}')
+
+    deadline = time.monotonic() + settings.WEBHOOK_UPDATES_MAX_SECONDS
+    while time.monotonic() < deadline:
+        response = await redis.xread(
+            {stream: last_event_id}, count=100, block=settings.WEBHOOK_UPDATES_HEARTBEAT_SECONDS * 1000
+        )
+        if not response:
+            yield ': keep-alive\n\n'
+            continue
+        for entry_id, fields in response[0][1]:
+            last_event_id = entry_id.decode()
+            yield format_event(last_event_id, fields[b'type'].decode(), fields[b'data'].decode())
+
+
+def valid_event_id(value: str) -> bool:
+    """Indica se `value` é um ID de entrada de stream do Redis (`<ms>-<seq>`)."""
+    parts = value.split('-')
+    return len(parts) == 2 and all(part.isdigit() for part in parts)
@@ -1,11 +1,20 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import WebhookViewSet, ConversationViewSet
+from .views import (
+    WebhookViewSet, ConversationViewSet, MessageSearchViewSet, async_webhook, conversation_updates, prometheus_metrics,
+)
 
 router = DefaultRouter()
 router.register(r'conversations', ConversationViewSet)
+router.register(r'messages/search', MessageSearchViewSet, basename='message-search')
 router.register(r'webhooks', WebhookViewSet, basename='webhook')
 
 urlpatterns = [
+    path('webhooks/async/', async_webhook, name='webhook-async'),
+    # Sem barra final: caminho padrão dos scrapes do Prometheus
+    path('metrics', prometheus_metrics, name='metrics'),
+    # Antes do router, que trataria `updates` como o ID de uma conversa
+    path('conversations/updates/', conversation_updates, name='conversation-list-updates'),
+    path('conversations/<uuid:conversation_id>/updates/', conversation_updates, name='conversation-updates'),
     path('', include(router.urls)),
 ]
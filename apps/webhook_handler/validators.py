@@ -0,0 +1,155 @@
+import uuid
+from datetime import datetime
+
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Message
+
+REQUIRED = 'This field is required.'
+INVALID_UUID = 'Must be a valid UUID.'
+INVALID_STRING = 'Not a valid string.'
+INVALID_DATETIME = 'Datetime has wrong format. Use ISO 8601.'
+
+
+class EventValidationError(ValueError):
+    """
+    Evento de webhook malformado.
+
+    Attributes:
+        errors (dict): Erros por campo, no mesmo formato de `serializer.errors` do DRF
+            (campos de `data` aninhados em `{'data': {...}}`).
+    """
+
+    def __init__(self, errors: dict):
+        super().__init__(errors)
+        self.errors = errors
+
+
+def _check_uuid(value) -> str:
+    if isinstance(value, uuid.UUID):
+        return None
+    try:
+        uuid.UUID(value)
+    except (TypeError, ValueError, AttributeError):
+        return INVALID_UUID
+    return None
+
+
+def _check_string(value) -> str:
+    return None if isinstance(value, str) else INVALID_STRING
+
+
+def _check_direction(value) -> str:
+    if value in (Message.SENT_CHOICE, Message.RECEIVED_CHOICE):
+        return None
+    return f'"{value}" is not a valid choice.'
+
+
+# Campos obrigatórios de `data` e sua verificação, por tipo de evento
+EVENT_SCHEMAS = {
+    'NEW_CONVERSATION': (('id', _check_uuid),),
+    'NEW_MESSAGE': (
+        ('id', _check_uuid),
+        ('conversation_id', _check_uuid),
+        ('direction', _check_direction),
+        ('content', _check_string),
+    ),
+    'CLOSE_CONVERSATION': (('id', _check_uuid),),
+}
+
+
+def parse_timestamp(value):
+    """
+    Converte o timestamp de um evento em um datetime com fuso horário.
+
+    `parse_datetime` tenta primeiro `datetime.fromisoformat` (implementado em C) e só
+    recorre à expressão regular para variações de ISO 8601 que ele não aceita.
+    Horários sem fuso são interpretados no fuso atual, como faz o DRF.
+
+    Returns:
+        datetime: O timestamp, ou None se o valor não for um datetime ISO 8601 válido.
+    """
+    if isinstance(value, datetime):
+        parsed = value
+    elif isinstance(value, str):
+        try:
+            parsed = parse_datetime(value)
+        except ValueError:
+            return None
+        if parsed is None:
+            return None
+    else:
+        return None
+
+    if timezone.is_naive(parsed):
+        return timezone.make_aware(parsed)
+    return parsed.astimezone(timezone.get_current_timezone())
+
+
+def validate_event(event, tenant_id=None) -> dict:
+    """
+    Valida um evento de webhook de acordo com o esquema do seu tipo.
+
+    Substitui o WebhookSerializer nos caminhos de ingestão: além do tipo e do
+    timestamp, verifica os campos de `data` exigidos por cada tipo (UUIDs,
+    direção e conteúdo), rejeitando na borda eventos que antes só falhariam
+    dentro do WebhookService.
+
+    Args:
+        event: Evento já decodificado do JSON.
+        tenant_id: ID da origem autenticada, anexado ao evento. Um `tenant_id` vindo
+            no próprio corpo é sempre descartado.
+
+    Returns:
+        dict: Evento com `type`, `timestamp` (datetime com fuso), `data` e `tenant_id`.
+
+    Raises:
+        EventValidationError: Se o evento for inválido.
+    """
+    if not isinstance(event, dict):
+        raise EventValidationError({'non_field_errors': ['Invalid data. Expected a dictionary.']})
+
+    errors = {}
+    event_type = event.get('type')
+    if event_type is None:
+        errors['type'] = [REQUIRED]
+    elif not isinstance(event_type, str) or event_type not in EVENT_SCHEMAS:
+        errors['type'] = [f'"{event_type}" is not a valid choice.']
+
+    timestamp = event.get('timestamp')
+    if timestamp is None:
+        errors['timestamp'] = [REQUIRED]
+    else:
+        timestamp = parse_timestamp(timestamp)
+        if timestamp is None:
+            errors['timestamp'] = [INVALID_DATETIME]
+
+    data = event.get('data')
+    data_errors = _validate_data(data, () if 'type' in errors else EVENT_SCHEMAS[event_type])
+    if data_errors:
+        errors['data'] = data_errors
+
+    if errors:
+        raise EventValidationError(errors)
+    return {'type': event_type, 'timestamp': timestamp, 'data': data, 'tenant_id': tenant_id}
+
+
+def _validate_data(data, schema: tuple):
+    """
+    Retorna os erros do campo `data` segundo o esquema do tipo, ou None se ele for válido.
+    """
+    if data is None:
+        return [REQUIRED]
+    if not isinstance(data, dict):
+        return [f'Expected a dictionary of items but got type "{type(data).__name__}".']
+
+    errors = {}
+    for field, check in schema:
+        if field not in data:
+            errors[field] = [REQUIRED]
+            continue
+        error = check(data[field])
+        if error:
+            errors[field] = [error]
+    return errors or None
@@ -1,12 +1,88 @@
+import hmac
+import json
+import logging
+import math
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.dateparse import parse_datetime
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
 from rest_framework import status, viewsets
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from django_celery_results.models import TaskResult
+from rest_framework.exceptions import AuthenticationFailed, NotAuthenticated, NotFound, ValidationError
+from rest_framework.parsers import JSONParser
+from redis.exceptions import RedisError
+
+from apps.webhook_handler.tasks import process_webhook, process_webhook_batch
+from .models import Conversation, Message
+from .pagination import ConversationCursorPagination, MessageKeysetPagination, SearchPagination
+from .serializers import (
+    ConversationDetailSerializer,
+    ConversationListSerializer,
+    ConversationSerializer,
+    MessageSearchResultSerializer,
+    MessageSerializer,
+)
+from . import dedup, metrics, status as event_status, updates
+from .search import search_messages
+from .buffer import buffer_event
+from .caching import canonical_id, conversation_version, get_conversation_detail, set_conversation_detail
+from .exporters import export_records, iter_ndjson
+from .ingest import BufferFull, count_received, get_buffer, publish_events
+from .mixins import (
+    ReplicaReadMixin,
+    TenantReadAuthentication,
+    WebhookAuthentication,
+    bearer_token,
+    check_read_token,
+    verify_signature,
+)
+from .tenants import TENANT_HEADER, aget_tenant, check_source
+from .parsers import NDJSONParser
+from .routing import group_by_queue, queue_for_event
+from .throttling import check_rate_limit
+from .validators import EventValidationError, validate_event
+
+logger = logging.getLogger('webhook_handler')
+
+
+def request_tenant(request):
+    """
+    Retorna a origem autenticada de uma requisição de leitura, ou None para acesso a todas as conversas.
+
+    Raises:
+        NotAuthenticated: Se WEBHOOK_REQUIRE_TENANT estiver ativo e a requisição não tiver origem.
+    """
+    if request.auth is None and settings.WEBHOOK_REQUIRE_TENANT:
+        raise NotAuthenticated('No webhook source provided')
+    return request.auth
 
-from apps.webhook_handler.tasks import process_webhook
-from .models import Conversation
-from .serializers import ConversationSerializer, WebhookSerializer
-from .mixins import WebhookAuthentication
+
+def parse_conversation_filters(params) -> dict:
+    """
+    Lê os filtros `state`, `since` e `until` da query string.
+
+    Returns:
+        dict: {'state': str ou None, 'since': datetime ou None, 'until': datetime ou None}
+
+    Raises:
+        ValidationError: Se algum filtro for inválido.
+    """
+    state = params.get('state')
+    if state and state not in (Conversation.OPEN_CHOICE, Conversation.CLOSED_CHOICE):
+        raise ValidationError({'state': 'Must be OPEN or CLOSED'})
+    filters = {'state': state}
+    for name in ('since', 'until'):
+        value = params.get(name)
+        filters[name] = parse_datetime(value) if value else None
+        if value and filters[name] is None:
+            raise ValidationError({name: 'Invalid datetime'})
+    return filters
 
 
 class WebhookViewSet(viewsets.ViewSet):
@@ -24,36 +100,534 @@ class WebhookViewSet(viewsets.ViewSet):
         """
         Recebe dados do webhook e inicia processamento assíncrono.
 
+        Com WEBHOOK_MICROBATCH_ENABLED, o evento é publicado no buffer de micro-lotes
+        em vez de gerar uma tarefa própria; o ID retornado pode ser consultado da
+        mesma forma em `task_status`.
+
+        Reentregas de um evento já recebido dentro de WEBHOOK_DEDUP_TTL são descartadas
+        antes de serem enfileiradas. O evento é associado à origem autenticada.
+
         Returns:
-            Response com ID da tarefa criada e status 202 (Accepted)
+            Response com ID da tarefa criada e status 202 (Accepted), ou status 200
+            indicando que o evento é uma duplicata
         """
-        serializer = WebhookSerializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
-        result = process_webhook.delay(serializer.validated_data)
+        tenant_id = request.auth.pk if request.auth else None
+        event_type = metrics.event_type_label(request.data.get('type') if isinstance(request.data, dict) else None)
+        try:
+            with metrics.stage(metrics.STAGE_VALIDATION, event_type):
+                event = validate_event(request.data, tenant_id)
+        except EventValidationError as e:
+            metrics.count(metrics.EVENT_FAILURES, reason=metrics.FAILURE_INVALID)
+            raise ValidationError(e.errors)
+        with metrics.stage(metrics.STAGE_DEDUP, event_type):
+            is_new = dedup.mark_seen(event)
+        if not is_new:
+            metrics.increment(metrics.EVENTS_RECEIVED, tenant=tenant_id)
+            metrics.increment(metrics.EVENTS_DUPLICATE, tenant=tenant_id)
+            metrics.count(metrics.EVENT_FAILURES, reason=metrics.FAILURE_DUPLICATE)
+            return Response({'status': 'duplicate'}, status=status.HTTP_200_OK)
+
+        try:
+            with metrics.stage(metrics.STAGE_PUBLISH, event_type):
+                if settings.WEBHOOK_MICROBATCH_ENABLED:
+                    result = buffer_event(event)
+                else:
+                    result = event_status.apply_tracked(process_webhook, [event], queue=queue_for_event(event))
+        except Exception:
+            dedup.forget(event)
+            raise
+        metrics.increment(metrics.EVENTS_RECEIVED, tenant=tenant_id)
         return Response({'task_id': str(result)}, status=status.HTTP_202_ACCEPTED)
 
+    @action(detail=False, methods=['post'], parser_classes=[JSONParser, NDJSONParser])
+    def batch(self, request):
+        """
+        Recebe um lote de eventos (array JSON ou NDJSON) e inicia um único processamento assíncrono.
+
+        Cada evento é validado individualmente por `validate_event`; os válidos são
+        enviados juntos para a tarefa de processamento em massa (uma tarefa por fila de
+        shard, preservando a ordem) e os inválidos são reportados sem impedir o restante
+        do lote. Reentregas já vistas são reportadas como `duplicate` e não são enfileiradas.
+
+        Returns:
+            Response com o resultado da validação por item, incluindo o ID da tarefa
+            que processará cada evento aceito, e status 202 (Accepted)
+        """
+        events = request.data
+        if not isinstance(events, list):
+            return Response(
+                {'detail': 'Expected a JSON array or NDJSON body'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(events) > settings.WEBHOOK_BATCH_MAX_SIZE:
+            return Response(
+                {'detail': f'Batch exceeds the maximum of {settings.WEBHOOK_BATCH_MAX_SIZE} events'},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+            )
+
+        tenant_id = request.auth.pk if request.auth else None
+        with metrics.stage(metrics.STAGE_VALIDATION, metrics.BATCH):
+            accepted, results = self._validate_batch(events, tenant_id)
+        with metrics.stage(metrics.STAGE_PUBLISH, metrics.BATCH):
+            self._enqueue_batch(accepted, [result for result in results if result['status'] == 'accepted'])
+
+        duplicates = sum(1 for result in results if result['status'] == 'duplicate')
+        metrics.increment(metrics.EVENTS_RECEIVED, len(accepted) + duplicates, tenant=tenant_id)
+        metrics.increment(metrics.EVENTS_DUPLICATE, duplicates, tenant=tenant_id)
+        metrics.count(metrics.EVENT_FAILURES, duplicates, reason=metrics.FAILURE_DUPLICATE)
+        metrics.count(
+            metrics.EVENT_FAILURES, len(results) - len(accepted) - duplicates, reason=metrics.FAILURE_INVALID
+        )
+        return Response({'results': results}, status=status.HTTP_202_ACCEPTED)
+
+    @staticmethod
+    def _validate_batch(events: list, tenant_id=None) -> tuple:
+        """
+        Valida os eventos de um lote e descarta as reentregas já vistas.
+
+        Returns:
+            tuple: (eventos aceitos, resultado por item na ordem da entrada)
+        """
+        accepted = []
+        results = []
+        for index, event in enumerate(events):
+            try:
+                event = validate_event(event, tenant_id)
+            except EventValidationError as e:
+                results.append({'index': index, 'status': 'invalid', 'errors': e.errors})
+                continue
+            if dedup.mark_seen(event):
+                accepted.append(event)
+                results.append({'index': index, 'status': 'accepted'})
+            else:
+                results.append({'index': index, 'status': 'duplicate'})
+        return accepted, results
+
+    @staticmethod
+    def _enqueue_batch(accepted: list, accepted_results: list) -> None:
+        """
+        Enfileira os eventos aceitos, uma tarefa por fila de shard, anotando o ID da tarefa em cada resultado.
+        """
+        groups = list(group_by_queue(accepted).items())
+        for position, (queue, items) in enumerate(groups):
+            try:
+                task = event_status.apply_tracked(process_webhook_batch, [[event for _, event in items]], queue=queue)
+            except Exception:
+                # Libera os eventos que não chegaram a ser enfileirados para que a reentrega seja aceita
+                for _, pending in groups[position:]:
+                    for _, event in pending:
+                        dedup.forget(event)
+                raise
+            for index, _ in items:
+                accepted_results[index]['task_id'] = str(task)
+
+    @action(detail=False, methods=['get'])
+    def stats(self, request):
+        """
+        Retorna os contadores de ingestão compartilhados entre os processos.
+
+        Para uma origem autenticada, os contadores de eventos são os da própria origem.
+
+        Returns:
+            Response com o total de eventos recebidos, o total de duplicatas
+            descartadas, a taxa de duplicação e a taxa de acerto do cache de conversas
+        """
+        counters = metrics.get_counters(
+            [metrics.EVENTS_RECEIVED, metrics.EVENTS_DUPLICATE], tenant=request.auth.pk if request.auth else None
+        )
+        counters.update(metrics.get_counters([metrics.CONVERSATION_CACHE_HITS, metrics.CONVERSATION_CACHE_MISSES]))
+        received = counters[metrics.EVENTS_RECEIVED]
+        counters['duplicate_rate'] = counters[metrics.EVENTS_DUPLICATE] / received if received else 0.0
+        lookups = counters[metrics.CONVERSATION_CACHE_HITS] + counters[metrics.CONVERSATION_CACHE_MISSES]
+        counters['conversation_cache_hit_ratio'] = (
+            counters[metrics.CONVERSATION_CACHE_HITS] / lookups if lookups else 0.0
+        )
+        return Response(counters)
+
     @action(detail=True, methods=['get'])
     def task_status(self, request, pk=None):
         """
         Verifica o status de uma tarefa específica.
 
+        O status é lido do armazenamento ativo segundo WEBHOOK_RESULT_MODE: primeiro o
+        armazenamento de status (tarefas sem TaskResult e eventos processados pelo
+        buffer de micro-lotes) e, se não houver registro, a tabela TaskResult.
+
         Args:
             pk: ID da tarefa a ser verificada
 
         Returns:
             Response com o status atual da tarefa
         """
-        task = TaskResult.objects.filter(task_id=pk).first()
-        status = task.status if task else 'NOT_FOUND'
-        return Response({'status': status})
+        event = event_status.get_event_status(pk)
+        if event:
+            return Response(event)
 
+        task_state = event_status.get_task_result_status(pk)
+        if task_state:
+            return Response({'status': task_state})
+        return Response({'status': 'NOT_FOUND'})
 
-class ConversationViewSet(viewsets.ReadOnlyModelViewSet):
+
+class ConversationViewSet(ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet somente leitura para listar e recuperar conversas.
 
-    Fornece endpoints para listar todas as conversas e recuperar
-    conversas específicas por ID, incluindo suas mensagens.
+    A listagem é paginada por cursor e usa uma representação resumida, sem
+    mensagens; a rota de detalhe retorna a conversa com suas mensagens mais recentes
+    e a rota `messages` pagina o histórico completo.
+
+    Requisições de uma origem autenticada (X-Webhook-Source) enxergam apenas as
+    conversas dela; sem origem, todas as conversas, a menos que WEBHOOK_REQUIRE_TENANT
+    esteja ativo. Com DATABASE_REPLICAS, as leituras vão para uma réplica.
     """
-    queryset = Conversation.objects.prefetch_related('messages').all()
+    queryset = Conversation.objects.all()
     serializer_class = ConversationSerializer
+    pagination_class = ConversationCursorPagination
+    authentication_classes = [TenantReadAuthentication]
+
+    def get_queryset(self):
+        return self._scoped(Conversation.objects.all())
+
+    def _scoped(self, queryset):
+        """Restringe as conversas à origem autenticada."""
+        tenant = request_tenant(self.request)
+        return queryset if tenant is None else queryset.filter(tenant=tenant)
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return ConversationListSerializer
+        if self.action == 'retrieve':
+            return ConversationDetailSerializer
+        return ConversationSerializer
+
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Retorna o detalhe de uma conversa, servido do cache quando possível.
+
+        O detalhe serializado fica em cache até a próxima escrita na conversa, sob o ID
+        na forma canônica (IDs que não são UUID respondem 404) e a versão atual da
+        conversa, lida antes do banco (ver `conversation_version`). Se o cliente enviar
+        `If-None-Match` com o ETag atual, a resposta é 304 sem corpo, e sem consultar o
+        banco quando a conversa está em cache.
+        """
+        try:
+            conversation_id = canonical_id(kwargs[self.lookup_field])
+        except ValueError:
+            raise NotFound()
+        if_none_match = request.headers.get('If-None-Match')
+        version = conversation_version(conversation_id)
+        entry = get_conversation_detail(conversation_id, version)
+        if entry is not None and not self._in_scope(entry.get('tenant_id')):
+            # Conversa de outra origem: a consulta restrita à origem responde 404
+            entry = None
+        if entry is None:
+            conversation = self.get_object()
+            conversation.recent_messages = self._recent_messages(conversation)
+            data = self.get_serializer(conversation).data
+            etag = set_conversation_detail(conversation_id, version, data, conversation.tenant_id)
+            entry = {'data': data, 'etag': etag}
+
+        if if_none_match and entry['etag'] in (tag.strip() for tag in if_none_match.split(',')):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(entry['data'])
+        response['ETag'] = entry['etag']
+        return response
+
+    @staticmethod
+    def _recent_messages(conversation) -> list:
+        """
+        Busca as mensagens mais recentes da conversa (uma a mais que o limite, em ordem decrescente).
+
+        Um `ORDER BY timestamp DESC LIMIT` simples, em vez de um Prefetch fatiado (que
+        o Django traduz em uma função de janela sobre todas as mensagens da conversa),
+        permite ao PostgreSQL percorrer as partições mensais da mais nova para a mais
+        antiga e parar assim que encontrar mensagens suficientes.
+        """
+        limit = settings.CONVERSATION_DETAIL_MESSAGE_LIMIT + 1
+        return list(Message.objects.filter(conversation_id=conversation.pk).order_by('-timestamp', '-id')[:limit])
+
+    def _in_scope(self, tenant_id) -> bool:
+        tenant = self.request.auth
+        if tenant is not None:
+            return tenant_id == tenant.pk
+        return not settings.WEBHOOK_REQUIRE_TENANT
+
+    @action(detail=True, methods=['get'], pagination_class=MessageKeysetPagination)
+    def messages(self, request, pk=None):
+        """
+        Lista as mensagens de uma conversa com paginação por chave (timestamp, id).
+
+        Aceita `after` (cursor) ou `since` (data/hora) para buscar apenas mensagens novas
+        e `before` (cursor) para carregar o histórico anterior.
+
+        Returns:
+            Response com as mensagens da página, `next_cursor`, `previous_cursor` e `has_more`
+        """
+        conversation = self.get_object()
+        page = self.paginate_queryset(Message.objects.filter(conversation_id=conversation.pk))
+        return self.get_paginated_response(MessageSerializer(page, many=True).data)
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Exporta conversas e mensagens em NDJSON, transmitindo a resposta à medida que é lida do banco.
+
+        Parâmetros opcionais: `state` (OPEN ou CLOSED), `since` e `until` (data/hora ISO 8601)
+        e `compress=gzip` para receber o arquivo comprimido. Com uma origem autenticada,
+        apenas as conversas dela são exportadas.
+
+        Returns:
+            StreamingHttpResponse com um registro JSON por linha
+        """
+        filters = parse_conversation_filters(request.query_params)
+        compress = request.query_params.get('compress') == 'gzip'
+        records = export_records(tenant=request_tenant(request), using=request.read_alias, **filters)
+        response = StreamingHttpResponse(
+            iter_ndjson(records, compress=compress),
+            content_type='application/gzip' if compress else 'application/x-ndjson'
+        )
+        filename = 'conversations.ndjson.gz' if compress else 'conversations.ndjson'
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
+@require_GET
+def prometheus_metrics(request):
+    """
+    Expõe as métricas de ingestão no formato de texto do Prometheus.
+
+    Inclui os contadores de eventos e do cache, a duração de cada etapa da ingestão
+    por tipo de evento, a espera na fila, os comandos SQL por tarefa e as falhas por
+    motivo, agregados entre os processos web e workers. Com WEBHOOK_METRICS_TOKEN,
+    exige `Authorization: Bearer <token>`.
+
+    Returns:
+        HttpResponse com as métricas, 401 sem o token configurado ou 503 se o
+        armazenamento das métricas estiver indisponível
+    """
+    token = settings.WEBHOOK_METRICS_TOKEN
+    if token and not hmac.compare_digest(
+        request.headers.get('Authorization', '').encode(), f'Bearer {token}'.encode()
+    ):
+        return HttpResponse('Unauthorized\n', status=status.HTTP_401_UNAUTHORIZED, content_type='text/plain')
+    try:
+        body = metrics.render()
+    except RedisError as e:
+        logger.warning("Failed to read metrics: %s", e)
+        return HttpResponse('Metrics store unavailable\n', status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                            content_type='text/plain')
+    return HttpResponse(body, content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+async def _authenticate_async(request):
+    """
+    Autentica uma requisição da view assíncrona (mesmas regras de WebhookAuthentication).
+
+    A origem só é consultada no banco quando não está no cache em memória.
+
+    Returns:
+        Tenant: A origem autenticada, ou None.
+
+    Raises:
+        AuthenticationFailed: Se a assinatura estiver ausente ou inválida, o corpo estiver
+            vazio ou a origem for desconhecida.
+    """
+    signature = request.headers.get('Authorization')
+    if not signature:
+        raise AuthenticationFailed('No signature provided')
+    if not request.body:
+        raise AuthenticationFailed('Empty request body')
+    source = request.headers.get(TENANT_HEADER)
+    tenant = await aget_tenant(source) if source else None
+    check_source(source, tenant)
+    verify_signature(signature, request.body, tenant.secrets if tenant else None)
+    return tenant
+
+
+async def _publish_async(request, event: dict) -> JsonResponse:
+    """
+    Entrega um evento aceito ao buffer em memória ou, sob WSGI, diretamente ao broker.
+    """
+    if not isinstance(request, ASGIRequest):
+        # Sem um event loop duradouro (WSGI), não há onde manter o buffer
+        task_id = str(uuid.uuid4())
+        try:
+            await sync_to_async(publish_events)([(task_id, event)])
+        except Exception:
+            await dedup.aforget(event)
+            raise
+        await sync_to_async(count_received)([(task_id, event)])
+        return JsonResponse({'task_id': task_id}, status=status.HTTP_202_ACCEPTED)
+
+    try:
+        task_id = get_buffer().put(event)
+    except BufferFull:
+        await dedup.aforget(event)
+        return JsonResponse(
+            {'detail': 'Ingestion buffer is full'},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            headers={'Retry-After': '1'}
+        )
+    return JsonResponse({'task_id': task_id}, status=status.HTTP_202_ACCEPTED)
+
+
+class MessageSearchViewSet(ReplicaReadMixin, viewsets.GenericViewSet):
+    """
+    ViewSet para a busca de mensagens por texto.
+
+    Parâmetros: `q` (obrigatório; no PostgreSQL aceita "frases", OR e -exclusão),
+    `state` (estado da conversa), `direction` (SENT ou RECEIVED), `since` e `until`
+    (data/hora ISO 8601; sem `since`, os últimos WEBHOOK_SEARCH_DEFAULT_DAYS dias),
+    `ordering` (`rank`, padrão, ou `recent`), `page` e `page_size`. Requisições de
+    uma origem autenticada buscam apenas nas conversas dela.
+    """
+    serializer_class = MessageSearchResultSerializer
+    pagination_class = SearchPagination
+    authentication_classes = [TenantReadAuthentication]
+    queryset = Message.objects.none()
+
+    def list(self, request):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            raise ValidationError({'q': 'This field is required.'})
+        direction = request.query_params.get('direction')
+        if direction and direction not in (Message.SENT_CHOICE, Message.RECEIVED_CHOICE):
+            raise ValidationError({'direction': 'Must be SENT or RECEIVED'})
+        ordering = request.query_params.get('ordering', 'rank')
+        if ordering not in ('rank', 'recent'):
+            raise ValidationError({'ordering': 'Must be rank or recent'})
+
+        messages = search_messages(
+            query, direction=direction, tenant=request_tenant(request), ordering=ordering,
+            **parse_conversation_filters(request.query_params)
+        )
+        page = self.paginate_queryset(messages)
+        return self.get_paginated_response(self.get_serializer(page, many=True).data)
+
+
+@csrf_exempt
+@require_POST
+async def async_webhook(request):
+    """
+    Recebe um evento de webhook sem bloquear o servidor (servida via ASGI).
+
+    Autentica, valida e deduplica o evento e o coloca no buffer em memória do
+    processo, que o publica no broker em lotes; a resposta não espera pelo broker.
+    Com o buffer cheio, responde 503 com `Retry-After`. Servida por WSGI (por
+    exemplo, `runserver`), a publicação é feita durante a própria requisição.
+
+    Returns:
+        JsonResponse com o ID da tarefa e status 202 (Accepted), 200 para
+        duplicatas, 400/401 para eventos inválidos, 429 acima do limite de taxa
+        ou 503 com o buffer cheio
+    """
+    try:
+        tenant = await _authenticate_async(request)
+    except AuthenticationFailed as e:
+        return JsonResponse({'detail': e.detail}, status=status.HTTP_401_UNAUTHORIZED)
+
+    allowed, wait = await sync_to_async(check_rate_limit, thread_sensitive=False)(request, tenant)
+    if not allowed:
+        return JsonResponse(
+            {'detail': 'Too many requests'},
+            status=status.HTTP_429_TOO_MANY_REQUESTS,
+            headers={'Retry-After': str(math.ceil(wait))}
+        )
+
+    try:
+        event = validate_event(json.loads(request.body), tenant.pk if tenant else None)
+    except EventValidationError as e:
+        return JsonResponse(e.errors, status=status.HTTP_400_BAD_REQUEST)
+    except ValueError as e:
+        return JsonResponse({'detail': f'JSON parse error - {e}'}, status=status.HTTP_400_BAD_REQUEST)
+
+    if not await dedup.amark_seen(event):
+        await sync_to_async(metrics.increment)(metrics.EVENTS_RECEIVED, tenant=event['tenant_id'])
+        await sync_to_async(metrics.increment)(metrics.EVENTS_DUPLICATE, tenant=event['tenant_id'])
+        return JsonResponse({'status': 'duplicate'}, status=status.HTTP_200_OK)
+
+    return await _publish_async(request, event)
+
+
+async def _authenticate_read_async(request):
+    """
+    Autentica uma requisição de leitura assíncrona (mesmas regras de TenantReadAuthentication).
+
+    Como o EventSource dos navegadores não envia cabeçalhos, a origem e o token de
+    leitura também são aceitos nos parâmetros `source` e `token` da query string.
+
+    Returns:
+        Tenant: A origem autenticada, ou None para leitura de todas as conversas.
+
+    Raises:
+        AuthenticationFailed: Se a origem for desconhecida, o token não conferir ou
+            WEBHOOK_REQUIRE_TENANT estiver ativo e não houver origem.
+    """
+    source = request.headers.get(TENANT_HEADER) or request.GET.get('source')
+    tenant = await aget_tenant(source) if source else None
+    check_source(source, tenant)
+    if tenant is not None:
+        token = bearer_token(request.headers.get('Authorization', '')) or request.GET.get('token', '')
+        check_read_token(tenant, token)
+    return tenant
+
+
+async def _updates_stream(tenant, conversation_id):
+    """
+    Retorna o stream de atualizações da listagem ou de uma conversa visível para a origem.
+
+    Returns:
+        str: Chave do stream, ou None se a conversa não existir para a origem.
+    """
+    if conversation_id is None:
+        return updates.list_stream(tenant.pk if tenant else None)
+    owner = await Conversation.objects.filter(id=conversation_id).values_list('tenant_id').afirst()
+    if owner is None or (tenant is not None and owner[0] != tenant.pk):
+        return None
+    return updates.CONVERSATION_STREAM.format(conversation_id)
+
+
+@require_GET
+async def conversation_updates(request, conversation_id=None):
+    """
+    Transmite as atualizações da listagem de conversas ou de uma conversa via Server-Sent Events.
+
+    Cada evento é um delta: `message` (mensagem nova, no stream de uma conversa),
+    `conversation` (conversa criada, fechada ou com mensagem nova, com o resumo da
+    listagem) ou `reset` (o histórico desde o último evento recebido não está mais
+    disponível e o estado deve ser recarregado pela API). Ao reconectar, o cliente
+    envia o ID do último evento em `Last-Event-ID` (ou `last_event_id`) e recebe
+    apenas os eventos seguintes. Deltas podem se repetir; clientes devem aplicá-los
+    de forma idempotente, pelo ID.
+
+    Exige o servidor ASGI: sob WSGI, cada conexão prenderia um worker.
+
+    Returns:
+        StreamingHttpResponse `text/event-stream`, ou 400/401/404/501
+    """
+    try:
+        tenant = await _authenticate_read_async(request)
+    except AuthenticationFailed as e:
+        return JsonResponse({'detail': e.detail}, status=status.HTTP_401_UNAUTHORIZED)
+
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    if last_event_id and not updates.valid_event_id(last_event_id):
+        return JsonResponse({'last_event_id': 'Invalid event ID'}, status=status.HTTP_400_BAD_REQUEST)
+
+    stream = await _updates_stream(tenant, conversation_id)
+    if stream is None:
+        return JsonResponse({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse(
+            {'detail': 'Real-time updates require the ASGI server'}, status=status.HTTP_501_NOT_IMPLEMENTED
+        )
+
+    response = StreamingHttpResponse(
+        updates.stream_events(stream, last_event_id or None), content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Impede que proxies (nginx) acumulem a resposta antes de repassá-la
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -14,18 +14,133 @@ interface Conversation {
   messages: Message[];
 }
 
+interface ConversationSummary {
+  id: string;
+  state: 'OPEN' | 'CLOSED';
+  message_count: number;
+  last_message_at: string | null;
+  last_message_preview: string | null;
+}
+
+interface Page<T> {
+  next: string | null;
+  previous: string | null;
+  results: T[];
+}
+
+// Delta da listagem: conversa criada, fechada ou com mensagem nova
+interface ConversationDelta {
+  id: string;
+  state?: 'OPEN' | 'CLOSED';
+  last_message_at?: string;
+  last_message_preview?: string;
+  new_messages?: number;
+  message_id?: string;
+}
+
+interface MessageDelta extends Message {
+  conversation_id: string;
+}
+
+const API_URL = 'http://localhost:8000';
+// Atualizações em tempo real (SSE) são servidas pelo servidor ASGI
+const UPDATES_URL = 'http://localhost:8001';
+
+const mergeMessages = (current: Message[], incoming: Message[]) => {
+  const byId = new Map(current.map(message => [message.id, message]));
+  incoming.forEach(message => byId.set(message.id, message));
+  return Array.from(byId.values()).sort((a, b) => a.timestamp.localeCompare(b.timestamp));
+};
+
+// IDs de mensagens já somados à listagem, para ignorar deltas repetidos (os mais antigos saem acima do limite)
+const MAX_COUNTED_MESSAGES = 10000;
+
+const countOnce = (counted: Set<string>, delta: ConversationDelta): ConversationDelta => {
+  if (!delta.message_id) {
+    return delta;
+  }
+  if (counted.has(delta.message_id)) {
+    return { ...delta, new_messages: 0 };
+  }
+  counted.add(delta.message_id);
+  if (counted.size > MAX_COUNTED_MESSAGES) {
+    counted.delete(counted.values().next().value as string);
+  }
+  return delta;
+};
+
+const applyConversationDelta = (conversations: ConversationSummary[], delta: ConversationDelta) => {
+  const existing = conversations.find(conversation => conversation.id === delta.id);
+  if (!existing) {
+    const created: ConversationSummary = {
+      id: delta.id,
+      state: delta.state ?? 'OPEN',
+      message_count: delta.new_messages ?? 0,
+      last_message_at: delta.last_message_at ?? null,
+      last_message_preview: delta.last_message_preview ?? null,
+    };
+    return [created, ...conversations];
+  }
+  return conversations.map(conversation => conversation.id !== delta.id ? conversation : {
+    ...conversation,
+    state: delta.state ?? conversation.state,
+    message_count: conversation.message_count + (delta.new_messages ?? 0),
+    last_message_at: delta.last_message_at ?? conversation.last_message_at,
+    last_message_preview: delta.last_message_preview ?? conversation.last_message_preview,
+  });
+};
+
 function App() {
-  const [conversations, setConversations] = useState<Conversation[]>([]);
+  const [conversations, setConversations] = useState<ConversationSummary[]>([]);
+  const [nextPage, setNextPage] = useState<string | null>(null);
+  const [selectedId, setSelectedId] = useState<string | null>(null);
   const [selectedConversation, setSelectedConversation] = useState<Conversation | null>(null);
   const [error, setError] = useState<string | null>(null);
 
   useEffect(() => {
     fetchConversations();
+    // Recebe apenas os deltas da listagem; ao reconectar, o EventSource retoma do último evento recebido
+    const source = new EventSource(`${UPDATES_URL}/conversations/updates/`);
+    const counted = new Set<string>();
+    source.addEventListener('conversation', event => {
+      // Deduplicado fora do updater, que o React pode executar mais de uma vez
+      const delta = countOnce(counted, JSON.parse((event as MessageEvent).data));
+      setConversations(previous => applyConversationDelta(previous, delta));
+    });
+    source.addEventListener('reset', () => fetchConversations());
+    return () => source.close();
   }, []);
 
-  const fetchConversations = async () => {
+  useEffect(() => {
+    if (!selectedId) {
+      return;
+    }
+    let loaded = false;
+    const source = new EventSource(`${UPDATES_URL}/conversations/${selectedId}/updates/`);
+    // O detalhe é carregado depois que o stream está aberto, para não perder mensagens entre as duas coisas
+    source.addEventListener('open', () => {
+      if (!loaded) {
+        loaded = true;
+        fetchConversationDetails(selectedId);
+      }
+    });
+    source.addEventListener('message', event => {
+      const delta: MessageDelta = JSON.parse((event as MessageEvent).data);
+      setSelectedConversation(previous => previous && previous.id === delta.conversation_id
+        ? { ...previous, messages: mergeMessages(previous.messages, [delta]) }
+        : previous);
+    });
+    source.addEventListener('conversation', event => {
+      const delta: ConversationDelta = JSON.parse((event as MessageEvent).data);
+      setSelectedConversation(previous => previous && delta.state ? { ...previous, state: delta.state } : previous);
+    });
+    source.addEventListener('reset', () => fetchConversationDetails(selectedId));
+    return () => source.close();
+  }, [selectedId]);
+
+  const fetchConversations = async (url: string = `${API_URL}/conversations/`, append: boolean = false) => {
     try {
-      const response = await fetch('http://localhost:8000/conversations/', {
+      const response = await fetch(url, {
         headers: {
           'Authorization': 'debug'
         }
@@ -33,8 +148,9 @@ function App() {
       if (!response.ok) {
         throw new Error('Falha ao carregar conversas');
       }
-      const data = await response.json();
-      setConversations(data);
+      const data: Page<ConversationSummary> = await response.json();
+      setConversations(previous => (append ? [...previous, ...data.results] : data.results));
+      setNextPage(data.next);
     } catch (err) {
       setError('Erro ao carregar conversas');
       console.error('Erro:', err);
@@ -43,7 +159,7 @@ function App() {
 
   const fetchConversationDetails = async (id: string) => {
     try {
-      const response = await fetch(`http://localhost:8000/conversations/${id}/`, {
+      const response = await fetch(`${API_URL}/conversations/${id}/`, {
         headers: {
           'Authorization': 'debug'
         }
@@ -51,8 +167,11 @@ function App() {
       if (!response.ok) {
         throw new Error('Falha ao carregar detalhes da conversa');
       }
-      const data = await response.json();
-      setSelectedConversation(data);
+      const data: Conversation = await response.json();
+      // Mantém as mensagens recebidas pelo stream enquanto o detalhe era carregado
+      setSelectedConversation(previous => previous && previous.id === data.id
+        ? { ...data, messages: mergeMessages(previous.messages, data.messages) }
+        : data);
     } catch (err) {
       setError('Erro ao carregar detalhes da conversa');
       console.error('Erro:', err);
@@ -75,15 +194,24 @@ function App() {
           {conversations.map(conversation => (
             <div
               key={conversation.id}
-              className={`conversation-item ${selectedConversation?.id === conversation.id ? 'selected' : ''}`}
-              onClick={() => fetchConversationDetails(conversation.id)}
+              className={`conversation-item ${selectedId === conversation.id ? 'selected' : ''}`}
+              onClick={() => setSelectedId(conversation.id)}
             >
               <span>ID: {conversation.id.substring(0, 8)}...</span>
               <span className={`status ${conversation.state.toLowerCase()}`}>
                 {conversation.state === 'OPEN' ? 'ABERTA' : 'FECHADA'}
               </span>
+              <span className="conversation-summary">
+                {conversation.message_count} mensagens
+                {conversation.last_message_preview && ` · ${conversation.last_message_preview}`}
+              </span>
             </div>
           ))}
+          {nextPage && (
+            <button className="load-more" onClick={() => fetchConversations(nextPage, true)}>
+              Carregar mais
+            </button>
+          )}
         </div>
         {selectedConversation && (
           <div className="messages-panel">
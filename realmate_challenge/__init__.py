@@ -0,0 +1,5 @@
+# Garante que o app Celery seja carregado junto com o Django, para que
+# @shared_task use a configuração CELERY_* definida em settings.
+from .celery import app as celery_app
+
+__all__ = ('celery_app',)
@@ -13,4 +13,8 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'realmate_challenge.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from apps.webhook_handler.ingest import lifespan  # noqa: E402 (requer o Django configurado)
+
+application = lifespan(django_application)
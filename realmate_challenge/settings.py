@@ -32,6 +32,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'apps.webhook_handler.middleware.CorrelationIdMiddleware',
     'corsheaders.middleware.CorsMiddleware',  # Deve vir antes do CommonMiddleware
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -73,9 +74,39 @@ DATABASES = {
         'PASSWORD': os.environ.get('DB_PASSWORD', 'postgres'),
         'HOST': os.environ.get('DB_HOST', 'postgres'),
         'PORT': os.environ.get('DB_PORT', '5432'),
+        # Conexões persistentes: cada thread do servidor web reaproveita a conexão por até
+        # DB_CONN_MAX_AGE segundos, verificada no início de cada requisição. Os workers Celery
+        # usam WEBHOOK_WORKER_CONN_MAX_AGE (ver `pooling.configure_worker`). Use 0 sob ASGI.
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', '60')),
+        'CONN_HEALTH_CHECKS': os.environ.get('DB_CONN_HEALTH_CHECKS', 'True') == 'True',
+        # Cursores do lado do servidor não sobrevivem ao PgBouncer em modo transaction; as
+        # leituras longas (exportação) paginam por ID e não dependem deles
+        'DISABLE_SERVER_SIDE_CURSORS': os.environ.get('DB_DISABLE_SERVER_SIDE_CURSORS', 'True') == 'True',
     }
 }
 
+# Réplicas de leitura: um banco por host em DB_REPLICA_HOSTS (separados por vírgula), com as
+# mesmas credenciais do primário. As leituras da API de conversas, da busca e das listagens do
+# admin vão para uma réplica sorteada (ver `replicas.ReplicaRouter`); uma conversa escrita há
+# menos de WEBHOOK_REPLICA_STICKY_SECONDS é lida do primário, assim como tudo quando as réplicas
+# passam de WEBHOOK_REPLICA_MAX_LAG_SECONDS de atraso (medido a cada WEBHOOK_REPLICA_LAG_CHECK_SECONDS).
+DATABASE_REPLICAS = []
+for index, host in enumerate(filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(',')), start=1):
+    DATABASES[f'replica_{index}'] = {
+        **DATABASES['default'],
+        'HOST': host.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica_{index}')
+
+DATABASE_ROUTERS = ['apps.webhook_handler.replicas.ReplicaRouter']
+WEBHOOK_REPLICA_STICKY_SECONDS = float(os.environ.get('WEBHOOK_REPLICA_STICKY_SECONDS', '15'))
+WEBHOOK_REPLICA_MAX_LAG_SECONDS = float(os.environ.get('WEBHOOK_REPLICA_MAX_LAG_SECONDS', '5'))
+WEBHOOK_REPLICA_LAG_CHECK_SECONDS = float(os.environ.get('WEBHOOK_REPLICA_LAG_CHECK_SECONDS', '5'))
+
+# Idade máxima (segundos) das conexões persistentes nos workers Celery
+WEBHOOK_WORKER_CONN_MAX_AGE = int(os.environ.get('WEBHOOK_WORKER_CONN_MAX_AGE', '600'))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -128,6 +159,28 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Cache compartilhado entre processos (deduplicação, métricas, status de eventos)
+REDIS_CACHE_URL = os.environ.get('REDIS_CACHE_URL', 'redis://localhost:6379/1')
+# Acesso direto ao Redis (scripts Lua do limitador de taxa)
+REDIS_URL = os.environ.get('REDIS_URL', REDIS_CACHE_URL)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_CACHE_URL,
+    },
+    # Detalhe serializado das conversas; invalidado a cada escrita, expira por TTL e, no limite
+    # de memória do Redis (volatile-lru), as entradas menos usadas são descartadas
+    'conversations': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_CACHE_URL,
+        'KEY_PREFIX': 'conversations',
+        'TIMEOUT': int(os.environ.get('CONVERSATION_CACHE_TTL', '300')),
+    },
+}
+
+# Quantidade de mensagens recentes incluídas no detalhe de uma conversa
+CONVERSATION_DETAIL_MESSAGE_LIMIT = int(os.environ.get('CONVERSATION_DETAIL_MESSAGE_LIMIT', '50'))
+
 # Celery Configuration
 CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL', 'redis://localhost:6379/0')
 CELERY_RESULT_BACKEND = 'django-db'
@@ -137,12 +190,118 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
 CELERY_BROKER_CONNECTION_RETRY_ON_STARTUP = True  # Added to address deprecation warning
+CELERY_RESULT_EXPIRES = int(os.environ.get('CELERY_RESULT_EXPIRES', '86400'))  # Retenção dos TaskResult (segundos)
+
+# Rastreamento do resultado das tarefas de webhook: 'redis' (armazenamento de status com TTL, sem escrita no
+# banco), 'sampled' (grava TaskResult para WEBHOOK_RESULT_SAMPLE_RATE das tarefas), 'db' ou 'none'
+WEBHOOK_RESULT_MODE = os.environ.get('WEBHOOK_RESULT_MODE', 'redis')
+WEBHOOK_RESULT_SAMPLE_RATE = float(os.environ.get('WEBHOOK_RESULT_SAMPLE_RATE', '0.01'))
+
+# Configurações de ingestão de webhooks
+WEBHOOK_BATCH_MAX_SIZE = int(os.environ.get('WEBHOOK_BATCH_MAX_SIZE', '5000'))  # Eventos por requisição de lote
+
+# Micro-lotes: acumula eventos individuais e os aplica em lote por uma única tarefa
+WEBHOOK_MICROBATCH_ENABLED = os.environ.get('WEBHOOK_MICROBATCH_ENABLED', 'False') == 'True'
+WEBHOOK_MICROBATCH_SIZE = int(os.environ.get('WEBHOOK_MICROBATCH_SIZE', '500'))  # Máximo de eventos por lote
+WEBHOOK_MICROBATCH_WAIT_MS = int(os.environ.get('WEBHOOK_MICROBATCH_WAIT_MS', '200'))  # Janela de acumulação
+WEBHOOK_EVENT_STATUS_TTL = int(os.environ.get('WEBHOOK_EVENT_STATUS_TTL', '86400'))  # Retenção do status por evento
+
+# Ingestão assíncrona (/webhooks/async/ via ASGI): buffer em memória por processo, publicado no broker em lotes
+WEBHOOK_ASYNC_BUFFER_SIZE = int(os.environ.get('WEBHOOK_ASYNC_BUFFER_SIZE', '10000'))  # Acima disso, responde 503
+WEBHOOK_ASYNC_FLUSH_SIZE = int(os.environ.get('WEBHOOK_ASYNC_FLUSH_SIZE', '500'))  # Eventos por publicação
+WEBHOOK_ASYNC_FLUSH_MS = int(os.environ.get('WEBHOOK_ASYNC_FLUSH_MS', '10'))  # Espera para completar um lote
+# Tentativas de publicar um lote antes de enviá-lo para DeadLetterEvent (esperas de até 5s entre elas)
+WEBHOOK_ASYNC_PUBLISH_ATTEMPTS = int(os.environ.get('WEBHOOK_ASYNC_PUBLISH_ATTEMPTS', '20'))
+# Espera máxima, no encerramento do servidor ASGI, pela publicação do buffer (abaixo do stop_grace_period)
+WEBHOOK_ASYNC_SHUTDOWN_TIMEOUT = float(os.environ.get('WEBHOOK_ASYNC_SHUTDOWN_TIMEOUT', '25'))
+
+# Sharding: eventos de uma conversa vão sempre para a mesma fila (webhook.shard.N) e são processados em ordem.
+# 0 desativa o sharding e usa a fila padrão. Não altere com eventos em trânsito: o shard de cada conversa mudaria.
+WEBHOOK_SHARD_COUNT = int(os.environ.get('WEBHOOK_SHARD_COUNT', '0'))
+WEBHOOK_SHARD_QUEUE_PREFIX = 'webhook.shard'
+
+# Mensagens recebidas antes da conversa ficam estacionadas por até este tempo (segundos) antes da dead-letter
+WEBHOOK_PENDING_EVENT_TTL = int(os.environ.get('WEBHOOK_PENDING_EVENT_TTL', '3600'))
+
+# Idempotência: reentregas do mesmo evento dentro da janela (segundos) são descartadas antes de enfileirar
+WEBHOOK_DEDUP_ENABLED = os.environ.get('WEBHOOK_DEDUP_ENABLED', 'True') == 'True'
+WEBHOOK_DEDUP_TTL = int(os.environ.get('WEBHOOK_DEDUP_TTL', '86400'))
+
+# Limite de taxa das rotas de webhook: balde de fichas por identidade ('ip', 'key' ou 'tenant'), com reposição de
+# WEBHOOK_RATE_LIMIT_RATE requisições/s e rajadas de até WEBHOOK_RATE_LIMIT_BURST. Vazio desativa a limitação.
+WEBHOOK_RATE_LIMITER = os.environ.get('WEBHOOK_RATE_LIMITER', 'apps.webhook_handler.throttling.RedisTokenBucket')
+WEBHOOK_RATE_LIMIT_RATE = float(os.environ.get('WEBHOOK_RATE_LIMIT_RATE', '500'))
+WEBHOOK_RATE_LIMIT_BURST = int(os.environ.get('WEBHOOK_RATE_LIMIT_BURST', '1000'))
+WEBHOOK_RATE_LIMIT_IDENTITY = os.environ.get('WEBHOOK_RATE_LIMIT_IDENTITY', 'ip')
+
+# Origens de webhook (Tenant), identificadas pelo header X-Webhook-Source. Cada processo
+# guarda as origens consultadas por WEBHOOK_TENANT_CACHE_TTL segundos e, a cada
+# WEBHOOK_TENANT_SYNC_SECONDS, descarta-as se alguma origem foi alterada. Com WEBHOOK_REQUIRE_TENANT,
+# requisições sem origem são recusadas; sem ele, usam WEBHOOK_SECRET e enxergam todas as conversas.
+WEBHOOK_TENANT_CACHE_TTL = int(os.environ.get('WEBHOOK_TENANT_CACHE_TTL', '60'))
+WEBHOOK_TENANT_SYNC_SECONDS = float(os.environ.get('WEBHOOK_TENANT_SYNC_SECONDS', '1'))
+WEBHOOK_REQUIRE_TENANT = os.environ.get('WEBHOOK_REQUIRE_TENANT', 'False') == 'True'
+
+# Particionamento mensal das mensagens (só PostgreSQL): partições criadas com WEBHOOK_MESSAGE_PARTITIONS_AHEAD meses
+# de antecedência. Com WEBHOOK_MESSAGE_RETENTION_MONTHS > 0, as partições mais antigas que a janela são exportadas para
+# WEBHOOK_MESSAGE_ARCHIVE_DIR (CSV comprimido) e removidas; 0 mantém todas.
+WEBHOOK_MESSAGE_PARTITIONS_AHEAD = int(os.environ.get('WEBHOOK_MESSAGE_PARTITIONS_AHEAD', '3'))
+WEBHOOK_MESSAGE_RETENTION_MONTHS = int(os.environ.get('WEBHOOK_MESSAGE_RETENTION_MONTHS', '0'))
+WEBHOOK_MESSAGE_ARCHIVE_DIR = os.environ.get('WEBHOOK_MESSAGE_ARCHIVE_DIR', str(BASE_DIR / 'archive' / 'messages'))
+
+# Atualizações em tempo real (SSE, servidas via ASGI): deltas publicados em streams do Redis após cada escrita.
+# Cada stream guarda até *_MAXLEN entradas e expira após WEBHOOK_UPDATES_TTL segundos sem escritas; uma conexão dura
+# até WEBHOOK_UPDATES_MAX_SECONDS e o cliente reconecta retomando do último evento recebido.
+WEBHOOK_UPDATES_ENABLED = os.environ.get('WEBHOOK_UPDATES_ENABLED', 'True') == 'True'
+WEBHOOK_UPDATES_TTL = int(os.environ.get('WEBHOOK_UPDATES_TTL', '86400'))
+WEBHOOK_UPDATES_LIST_MAXLEN = int(os.environ.get('WEBHOOK_UPDATES_LIST_MAXLEN', '10000'))
+WEBHOOK_UPDATES_CONVERSATION_MAXLEN = int(os.environ.get('WEBHOOK_UPDATES_CONVERSATION_MAXLEN', '1000'))
+WEBHOOK_UPDATES_HEARTBEAT_SECONDS = int(os.environ.get('WEBHOOK_UPDATES_HEARTBEAT_SECONDS', '15'))
+WEBHOOK_UPDATES_MAX_SECONDS = int(os.environ.get('WEBHOOK_UPDATES_MAX_SECONDS', '300'))
+WEBHOOK_UPDATES_RETRY_MS = int(os.environ.get('WEBHOOK_UPDATES_RETRY_MS', '1000'))
+WEBHOOK_UPDATES_MAX_CONNECTIONS = int(os.environ.get('WEBHOOK_UPDATES_MAX_CONNECTIONS', '1000'))
+
+# Busca de mensagens: a ordenação por relevância considera as N correspondências mais recentes
+WEBHOOK_SEARCH_RANK_WINDOW = int(os.environ.get('WEBHOOK_SEARCH_RANK_WINDOW', '1000'))
+# Sem `since`, a busca cobre os N dias anteriores a `until` (ou a agora); 0 busca em todo o histórico
+WEBHOOK_SEARCH_DEFAULT_DAYS = int(os.environ.get('WEBHOOK_SEARCH_DEFAULT_DAYS', '90'))
+
+# Métricas Prometheus em /metrics: cada processo acumula as observações em memória e as soma ao armazenamento
+# compartilhado no máximo a cada WEBHOOK_METRICS_FLUSH_SECONDS. Com WEBHOOK_METRICS_TOKEN, a rota exige
+# `Authorization: Bearer <token>`.
+WEBHOOK_METRICS_ENABLED = os.environ.get('WEBHOOK_METRICS_ENABLED', 'True') == 'True'
+WEBHOOK_METRICS_STORE = os.environ.get('WEBHOOK_METRICS_STORE', 'apps.webhook_handler.metrics.RedisMetricsStore')
+WEBHOOK_METRICS_FLUSH_SECONDS = float(os.environ.get('WEBHOOK_METRICS_FLUSH_SECONDS', '5'))
+WEBHOOK_METRICS_TOKEN = os.environ.get('WEBHOOK_METRICS_TOKEN', '')
+
+# Logs em produção: `json` (uma linha JSON por registro, com o ID de correlação) ou `text`.
+# Os registros são escritos por uma thread, a partir de uma fila de WEBHOOK_LOG_QUEUE_SIZE
+# posições (excedentes são descartados). WEBHOOK_LOG_SAMPLE_RATES mantém só uma fração das
+# linhas INFO/DEBUG por logger, no formato `logger=taxa,logger=taxa` (ex.: `webhook_handler=0.1`).
+WEBHOOK_LOG_FORMAT = os.environ.get('WEBHOOK_LOG_FORMAT', 'json')
+WEBHOOK_LOG_LEVEL = os.environ.get('WEBHOOK_LOG_LEVEL', 'INFO')
+WEBHOOK_LOG_QUEUE_SIZE = int(os.environ.get('WEBHOOK_LOG_QUEUE_SIZE', '10000'))
+WEBHOOK_LOG_SAMPLE_RATES = {
+    name.strip(): float(rate)
+    for name, _, rate in (
+        item.partition('=') for item in os.environ.get('WEBHOOK_LOG_SAMPLE_RATES', '').split(',') if '=' in item
+    )
+}
 
-# Configurações de throttle
-REST_FRAMEWORK = {
-    'DEFAULT_THROTTLE_RATES': {
-        'webhook': '60/minute',  # Ajuste conforme necessário
-    }
+# Tarefas periódicas (celery beat)
+CELERY_BEAT_SCHEDULE = {
+    'expire-pending-webhook-events': {
+        'task': 'apps.webhook_handler.tasks.expire_pending_events',
+        'schedule': 60.0,
+    },
+    'purge-task-results': {
+        'task': 'apps.webhook_handler.tasks.purge_task_results',
+        'schedule': 3600.0,
+    },
+    'maintain-message-partitions': {
+        'task': 'apps.webhook_handler.tasks.maintain_message_partitions',
+        'schedule': 86400.0,
+    },
 }
 
 # Configurações CORS
@@ -190,20 +349,36 @@ else:
     # Chave secreta para validação de webhooks
     WEBHOOK_SECRET = os.environ.get('WEBHOOK_SECRET')
 
-    # Configuração de logs
+    # Configuração de logs: formatação e escrita fora da thread da requisição/tarefa
     LOGGING = {
         'version': 1,
         'disable_existing_loggers': False,
+        'filters': {
+            'correlation_id': {
+                '()': 'apps.webhook_handler.logs.CorrelationIdFilter',
+            },
+            'sampling': {
+                '()': 'apps.webhook_handler.logs.SamplingFilter',
+                'rates': WEBHOOK_LOG_SAMPLE_RATES,
+            },
+        },
         'formatters': {
             'verbose': {
-                'format': '[{levelname}] {asctime} {module} - {message}',
+                'format': '[{levelname}] {asctime} {module} [{correlation_id}] - {message}',
                 'style': '{',
             },
+            'json': {
+                '()': 'apps.webhook_handler.logs.JsonFormatter',
+            },
         },
         'handlers': {
             'console': {
-                'class': 'logging.StreamHandler',
-                'formatter': 'verbose',
+                # Fábrica ('()') em vez de 'class': a partir do Python 3.12, dictConfig trata
+                # subclasses de QueueHandler como handlers de fila genéricos
+                '()': 'apps.webhook_handler.logs.QueueStreamHandler',
+                'maxsize': WEBHOOK_LOG_QUEUE_SIZE,
+                'formatter': 'json' if WEBHOOK_LOG_FORMAT == 'json' else 'verbose',
+                'filters': ['correlation_id', 'sampling'],
             },
         },
         'loggers': {
@@ -214,7 +389,7 @@ else:
             },
             'webhook_handler': {
                 'handlers': ['console'],
-                'level': 'DEBUG',
+                'level': WEBHOOK_LOG_LEVEL,
                 'propagate': True,
             },
             'celery': {
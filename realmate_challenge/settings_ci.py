@@ -8,6 +8,37 @@ DATABASES = {
     }
 }
 
+# Réplica de leitura local (desativada: DATABASE_REPLICAS vazio). Para testar o roteamento,
+# copie db.sqlite3 para db.replica.sqlite3 e use DATABASE_REPLICAS = ['replica'];
+# nos testes ela espelha o banco padrão
+DATABASES['replica'] = {
+    'ENGINE': 'django.db.backends.sqlite3',
+    'NAME': BASE_DIR / 'db.replica.sqlite3',
+    'TEST': {'MIRROR': 'default'},
+}
+DATABASE_REPLICAS = []
+
+# Use local memory cache in CI (no Redis available)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'conversations': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'conversations',
+        'OPTIONS': {'MAX_ENTRIES': 1000},
+    },
+}
+
+# Limitador de taxa em memória (sem Redis)
+WEBHOOK_RATE_LIMITER = 'apps.webhook_handler.throttling.LocalTokenBucket'
+
+# Métricas Prometheus em memória (sem Redis)
+WEBHOOK_METRICS_STORE = 'apps.webhook_handler.metrics.LocalMetricsStore'
+
+# Atualizações em tempo real dependem de streams do Redis
+WEBHOOK_UPDATES_ENABLED = False
+
 # Disable celery in CI
 CELERY_TASK_ALWAYS_EAGER = True
 CELERY_TASK_EAGER_PROPAGATES = True